@@ -1,11 +1,45 @@
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, Response, g, jsonify, request, make_response, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+import atexit
+import click
 import os
-from fpdf import FPDF
-from werkzeug.security import generate_password_hash, check_password_hash
+import csv
+import hashlib
+import io
+import secrets
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from functools import wraps
+from itertools import chain
+from types import SimpleNamespace
+from sqlalchemy import case, event, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import aliased
+from werkzeug.http import is_resource_modified
+import migrations
+from archive import ArchiveStore
+from cache import create_cache
+from compression import Compressor
+from dbrouting import PoolMonitor, ReplicaRouter, RoutingSession, engine_options
+from fastjson import FastJSONProvider
+from jobs import JobQueue, JobRegistry
+from ingest import RowError, StreamError, batched, iter_json_array, iter_ndjson, validate_feedback
+from passwords import HasherBusy, PasswordHasher
+from pagination import Page, merge_pages, page_args, paginate, paginate_items, page_payload, page_response
+from pdf_export import PdfRenderer, stream_zip
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, RequestMetrics, SamplingProfiler
+from pubsub import EventBus, TooManySubscribers, sse_stream
+from roster import RosterCycle, RosterError, diff_rosters, find_cycle, parse_roster, parse_team
+import search
+import trends
+from tokens import TokenError, TokenSigner
+from writebuffer import BufferClosed, BufferTimeout, WriteBuffer
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 # More specific CORS configuration to allow requests from the frontend
 
 CORS(app, resources={r"/api/*": {"origins": [
@@ -20,10 +54,202 @@ DB_PORT = os.environ.get('DB_PORT', 3306)
 DB_NAME = os.environ.get('DB_NAME')
 # Database Configuration - Updated for local development
 # IMPORTANT: Replace "YOUR_ROOT_PASSWORD" with your actual MySQL root password
-app.config["SQLALCHEMY_DATABASE_URI"] = (
+# DATABASE_URL (set by docker-compose) takes precedence over the DB_* parts
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get('DATABASE_URL') or (
     f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-) 
-db = SQLAlchemy(app)
+)
+# Connection pool, per engine.  Pre-ping and recycle drop connections the
+# server has closed (MySQL wait_timeout) before a request gets one.
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+# Read replicas for GET requests (comma-separated URLs), and how long a user's
+# reads stay on the primary after they write.
+app.config['DATABASE_REPLICA_URLS'] = [
+    url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+]
+app.config['DB_READ_YOUR_WRITES_SECONDS'] = float(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', 5))
+
+
+def _engine_options(url):
+    return engine_options(url, pool_size=app.config['DB_POOL_SIZE'],
+                          max_overflow=app.config['DB_MAX_OVERFLOW'],
+                          pool_timeout=app.config['DB_POOL_TIMEOUT'],
+                          pool_recycle=app.config['DB_POOL_RECYCLE'],
+                          pool_pre_ping=app.config['DB_POOL_PRE_PING'])
+
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_BINDS'] = {
+    f'replica{i}': {'url': url, **_engine_options(url)}
+    for i, url in enumerate(app.config['DATABASE_REPLICA_URLS'])
+}
+db_router = ReplicaRouter(app.config['SQLALCHEMY_BINDS'],
+                          window=app.config['DB_READ_YOUR_WRITES_SECONDS'],
+                          principal=lambda: g.auth.user_id if 'auth' in g else None)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession, 'router': db_router})
+pool_monitor = PoolMonitor()
+with app.app_context():
+    for bind_key, engine in db.engines.items():
+        pool_monitor.watch(bind_key or 'primary', engine)
+
+# PDF rendering: worker processes for batch exports (default: one per CPU)
+# and the size of the rendered-document cache.
+app.config['PDF_RENDER_WORKERS'] = int(os.environ.get('PDF_RENDER_WORKERS', 0)) or None
+app.config['PDF_CACHE_MAX_BYTES'] = int(os.environ.get('PDF_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+app.config['PDF_BATCH_MAX_REPORTS'] = int(os.environ.get('PDF_BATCH_MAX_REPORTS', 5000))
+# Background jobs (exports, rebuilds).  JOBS_WORKER_THREADS run in the web
+# process, started on the first submit; set it to 0 and run
+# `flask --app app jobs-worker` to keep them out of the web workers.
+app.config['JOBS_WORKER_THREADS'] = int(os.environ.get('JOBS_WORKER_THREADS', 1))
+app.config['JOBS_RESULT_DIR'] = os.environ.get('JOBS_RESULT_DIR', 'job_results')
+app.config['JOBS_RESULT_TTL'] = int(os.environ.get('JOBS_RESULT_TTL', 24 * 3600))
+app.config['JOBS_LEASE_SECONDS'] = int(os.environ.get('JOBS_LEASE_SECONDS', 300))
+app.config['JOBS_MAX_ATTEMPTS'] = int(os.environ.get('JOBS_MAX_ATTEMPTS', 3))
+app.config['JOBS_RETRY_BACKOFF_SECONDS'] = float(os.environ.get('JOBS_RETRY_BACKOFF_SECONDS', 5))
+app.config['JOBS_MAX_PENDING_PER_USER'] = int(os.environ.get('JOBS_MAX_PENDING_PER_USER', 10))
+# Acknowledgements and comments arriving within WRITE_BUFFER_WINDOW_MS of each
+# other share one multi-row INSERT and commit (0 writes each one on its own).
+# WRITE_BUFFER_DURABILITY 'commit' answers once the batch has committed;
+# 'buffered' answers 202 at once and can lose the last window of writes if
+# the process is killed (a normal exit flushes them).  A 'commit' request
+# still waiting after WRITE_BUFFER_TIMEOUT_SECONDS answers 503.
+app.config['WRITE_BUFFER_WINDOW_MS'] = float(os.environ.get('WRITE_BUFFER_WINDOW_MS', 0))
+app.config['WRITE_BUFFER_MAX_ROWS'] = int(os.environ.get('WRITE_BUFFER_MAX_ROWS', 500))
+app.config['WRITE_BUFFER_DURABILITY'] = os.environ.get('WRITE_BUFFER_DURABILITY', 'commit')
+app.config['WRITE_BUFFER_TIMEOUT_SECONDS'] = float(os.environ.get('WRITE_BUFFER_TIMEOUT_SECONDS', 10))
+# Cold archive: `flask --app app archive` (or an archive job) moves feedback
+# older than ARCHIVE_AFTER_DAYS, with its comments, tags and
+# acknowledgements, into compressed segment files in ARCHIVE_DIR, one per
+# ARCHIVE_BATCH_SIZE feedback.  The read endpoints fall back to the segments.
+app.config['ARCHIVE_DIR'] = os.environ.get('ARCHIVE_DIR', 'archive')
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_AFTER_DAYS', 730))
+app.config['ARCHIVE_BATCH_SIZE'] = int(os.environ.get('ARCHIVE_BATCH_SIZE', 5000))
+app.config['ARCHIVE_BLOCK_RECORDS'] = int(os.environ.get('ARCHIVE_BLOCK_RECORDS', 64))
+app.config['ARCHIVE_CACHE_BLOCKS'] = int(os.environ.get('ARCHIVE_CACHE_BLOCKS', 256))
+# A feedback list asked for without limit/after includes at most this many
+# archived feedback (newest first) and counts the rest in X-Archived-Omitted
+app.config['ARCHIVE_UNPAGED_LIMIT'] = int(os.environ.get('ARCHIVE_UNPAGED_LIMIT', 500))
+archive_store = ArchiveStore(app.config['ARCHIVE_DIR'], block_records=app.config['ARCHIVE_BLOCK_RECORDS'],
+                             cache_blocks=app.config['ARCHIVE_CACHE_BLOCKS'])
+# Session tokens are signed with SECRET_KEY, and every worker process must
+# share it: a key generated per process rejects the tokens issued by the
+# other workers, and every token once the process restarts.  Only the debug
+# server (`python app.py` or FLASK_DEBUG=1) falls back to a random key.
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    if not (app.debug or __name__ == '__main__'):
+        raise RuntimeError("SECRET_KEY must be set; it signs the session tokens")
+    app.config['SECRET_KEY'] = secrets.token_hex(32)
+app.config['AUTH_TOKEN_TTL'] = int(os.environ.get('AUTH_TOKEN_TTL', 12 * 3600))
+token_signer = TokenSigner(app.config['SECRET_KEY'], ttl=app.config['AUTH_TOKEN_TTL'])
+# Users allowed to read the operational endpoints (job, cache, pool, event
+# and archive counters, the N+1 report) and to run rebuild and archive jobs
+app.config['OPS_USER_IDS'] = {int(user_id) for user_id in os.environ.get('OPS_USER_IDS', '').split(',')
+                              if user_id.strip()}
+
+# Read-through cache for users and team rosters ('memory' or 'redis')
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 4096))
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+cache = create_cache(app.config)
+
+# Bulk feedback ingestion: rows per INSERT batch/commit, and the upper bound
+# a caller may ask for with ?batch_size=
+app.config['BULK_INSERT_BATCH_SIZE'] = int(os.environ.get('BULK_INSERT_BATCH_SIZE', 500))
+app.config['BULK_INSERT_MAX_BATCH_SIZE'] = int(os.environ.get('BULK_INSERT_MAX_BATCH_SIZE', 5000))
+
+# Bulk roster sync/import: the most reporting lines one request may list, and
+# the number of changed lines above which the org closure is rebuilt in one
+# pass instead of patched line by line
+app.config['TEAM_SYNC_MAX_EDGES'] = int(os.environ.get('TEAM_SYNC_MAX_EDGES', 100000))
+app.config['TEAM_SYNC_REBUILD_THRESHOLD'] = int(os.environ.get('TEAM_SYNC_REBUILD_THRESHOLD', 200))
+
+# Password hashing runs in a process pool with a cap on queued jobs.  Stored
+# hashes made with another method are re-hashed with this one at login.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+password_hasher = PasswordHasher(method=app.config['PASSWORD_HASH_METHOD'],
+                                 workers=app.config['PASSWORD_HASH_WORKERS'],
+                                 max_pending=app.config['PASSWORD_HASH_MAX_PENDING'])
+
+pdf_renderer = PdfRenderer(workers=app.config['PDF_RENDER_WORKERS'],
+                           cache_max_bytes=app.config['PDF_CACHE_MAX_BYTES'])
+
+# Server-Sent Events: open streams per process, queued events per stream and
+# the keepalive interval.  Each open stream holds one server thread.
+app.config['EVENTS_MAX_SUBSCRIBERS'] = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 1000))
+app.config['EVENTS_QUEUE_SIZE'] = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+app.config['EVENTS_KEEPALIVE_SECONDS'] = float(os.environ.get('EVENTS_KEEPALIVE_SECONDS', 15))
+event_bus = EventBus(max_queue=app.config['EVENTS_QUEUE_SIZE'],
+                     max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS'], dumps=app.json.dumps)
+
+# Full-text search: 'auto' uses FULLTEXT on MySQL and FTS5 on SQLite;
+# 'memory' keeps an inverted index in each process instead.
+app.config['SEARCH_BACKEND'] = os.environ.get('SEARCH_BACKEND', 'auto')
+app.config['SEARCH_MAX_LIMIT'] = int(os.environ.get('SEARCH_MAX_LIMIT', 100))
+search_index = search.create_search_index(
+    app.config['SEARCH_BACKEND'], make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name())
+
+# Request metrics served at /metrics in Prometheus text format (guarded by
+# METRICS_TOKEN when set).  A request repeating one SELECT more than
+# METRICS_N_PLUS_ONE_THRESHOLD times is logged as a likely N+1.  With
+# METRICS_PROFILE_SLOW_MS set, requests are stack-sampled and the slow ones
+# are written to METRICS_PROFILE_DIR as folded stacks for flame graphs.
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') not in ('0', 'false', 'no')
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+app.config['METRICS_N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', 10))
+app.config['METRICS_PROFILE_SLOW_MS'] = float(os.environ.get('METRICS_PROFILE_SLOW_MS', 0))
+app.config['METRICS_PROFILE_INTERVAL_MS'] = float(os.environ.get('METRICS_PROFILE_INTERVAL_MS', 5))
+app.config['METRICS_PROFILE_DIR'] = os.environ.get('METRICS_PROFILE_DIR', 'profiles')
+request_metrics = RequestMetrics(
+    n_plus_one_threshold=app.config['METRICS_N_PLUS_ONE_THRESHOLD'],
+    profiler=SamplingProfiler(app.config['METRICS_PROFILE_DIR'], app.config['METRICS_PROFILE_SLOW_MS'],
+                              interval=app.config['METRICS_PROFILE_INTERVAL_MS'] / 1000)
+    if app.config['METRICS_PROFILE_SLOW_MS'] > 0 else None)
+if app.config['METRICS_ENABLED']:
+    with app.app_context():
+        for engine in db.engines.values():
+            request_metrics.watch_engine(engine)
+    pdf_renderer.on_render = request_metrics.observe_pdf_render
+
+    @app.before_request
+    def begin_request_metrics():
+        request_metrics.begin(request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+
+    # Registered before compress_response, so it runs after it and sees the
+    # compressed size.  The timing ends at teardown, or for a streamed body
+    # (exports, ZIPs, event streams) once the server has sent it and closed
+    # the response, whether or not the body uses stream_with_context.
+    @app.after_request
+    def record_response_metrics(response):
+        request_metrics.set_response(
+            response.status_code, None if response.is_streamed else response.calculate_content_length())
+        if response.is_streamed:
+            response.call_on_close(request_metrics.defer())
+        return response
+
+    @app.teardown_request
+    def end_request_metrics(exc):
+        request_metrics.end()
+
+# Response compression (gzip, or brotli when installed) for buffered JSON and
+# text bodies of at least COMPRESS_MIN_SIZE bytes.
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+compressor = Compressor(min_size=app.config['COMPRESS_MIN_SIZE'],
+                        gzip_level=app.config['COMPRESS_GZIP_LEVEL'],
+                        brotli_quality=app.config['COMPRESS_BROTLI_QUALITY'])
+
+
+@app.after_request
+def compress_response(response):
+    return compressor.after_request(response, request)
 
 # --- Database Models ---
 
@@ -35,47 +261,1601 @@ class User(db.Model):
     role = db.Column(db.String(20), nullable=False, default='Employee') # Manager or Employee
 
 class Team(db.Model):
+    __table_args__ = (
+        db.Index('uq_team_manager_id_employee_id', 'manager_id', 'employee_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+class OrgClosure(db.Model):
+    # Transitive closure of Team: one row per (ancestor, descendant, depth)
+    # with the number of distinct reporting paths of that length, so
+    # removing one edge of a multi-manager org subtracts exactly its paths.
+    # Self rows (depth 0) are not stored.
+    __table_args__ = (
+        db.Index('ix_org_closure_descendant_id', 'descendant_id', 'ancestor_id'),
+    )
+    ancestor_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    descendant_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    depth = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    paths = db.Column(db.Integer, nullable=False, default=1)
+
 class Feedback(db.Model):
+    __table_args__ = (
+        db.Index('ix_feedback_manager_id_timestamp', 'manager_id', 'timestamp'),
+        db.Index('ix_feedback_employee_id_timestamp', 'employee_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     strengths = db.Column(db.Text, nullable=False)
     improvements = db.Column(db.Text, nullable=False)
     sentiment = db.Column(db.String(20), nullable=False) # positive, neutral, negative
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
 
 class Comment(db.Model):
+    __table_args__ = (
+        db.Index('ix_comment_feedback_id_timestamp', 'feedback_id', 'timestamp'),
+        db.Index('uq_comment_user_id_idempotency_key', 'user_id', 'idempotency_key', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     feedback_id = db.Column(db.Integer, db.ForeignKey('feedback.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     text = db.Column(db.Text, nullable=False)
     is_markdown = db.Column(db.Boolean, default=True)
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
+    # Client-supplied Idempotency-Key, so a retried POST adds the comment once
+    idempotency_key = db.Column(db.String(100), nullable=True)
 
 class Acknowledgement(db.Model):
+    __table_args__ = (
+        db.Index('uq_acknowledgement_employee_id_feedback_id', 'employee_id', 'feedback_id', unique=True),
+        db.Index('ix_acknowledgement_feedback_id', 'feedback_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     feedback_id = db.Column(db.Integer, db.ForeignKey('feedback.id'), nullable=False)
     employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
 
 class FeedbackRequest(db.Model):
+    __table_args__ = (
+        db.Index('ix_feedback_request_target_manager_id_timestamp', 'target_manager_id', 'timestamp'),
+        db.Index('ix_feedback_request_requester_id_timestamp', 'requester_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     requester_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     target_manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     message = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(20), nullable=False, default='pending')  # pending, approved, declined
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
     is_anonymous = db.Column(db.Boolean, default=False)
 
 class Tag(db.Model):
+    __table_args__ = (
+        db.Index('ix_tag_feedback_id', 'feedback_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     feedback_id = db.Column(db.Integer, db.ForeignKey('feedback.id'), nullable=False)
     tag_name = db.Column(db.String(50), nullable=False)
 
+class FeedbackStats(db.Model):
+    # Per-user feedback counters, updated in the same transaction as the
+    # feedback writes so the stats endpoints are a primary-key lookup.
+    # scope is 'manager' (feedback given) or 'employee' (feedback received).
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    scope = db.Column(db.String(10), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    positive = db.Column(db.Integer, nullable=False, default=0)
+    neutral = db.Column(db.Integer, nullable=False, default=0)
+    negative = db.Column(db.Integer, nullable=False, default=0)
+    acknowledged = db.Column(db.Integer, nullable=False, default=0)
+
+class SentimentTrend(db.Model):
+    # Bucketed sentiment counts per period/scope/user/tag, maintained with
+    # the feedback and tag writes (see trends.py for the key layout).
+    period = db.Column(db.String(5), primary_key=True)
+    scope = db.Column(db.String(10), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.Date, primary_key=True)
+    tag_name = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    positive = db.Column(db.Integer, nullable=False, default=0)
+    neutral = db.Column(db.Integer, nullable=False, default=0)
+    negative = db.Column(db.Integer, nullable=False, default=0)
+
+class ArchivedFeedback(db.Model):
+    # Index of feedback moved to the cold archive: the columns the list
+    # queries and rollup rebuilds need, and where the record is in its
+    # segment (see archive.py).  Text, comments and acknowledgements are
+    # only in the segment.
+    __table_args__ = (
+        db.Index('ix_archived_feedback_employee_id_timestamp', 'employee_id', 'timestamp'),
+        db.Index('ix_archived_feedback_manager_id_timestamp', 'manager_id', 'timestamp'),
+    )
+    feedback_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    timestamp = db.Column(db.DateTime)
+    sentiment = db.Column(db.String(20), nullable=False)
+    acknowledged = db.Column(db.Boolean, nullable=False, default=False)  # by its employee
+    tags = db.Column(db.Text)  # tag names, one per line
+    segment = db.Column(db.String(100), nullable=False)
+    offset = db.Column(db.BigInteger, nullable=False)
+    length = db.Column(db.Integer, nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+
+class Job(db.Model):
+    # Background job queue; see jobs.py for the lifecycle
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_job_owner_id_id', 'owner_id', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    params = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='queued')
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False)
+    worker = db.Column(db.String(100))
+    lease_expires = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    result_path = db.Column(db.String(500))
+    result_name = db.Column(db.String(255))
+    result_mimetype = db.Column(db.String(100))
+    result_size = db.Column(db.BigInteger)
+
+class SearchDocument(db.Model):
+    # One row per feedback with its searchable text, rewritten together with
+    # the feedback, its comments and tags (see search.py for the index on it).
+    __tablename__ = search.TABLE
+    __table_args__ = (
+        db.Index('ix_feedback_search_manager_id', 'manager_id'),
+        db.Index('ix_feedback_search_employee_id', 'employee_id'),
+    )
+    feedback_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    manager_id = db.Column(db.Integer, nullable=False)
+    employee_id = db.Column(db.Integer, nullable=False)
+    feedback_text = db.Column(db.Text, nullable=False)
+    comment_text = db.Column(db.Text, nullable=False)
+    tag_text = db.Column(db.Text, nullable=False)
+
+class ResourceVersion(db.Model):
+    # Validators for conditional GETs: a counter per resource key (e.g.
+    # 'feedback:manager:3'), bumped in the same transaction as the writes
+    # that change what the resource's endpoints return.
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+# --- Schema ---
+
+def init_db():
+    """Create missing tables, then apply pending schema migrations."""
+    db.create_all()
+    return migrations.upgrade(db.engine)
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Create missing tables and apply pending schema migrations."""
+    applied = init_db()
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+
+# --- Stats rollup ---
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+STATS_COUNTERS = ('total',) + SENTIMENTS + ('acknowledged',)
+
+def _bump_counters(table, key, deltas):
+    """Add ``deltas`` to the row of ``table`` with primary key ``key`` (a
+    dict), creating the row if needed, inside the current transaction."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    where = db.and_(*(table.c[name] == value for name, value in key.items()))
+    update = table.update().where(where).values({table.c[name]: table.c[name] + delta for name, delta in deltas.items()})
+    if db.session.execute(update).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**key, **deltas))
+    except IntegrityError:
+        # Another transaction created the row first
+        db.session.execute(update)
+
+def _bump_counters_many(table, deltas):
+    """``_bump_counters`` for many rows: ``deltas`` maps each key (a tuple of
+    ``(column, value)`` pairs) to its deltas.  One executemany UPDATE, then
+    one multi-row INSERT for the keys that have no row yet."""
+    deltas = {key: {name: delta for name, delta in counter.items() if delta} for key, counter in deltas.items()}
+    # A fixed order, so concurrent writers lock shared rows in the same order
+    deltas = {key: counter for key, counter in sorted(deltas.items()) if counter}
+    if not deltas:
+        return
+    columns = [name for name, _ in next(iter(deltas))]
+    names = sorted({name for counter in deltas.values() for name in counter})
+    update = table.update().where(*(table.c[c] == db.bindparam(f"k_{c}") for c in columns)).values(
+        {table.c[name]: table.c[name] + db.bindparam(f"d_{name}") for name in names})
+    params = [{**{f"k_{c}": value for c, value in key}, **{f"d_{name}": counter.get(name, 0) for name in names}}
+              for key, counter in deltas.items()]
+    if db.session.execute(update, params).rowcount == len(params):
+        return
+    key_columns = [table.c[c] for c in columns]
+    existing = set(db.session.execute(db.select(*key_columns).where(
+        db.tuple_(*key_columns).in_([tuple(value for _, value in key) for key in deltas]))).all())
+    missing = [key for key in deltas if tuple(value for _, value in key) not in existing]
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert(), [
+                {**dict(key), **{name: deltas[key].get(name, 0) for name in names}} for key in missing])
+    except IntegrityError:
+        # Another transaction created some of the rows first
+        for key in missing:
+            _bump_counters(table, dict(key), deltas[key])
+
+def _bump_stats(user_id, scope, **deltas):
+    """Add ``deltas`` to a user's counters inside the current transaction."""
+    _bump_counters(FeedbackStats.__table__, {"user_id": user_id, "scope": scope}, deltas)
+
+def _sentiment_deltas(sentiment, sign):
+    deltas = {"total": sign}
+    if sentiment in SENTIMENTS:
+        deltas[sentiment] = sign
+    return deltas
+
+def record_feedback_stats(feedback, sign=1):
+    deltas = _sentiment_deltas(feedback.sentiment, sign)
+    _bump_stats(feedback.manager_id, 'manager', **deltas)
+    _bump_stats(feedback.employee_id, 'employee', **deltas)
+
+def record_feedback_stats_bulk(feedbacks):
+    # One UPDATE per affected user rather than two per feedback row
+    deltas = defaultdict(Counter)
+    for feedback in feedbacks:
+        for key in ((feedback.manager_id, 'manager'), (feedback.employee_id, 'employee')):
+            deltas[key].update(_sentiment_deltas(feedback.sentiment, 1))
+    for (user_id, scope), counter in deltas.items():
+        _bump_stats(user_id, scope, **counter)
+
+def _sentiment_change_deltas(old_sentiment, new_sentiment):
+    deltas = {}
+    if old_sentiment in SENTIMENTS:
+        deltas[old_sentiment] = -1
+    if new_sentiment in SENTIMENTS:
+        deltas[new_sentiment] = deltas.get(new_sentiment, 0) + 1
+    return deltas
+
+def record_sentiment_change(feedback, old_sentiment):
+    if old_sentiment == feedback.sentiment:
+        return
+    deltas = _sentiment_change_deltas(old_sentiment, feedback.sentiment)
+    _bump_stats(feedback.manager_id, 'manager', **deltas)
+    _bump_stats(feedback.employee_id, 'employee', **deltas)
+
+def get_stats(user_id, scope):
+    try:
+        stats = db.session.get(FeedbackStats, (int(user_id), scope))
+    except ValueError:
+        stats = None
+    return {name: getattr(stats, name) if stats else 0 for name in STATS_COUNTERS}
+
+def compute_feedback_stats(conn):
+    """Recompute every counter from the source tables.
+
+    One grouped aggregate per scope; returns ``{(user_id, scope): counters}``.
+    """
+    ack = Acknowledgement.__table__
+    archived = ArchivedFeedback.__table__
+    counts = {}
+    for feedback in (Feedback.__table__, archived):
+        sentiment_sums = [func.sum(case((feedback.c.sentiment == s, 1), else_=0)) for s in SENTIMENTS]
+        for scope, column in (('manager', feedback.c.manager_id), ('employee', feedback.c.employee_id)):
+            rows = conn.execute(db.select(column, func.count(), *sentiment_sums).group_by(column))
+            for user_id, total, *by_sentiment in rows:
+                counter = counts.setdefault((user_id, scope), dict.fromkeys(STATS_COUNTERS, 0))
+                for name, n in zip(STATS_COUNTERS, [total, *by_sentiment]):
+                    counter[name] += int(n)
+    rows = [*conn.execute(db.select(ack.c.employee_id, func.count()).group_by(ack.c.employee_id)),
+            *conn.execute(db.select(archived.c.employee_id, func.count()).where(
+                archived.c.acknowledged.is_(True)).group_by(archived.c.employee_id))]
+    for user_id, acknowledged in rows:
+        counts.setdefault((user_id, 'employee'), dict.fromkeys(STATS_COUNTERS, 0))["acknowledged"] += acknowledged
+    return counts
+
+def rebuild_feedback_stats(conn):
+    counts = compute_feedback_stats(conn)
+    table = FeedbackStats.__table__
+    conn.execute(table.delete())
+    if counts:
+        conn.execute(table.insert(), [
+            {"user_id": user_id, "scope": scope, **values}
+            for (user_id, scope), values in counts.items()
+        ])
+    return len(counts)
+
+def verify_feedback_stats(conn):
+    """Return ``[(user_id, scope, stored, expected)]`` for rows that drifted."""
+    expected = compute_feedback_stats(conn)
+    table = FeedbackStats.__table__
+    stored = {
+        (row.user_id, row.scope): {name: row[name] for name in STATS_COUNTERS}
+        for row in conn.execute(db.select(table)).mappings()
+    }
+    zero = dict.fromkeys(STATS_COUNTERS, 0)
+    drift = []
+    for user_id, scope in sorted(set(stored) | set(expected)):
+        have = stored.get((user_id, scope), zero)
+        want = expected.get((user_id, scope), zero)
+        if have != want:
+            drift.append((user_id, scope, have, want))
+    return drift
+
+@migrations.migration(2, "Backfill the feedback_stats rollup")
+def _backfill_feedback_stats(conn):
+    FeedbackStats.__table__.create(conn, checkfirst=True)
+    rebuild_feedback_stats(conn)
+
+@app.cli.command('stats-rebuild')
+def stats_rebuild_command():
+    """Recompute the feedback_stats rollup from scratch."""
+    with db.engine.begin() as conn:
+        rows = rebuild_feedback_stats(conn)
+    print(f"Rebuilt stats for {rows} user scopes")
+
+@app.cli.command('stats-verify')
+def stats_verify_command():
+    """Compare the feedback_stats rollup against the source tables."""
+    with db.engine.connect() as conn:
+        drift = verify_feedback_stats(conn)
+    for user_id, scope, stored, expected in drift:
+        print(f"{scope} {user_id}: stored {stored} expected {expected}")
+    print(f"{len(drift)} user scopes out of date" if drift else "Stats are consistent")
+    if drift:
+        raise SystemExit(1)
+
+
+# --- Sentiment trends ---
+
+def _feedback_trend_keys(feedback, tags=()):
+    # The timestamp is a server default, so a new row must be flushed first
+    return trends.trend_keys(feedback.timestamp.date(), feedback.manager_id, feedback.employee_id, tags)
+
+def _feedback_tag_names(feedback_id):
+    return list(db.session.scalars(db.select(Tag.tag_name).where(Tag.feedback_id == feedback_id)))
+
+def _bump_trends(keys, deltas):
+    """Add ``deltas`` to the trend row of every key, in one batch."""
+    summed = defaultdict(Counter)
+    for key in keys:
+        summed[tuple(key.items())].update(deltas)
+    _bump_counters_many(SentimentTrend.__table__, summed)
+
+def record_feedback_trends(feedback, tags=(), sign=1):
+    """Count ``feedback`` (with ``tags``) in, or with ``sign=-1`` out of, its buckets."""
+    _bump_trends(_feedback_trend_keys(feedback, tags), _sentiment_deltas(feedback.sentiment, sign))
+
+def record_feedback_trends_bulk(feedback_ids):
+    """Count newly inserted feedback, summing the deltas per bucket first."""
+    feedback, tag = Feedback.__table__, Tag.__table__
+    tags = defaultdict(list)
+    for feedback_id, name in db.session.execute(db.select(tag.c.feedback_id, tag.c.tag_name).where(
+            tag.c.feedback_id.in_(feedback_ids))):
+        tags[feedback_id].append(name)
+    deltas = defaultdict(Counter)
+    for row in db.session.execute(db.select(feedback.c.id, feedback.c.timestamp, feedback.c.manager_id,
+                                            feedback.c.employee_id, feedback.c.sentiment).where(
+            feedback.c.id.in_(feedback_ids))):
+        for key in trends.trend_keys(row.timestamp.date(), row.manager_id, row.employee_id, tags[row.id]):
+            deltas[tuple(key.items())].update(_sentiment_deltas(row.sentiment, 1))
+    _bump_counters_many(SentimentTrend.__table__, deltas)
+
+def record_trend_sentiment_change(feedback, old_sentiment):
+    if old_sentiment == feedback.sentiment:
+        return
+    _bump_trends(_feedback_trend_keys(feedback, _feedback_tag_names(feedback.id)),
+                 _sentiment_change_deltas(old_sentiment, feedback.sentiment))
+
+def record_tag_trends(feedback, tag_name, sign=1):
+    """Count ``feedback`` in, or out of, the buckets of one of its tags."""
+    _bump_trends(({**key, "tag_name": tag_name} for key in _feedback_trend_keys(feedback)
+                  if key["tag_name"] == trends.ALL_TAGS), _sentiment_deltas(feedback.sentiment, sign))
+
+def compute_sentiment_trends(conn):
+    """Recompute every trend row from the source tables.
+
+    The database does the heavy lifting with two grouped aggregates per
+    calendar day (one of them joined with the tags); the per-day groups are
+    then folded into week and month buckets.
+    """
+    feedback, tag = Feedback.__table__, Tag.__table__
+    day = func.date(feedback.c.timestamp)
+    group = (day, feedback.c.manager_id, feedback.c.employee_id, feedback.c.sentiment)
+    counts = defaultdict(Counter)
+    queries = (
+        db.select(*group, db.literal(trends.ALL_TAGS), func.count()).group_by(*group),
+        db.select(*group, tag.c.tag_name, func.count()).join(
+            tag, tag.c.feedback_id == feedback.c.id).group_by(*group, tag.c.tag_name),
+    )
+    for query in queries:
+        for day_value, manager_id, employee_id, sentiment, tag_name, n in conn.execute(query):
+            if day_value is None:
+                continue
+            for key in trends.trend_keys(trends.as_date(day_value), manager_id, employee_id):
+                key["tag_name"] = tag_name
+                counter = counts[tuple(key.values())]
+                counter["total"] += n
+                if sentiment in SENTIMENTS:
+                    counter[sentiment] += n
+    # Archived feedback keeps its tag names in the index row
+    archived = ArchivedFeedback.__table__
+    rows = conn.execute(db.select(func.date(archived.c.timestamp), archived.c.manager_id, archived.c.employee_id,
+                                  archived.c.sentiment, archived.c.tags))
+    for day_value, manager_id, employee_id, sentiment, tags in rows:
+        if day_value is None:
+            continue
+        tags = tags.split('\n') if tags else []
+        for key in trends.trend_keys(trends.as_date(day_value), manager_id, employee_id, tags):
+            counter = counts[tuple(key.values())]
+            counter["total"] += 1
+            if sentiment in SENTIMENTS:
+                counter[sentiment] += 1
+    return counts
+
+def rebuild_sentiment_trends(conn):
+    counts = compute_sentiment_trends(conn)
+    table = SentimentTrend.__table__
+    conn.execute(table.delete())
+    rows = [
+        {"period": period, "scope": scope, "user_id": user_id, "bucket": bucket, "tag_name": tag_name,
+         **{name: counter[name] for name in ("total", *SENTIMENTS)}}
+        for (period, scope, user_id, bucket, tag_name), counter in counts.items()
+    ]
+    for start in range(0, len(rows), 5000):
+        conn.execute(table.insert(), rows[start:start + 5000])
+    return len(rows)
+
+@migrations.migration(4, "Backfill the sentiment_trend rollup")
+def _backfill_sentiment_trends(conn):
+    SentimentTrend.__table__.create(conn, checkfirst=True)
+    rebuild_sentiment_trends(conn)
+
+@app.cli.command('trends-rebuild')
+def trends_rebuild_command():
+    """Recompute the sentiment_trend rollup from scratch."""
+    with db.engine.begin() as conn:
+        rows = rebuild_sentiment_trends(conn)
+    print(f"Rebuilt {rows} trend buckets")
+
+
+# --- Org hierarchy ---
+
+MAX_ORG_DEPTH = 64
+
+def _closure_deltas(manager_id, employee_id):
+    """Closure path counts contributed by the Team edge manager -> employee:
+    every ancestor of the manager (and the manager) reaches every descendant
+    of the employee (and the employee) through it."""
+    closure = OrgClosure.__table__
+    ancestors = [(manager_id, 0, 1), *db.session.execute(
+        db.select(closure.c.ancestor_id, closure.c.depth, closure.c.paths).where(
+            closure.c.descendant_id == manager_id))]
+    descendants = [(employee_id, 0, 1), *db.session.execute(
+        db.select(closure.c.descendant_id, closure.c.depth, closure.c.paths).where(
+            closure.c.ancestor_id == employee_id))]
+    deltas = Counter()
+    for ancestor_id, up, up_paths in ancestors:
+        for descendant_id, down, down_paths in descendants:
+            deltas[(ancestor_id, descendant_id, up + down + 1)] += up_paths * down_paths
+    return deltas
+
+def _apply_closure_deltas(deltas, sign):
+    closure = OrgClosure.__table__
+    ancestor_ids = {key[0] for key in deltas}
+    descendant_ids = {key[1] for key in deltas}
+    in_scope = (closure.c.ancestor_id.in_(ancestor_ids) & closure.c.descendant_id.in_(descendant_ids))
+    existing = set(db.session.execute(db.select(
+        closure.c.ancestor_id, closure.c.descendant_id, closure.c.depth).where(in_scope)))
+    updates = [{"a": a, "d": d, "depth_": depth, "n": sign * n}
+               for (a, d, depth), n in deltas.items() if (a, d, depth) in existing]
+    inserts = [{"ancestor_id": a, "descendant_id": d, "depth": depth, "paths": n}
+               for (a, d, depth), n in deltas.items() if (a, d, depth) not in existing]
+    if updates:
+        db.session.execute(closure.update().where(
+            (closure.c.ancestor_id == db.bindparam('a')) & (closure.c.descendant_id == db.bindparam('d'))
+            & (closure.c.depth == db.bindparam('depth_'))
+        ).values(paths=closure.c.paths + db.bindparam('n')), updates)
+    if sign > 0 and inserts:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(closure.insert(), inserts)
+        except IntegrityError:
+            # A concurrent roster change created some of the rows first
+            for row in inserts:
+                key = {name: row[name] for name in ("ancestor_id", "descendant_id", "depth")}
+                _bump_counters(closure, key, {"paths": row["paths"]})
+    if sign < 0:
+        db.session.execute(closure.delete().where(in_scope & (closure.c.paths <= 0)))
+
+def creates_cycle(manager_id, employee_id):
+    """Whether making ``employee_id`` report to ``manager_id`` closes a loop."""
+    closure = OrgClosure.__table__
+    return manager_id == employee_id or db.session.execute(db.select(closure.c.depth).where(
+        closure.c.ancestor_id == employee_id, closure.c.descendant_id == manager_id).limit(1)).first() is not None
+
+def link_org(manager_id, employee_id):
+    """Add the closure paths for a new Team edge (call before inserting it)."""
+    _apply_closure_deltas(_closure_deltas(manager_id, employee_id), 1)
+
+def unlink_org(manager_id, employee_id):
+    """Remove the closure paths of a Team edge (call after deleting it)."""
+    _apply_closure_deltas(_closure_deltas(manager_id, employee_id), -1)
+
+def org_subtree(user_id, max_depth=None):
+    """Subquery of ``(descendant_id, depth)`` under ``user_id``, each report
+    once at its shortest distance."""
+    closure = OrgClosure.__table__
+    query = db.select(closure.c.descendant_id, func.min(closure.c.depth).label('depth')).where(
+        closure.c.ancestor_id == user_id)
+    if max_depth is not None:
+        query = query.where(closure.c.depth <= max_depth)
+    return query.group_by(closure.c.descendant_id).subquery()
+
+def rebuild_org_closure(conn):
+    """Recompute the closure from Team one level at a time."""
+    closure, team = OrgClosure.__table__, Team.__table__
+    conn.execute(closure.delete())
+    conn.execute(closure.insert().from_select(
+        ['ancestor_id', 'descendant_id', 'depth', 'paths'],
+        db.select(team.c.manager_id, team.c.employee_id, db.literal(1), func.count()).where(
+            team.c.manager_id != team.c.employee_id).group_by(team.c.manager_id, team.c.employee_id)))
+    for depth in range(1, MAX_ORG_DEPTH):
+        level = db.select(
+            closure.c.ancestor_id, team.c.employee_id, db.literal(depth + 1), func.sum(closure.c.paths)
+        ).join(team, team.c.manager_id == closure.c.descendant_id).where(
+            closure.c.depth == depth).group_by(closure.c.ancestor_id, team.c.employee_id)
+        if not conn.execute(closure.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth', 'paths'], level)).rowcount:
+            break
+    return conn.execute(db.select(func.count()).select_from(closure)).scalar()
+
+@migrations.migration(5, "Build the org_closure hierarchy index")
+def _backfill_org_closure(conn):
+    OrgClosure.__table__.create(conn, checkfirst=True)
+    rebuild_org_closure(conn)
+
+@app.cli.command('org-rebuild')
+def org_rebuild_command():
+    """Recompute the org_closure table from team."""
+    with db.engine.begin() as conn:
+        rows = rebuild_org_closure(conn)
+    print(f"Rebuilt {rows} closure rows")
+
+
+# --- Team rosters ---
+
+def _roster_cycle(added, removed):
+    """A reporting line that would close a loop once ``added`` and
+    ``removed`` are applied, or None."""
+    if not added:
+        return None
+    managers = {manager_id for manager_id, _ in added}
+    if len(managers) == 1 and {manager_id for _, manager_id, _ in removed} <= managers:
+        # One manager's team changes.  A loop through a new line runs from
+        # the employee up to that manager without using any of the
+        # manager's own lines, so the closure as it stands answers it.
+        (manager_id,) = managers
+        employee_ids = {employee_id for _, employee_id in added}
+        if manager_id in employee_ids:
+            return manager_id, manager_id
+        closure = OrgClosure.__table__
+        ancestor_id = db.session.scalar(db.select(closure.c.ancestor_id).where(
+            closure.c.descendant_id == manager_id, closure.c.ancestor_id.in_(employee_ids)).limit(1))
+        return None if ancestor_id is None else (manager_id, ancestor_id)
+    removed_ids = {row_id for row_id, _, _ in removed}
+    edges = [(manager_id, employee_id) for row_id, manager_id, employee_id in db.session.execute(
+        db.select(Team.id, Team.manager_id, Team.employee_id)) if row_id not in removed_ids]
+    return find_cycle([*edges, *added])
+
+def _sync_rosters(desired, replace, dry_run):
+    team = Team.__table__
+    current = db.session.execute(db.select(team.c.id, team.c.manager_id, team.c.employee_id).where(
+        team.c.manager_id.in_(desired))).all() if desired else []
+    added, removed, unchanged = diff_rosters(current, desired, replace)
+    user_ids = {user_id for pair in added for user_id in pair}
+    unknown = user_ids - set(db.session.scalars(db.select(User.id).where(User.id.in_(user_ids)))) \
+        if user_ids else set()
+    if unknown:
+        raise RosterError(f"Unknown user ids: {', '.join(map(str, sorted(unknown)[:20]))}")
+    cycle = _roster_cycle(added, removed)
+    if cycle is not None:
+        raise RosterCycle(*cycle)
+    if dry_run or not (added or removed):
+        return added, removed, unchanged
+
+    removed_ids = [row_id for row_id, _, _ in removed]
+    for start in range(0, len(removed_ids), 1000):
+        db.session.execute(team.delete().where(team.c.id.in_(removed_ids[start:start + 1000])))
+    if len(added) + len(removed) > app.config['TEAM_SYNC_REBUILD_THRESHOLD']:
+        # Patching the closure costs a few queries per line; past a few
+        # hundred lines one level-by-level rebuild is cheaper
+        if added:
+            db.session.execute(team.insert(), [{"manager_id": m, "employee_id": e} for m, e in added])
+        rebuild_org_closure(db.session.connection())
+    else:
+        for _, manager_id, employee_id in removed:
+            unlink_org(manager_id, employee_id)
+        for manager_id, employee_id in added:
+            link_org(manager_id, employee_id)
+        if added:
+            db.session.execute(team.insert(), [{"manager_id": m, "employee_id": e} for m, e in added])
+    managers = sorted({manager_id for manager_id, _ in added} | {manager_id for _, manager_id, _ in removed})
+    bump_versions(*(f"team:{manager_id}" for manager_id in managers))
+    db.session.commit()
+    for manager_id in managers:
+        invalidate_team(manager_id)
+    return added, removed, unchanged
+
+def sync_rosters(desired, replace=True, dry_run=False):
+    """Make the team of each manager in ``desired`` (``{manager_id:
+    {employee_id, ...}}``) exactly that, or with ``replace=False`` only add
+    the missing lines, with one diff query and set-based writes in one
+    transaction.
+
+    Returns ``(added, removed, unchanged)`` as ``diff_rosters`` does, without
+    writing anything when ``dry_run``.  Raises ``RosterError`` for unknown
+    users and ``RosterCycle`` for a change that would close a loop.
+    """
+    try:
+        return _sync_rosters(desired, replace, dry_run)
+    except IntegrityError:
+        # A concurrent change added one of the lines first; diff again
+        db.session.rollback()
+        return _sync_rosters(desired, replace, dry_run)
+
+@migrations.migration(7, "Unique team reporting lines")
+def _team_uniqueness(conn):
+    team = Team.__table__
+    first = db.select(func.min(team.c.id)).group_by(team.c.manager_id, team.c.employee_id)
+    duplicates = list(conn.execute(db.select(team.c.id).where(team.c.id.not_in(first))).scalars())
+    for start in range(0, len(duplicates), 1000):
+        conn.execute(team.delete().where(team.c.id.in_(duplicates[start:start + 1000])))
+    migrations.create_index(conn, 'team', 'uq_team_manager_id_employee_id', 'manager_id', 'employee_id',
+                            unique=True)
+    migrations.drop_index(conn, 'team', 'ix_team_manager_id_employee_id')
+    if duplicates:
+        rebuild_org_closure(conn)
+
+
+# --- Search index ---
+
+def search_documents(conn, feedback_ids):
+    """``feedback_search`` rows for ``feedback_ids``; deleted ids are absent."""
+    feedback, comment, tag = Feedback.__table__, Comment.__table__, Tag.__table__
+    comments, tags = defaultdict(list), defaultdict(list)
+    for feedback_id, body in conn.execute(db.select(comment.c.feedback_id, comment.c.text).where(
+            comment.c.feedback_id.in_(feedback_ids)).order_by(comment.c.id)):
+        comments[feedback_id].append(body)
+    for feedback_id, name in conn.execute(db.select(tag.c.feedback_id, tag.c.tag_name).where(
+            tag.c.feedback_id.in_(feedback_ids)).order_by(tag.c.id)):
+        tags[feedback_id].append(name)
+    rows = conn.execute(db.select(feedback.c.id, feedback.c.manager_id, feedback.c.employee_id,
+                                  feedback.c.strengths, feedback.c.improvements).where(
+        feedback.c.id.in_(feedback_ids)))
+    return [{
+        "feedback_id": row.id,
+        "manager_id": row.manager_id,
+        "employee_id": row.employee_id,
+        **search.document(row.strengths, row.improvements, comments[row.id], tags[row.id]),
+    } for row in rows]
+
+def index_feedback(*feedback_ids):
+    """Rewrite the search rows of ``feedback_ids`` inside the current transaction."""
+    feedback_ids = {int(feedback_id) for feedback_id in feedback_ids}
+    db.session.flush()
+    documents = search_documents(db.session, feedback_ids)
+    table = SearchDocument.__table__
+    db.session.execute(table.delete().where(table.c.feedback_id.in_(feedback_ids)))
+    if documents:
+        db.session.execute(table.insert(), documents)
+    indexed = {doc["feedback_id"]: doc for doc in documents}
+    db.session.info.setdefault('search_changes', []).extend(
+        (feedback_id, indexed.get(feedback_id)) for feedback_id in feedback_ids)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _apply_search_changes(session):
+    changes = session.info.pop('search_changes', None)
+    if changes:
+        search_index.apply(changes)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_search_changes(session):
+    session.info.pop('search_changes', None)
+
+SEARCH_REBUILD_BATCH = 2000
+
+def rebuild_search_index(conn):
+    """Regenerate every ``feedback_search`` row from the source tables."""
+    table = SearchDocument.__table__
+    feedback = Feedback.__table__
+    conn.execute(table.delete())
+    last_id, total = 0, 0
+    while True:
+        ids = list(conn.execute(db.select(feedback.c.id).where(feedback.c.id > last_id).order_by(
+            feedback.c.id).limit(SEARCH_REBUILD_BATCH)).scalars())
+        if not ids:
+            return total
+        documents = search_documents(conn, ids)
+        conn.execute(table.insert(), documents)
+        last_id, total = ids[-1], total + len(documents)
+
+@migrations.migration(3, "Build the feedback full-text search index")
+def _build_search_index(conn):
+    SearchDocument.__table__.create(conn, checkfirst=True)
+    rebuild_search_index(conn)
+    search_index.install(conn)
+
+@app.cli.command('search-rebuild')
+def search_rebuild_command():
+    """Regenerate the search rows and (re)create the search index."""
+    with db.engine.begin() as conn:
+        SearchDocument.__table__.create(conn, checkfirst=True)
+        search_index.install(conn)
+        rows = rebuild_search_index(conn)
+    print(f"Indexed {rows} feedback")
+
+
+# --- Queries ---
+
+def feedback_reports(*filters, limit=None):
+    """Return report dicts (feedback plus both user names) in one joined query,
+    the oldest ``limit`` if given."""
+    employee = aliased(User)
+    manager = aliased(User)
+    rows = db.session.query(
+        Feedback.id, Feedback.timestamp, Feedback.strengths, Feedback.improvements,
+        employee.name.label('employee_name'), manager.name.label('manager_name')
+    ).join(
+        employee, Feedback.employee_id == employee.id
+    ).join(
+        manager, Feedback.manager_id == manager.id
+    ).filter(*filters).order_by(Feedback.timestamp, Feedback.id).limit(limit).all()
+    return [{
+        "id": row.id,
+        "employee_name": row.employee_name,
+        "manager_name": row.manager_name,
+        "date": row.timestamp.strftime('%Y-%m-%d'),
+        "strengths": row.strengths,
+        "improvements": row.improvements,
+    } for row in rows]
+
+def feedback_detail(feedback_id):
+    """Feedback with both user profiles from a single joined query, or None."""
+    employee = aliased(User)
+    manager = aliased(User)
+    row = db.session.query(
+        Feedback, employee.name, employee.email, manager.name, manager.email
+    ).join(
+        employee, Feedback.employee_id == employee.id
+    ).join(
+        manager, Feedback.manager_id == manager.id
+    ).filter(Feedback.id == feedback_id).first()
+    if not row:
+        return None
+    feedback, employee_name, employee_email, manager_name, manager_email = row
+    return {
+        "id": feedback.id,
+        "employee_id": feedback.employee_id,
+        "manager_id": feedback.manager_id,
+        "strengths": feedback.strengths,
+        "improvements": feedback.improvements,
+        "sentiment": feedback.sentiment,
+        "timestamp": feedback.timestamp,
+        "employee": {"name": employee_name, "email": employee_email},
+        "manager": {"name": manager_name, "email": manager_email}
+    }
+
+def comment_json(comment, user_name):
+    return {
+        "id": comment.id,
+        "user_id": comment.user_id,
+        "user_name": user_name,
+        "text": comment.text,
+        "is_markdown": comment.is_markdown,
+        "timestamp": comment.timestamp
+    }
+
+def tag_json(tag):
+    return {"id": tag.id, "tag_name": tag.tag_name}
+
+def acknowledgement_json(ack):
+    return {
+        "id": ack.id,
+        "employee_id": ack.employee_id,
+        "timestamp": ack.timestamp
+    }
+
+
+# --- Conditional requests ---
+
+def bump_versions(*keys):
+    """Advance the validators of ``keys`` inside the current transaction."""
+    keys = set(keys)
+    if not keys:
+        return
+    table = ResourceVersion.__table__
+    now = datetime.utcnow()
+    bump = table.update().values(version=table.c.version + 1, updated_at=now)
+    if db.session.execute(bump.where(table.c.key.in_(keys))).rowcount == len(keys):
+        return
+    existing = set(db.session.scalars(db.select(table.c.key).where(table.c.key.in_(keys))))
+    for key in keys - existing:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(key=key, version=1, updated_at=now))
+        except IntegrityError:
+            # Another transaction created the row first
+            db.session.execute(bump.where(table.c.key == key))
+
+def bump_feedback_versions(feedback):
+    """Validators covering one feedback: both owners' lists and its detail."""
+    bump_versions(f"feedback:manager:{feedback.manager_id}", f"feedback:employee:{feedback.employee_id}",
+                  f"feedback:{feedback.id}")
+
+def _resource_keys(templates, kwargs):
+    # '/api/team/05' and '/api/team/5' are the same resource
+    values = {name: int(value) if str(value).isdigit() else value for name, value in kwargs.items()}
+    return sorted(template.format(**values) for template in templates)
+
+def conditional(*key_templates):
+    """Answer ``If-None-Match``/``If-Modified-Since`` before running the view.
+
+    ``key_templates`` name the resource versions the response depends on,
+    formatted with the view arguments.  The query string (page, filters) is
+    part of the ETag, so each page and representation has its own.  The
+    validators are read before the view runs, so a write landing in between
+    only makes the ETag older than the body, never newer.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            keys = _resource_keys(key_templates, kwargs)
+            table = ResourceVersion.__table__
+            rows = {row.key: row for row in db.session.execute(
+                db.select(table.c.key, table.c.version, table.c.updated_at).where(table.c.key.in_(keys)))}
+            validator = ';'.join(f"{key}={rows[key].version}@{rows[key].updated_at}" if key in rows else key
+                                 for key in keys)
+            query = '&'.join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+            etag = hashlib.sha1(f"{validator}?{query}".encode()).hexdigest()[:20]
+            stamps = [row.updated_at for row in rows.values()]
+            last_modified = max(stamps) if stamps else None
+            # Last-Modified has one-second precision: a second write in the
+            # same second would not move it, so If-Modified-Since is only
+            # trusted when the newest change is on a whole second
+            exact = last_modified if last_modified and not last_modified.microsecond else None
+            if not is_resource_modified(request.environ, etag=etag, last_modified=exact):
+                response = Response(status=304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # Weak: the body may be compressed differently per client
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+# --- Cache invalidation ---
+
+def invalidate_team(manager_id):
+    # Called after the commit so a concurrent reader cannot re-cache the old roster
+    cache.delete(f"team:{manager_id}", f"team_members:{manager_id}")
+
+def cached(key, load):
+    """``cache.get_or_set`` with misses read from the primary: a replica that
+    has not yet applied the write behind an invalidation would put the old
+    value back for the whole TTL."""
+    def load_from_primary():
+        with db_router.primary():
+            return load()
+    return cache.get_or_set(key, load_from_primary)
+
+
+# --- Background jobs ---
+
+job_registry = JobRegistry()
+job_queue = JobQueue(Job.__table__, job_registry, engine=lambda: db.engine, context=app.app_context,
+                     result_dir=app.config['JOBS_RESULT_DIR'],
+                     lease_seconds=app.config['JOBS_LEASE_SECONDS'],
+                     max_attempts=app.config['JOBS_MAX_ATTEMPTS'],
+                     retry_backoff=app.config['JOBS_RETRY_BACKOFF_SECONDS'],
+                     result_ttl=app.config['JOBS_RESULT_TTL'])
+
+def _validate_feedback_pdf(params, auth):
+    try:
+        feedback_id = int(params['feedback_id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("feedback_id must be an integer")
+    if not can_view_feedback(feedback_id):
+        raise PermissionError
+    return {"feedback_id": feedback_id}
+
+@job_registry.register('feedback_pdf', concurrency=2, validate=_validate_feedback_pdf)
+def feedback_pdf_job(params, out):
+    reports = feedback_reports(Feedback.id == params['feedback_id']) or [archived_report(params['feedback_id'])]
+    if reports[0] is None:
+        raise LookupError("Feedback not found")
+    out.write(pdf_renderer.render(reports[0]))
+    return {"filename": f"feedback_{params['feedback_id']}.pdf", "mimetype": 'application/pdf'}
+
+_FILTER_PARAMS = ('manager_id', 'employee_id', 'sentiment', 'start', 'end')
+
+def _export_params(params, formats, auth):
+    # The job exports what its owner may see, whatever the filters say
+    output = params.get('format', formats[0])
+    if output not in formats:
+        raise ValueError(f"format must be one of {', '.join(formats)}")
+    params = {name: str(params[name]) for name in _FILTER_PARAMS if params.get(name)}
+    _feedback_filter_args(params)  # raises ValueError for bad filters
+    return {**params, "format": output, "viewer_id": auth.user_id}
+
+def _validate_pdf_batch(params, auth):
+    params = _export_params(params, ('zip', 'pdf'), auth)
+    if not _feedback_filter_args(params):
+        raise ValueError("Provide manager_id, employee_id or a start/end date range")
+    return params
+
+@job_registry.register('feedback_pdf_batch', concurrency=1, validate=_validate_pdf_batch)
+def feedback_pdf_batch_job(params, out):
+    reports = export_reports(params, params.get('viewer_id'))
+    if not reports:
+        raise LookupError("No feedback matches the filters")
+    if params['format'] == 'pdf':
+        out.write(pdf_renderer.render_merged(reports))
+        return {"filename": 'feedback_reports.pdf', "mimetype": 'application/pdf'}
+    for chunk in stream_zip(pdf_renderer, reports):
+        out.write(chunk)
+    return {"filename": 'feedback_reports.zip', "mimetype": 'application/zip'}
+
+@job_registry.register('feedback_export', concurrency=2,
+                       validate=lambda params, auth: _export_params(params, ('csv', 'ndjson'), auth))
+def feedback_export_job(params, out):
+    records = _export_rows(params, params.get('viewer_id'))
+    chunks = _export_csv(records) if params['format'] == 'csv' else _export_ndjson(records)
+    for chunk in chunks:
+        out.write(chunk.encode())
+    mimetype = 'text/csv' if params['format'] == 'csv' else 'application/x-ndjson'
+    return {"filename": f"feedback_export.{params['format']}", "mimetype": mimetype}
+
+def _rebuild_search(conn):
+    search_index.install(conn)
+    return rebuild_search_index(conn)
+
+# What a rollup_rebuild job can recompute; each matches a *-rebuild CLI command
+REBUILD_TARGETS = {
+    'stats': rebuild_feedback_stats,
+    'trends': rebuild_sentiment_trends,
+    'search': _rebuild_search,
+    'org': rebuild_org_closure,
+}
+
+def _validate_rebuild(params, auth):
+    if not is_ops(auth):
+        raise PermissionError
+    targets = params.get('targets') or sorted(REBUILD_TARGETS)
+    if not isinstance(targets, list) or not set(targets) <= set(REBUILD_TARGETS):
+        raise ValueError(f"targets must be a list drawn from {', '.join(sorted(REBUILD_TARGETS))}")
+    return {"targets": targets}
+
+@job_registry.register('rollup_rebuild', concurrency=1, roles=('Manager',), validate=_validate_rebuild)
+def rollup_rebuild_job(params, out):
+    summary = {}
+    for target in params['targets']:
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            rows = REBUILD_TARGETS[target](conn)
+        summary[target] = {"rows": rows, "seconds": round(time.perf_counter() - start, 3)}
+    out.write(app.json.dumps(summary).encode())
+    return {"filename": 'rebuild.json', "mimetype": 'application/json'}
+
+def submit_job(kind, params):
+    """Validate and queue a job for the current user; returns a response."""
+    job_kind = job_registry[kind]
+    if job_kind.roles and g.auth.role not in job_kind.roles:
+        return jsonify({"error": "Insufficient permissions"}), 403
+    try:
+        params = job_kind.validate(params, g.auth)
+    except PermissionError:
+        return forbidden()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if job_queue.pending_for(db.session, g.auth.user_id) >= app.config['JOBS_MAX_PENDING_PER_USER']:
+        response = jsonify({"error": "Too many jobs queued; wait for some to finish"})
+        response.status_code = 429
+        response.headers['Retry-After'] = '5'
+        return response
+    job = Job(**job_queue.submit(db.session, kind, params, owner_id=g.auth.user_id))
+    db.session.commit()
+    job_queue.start_threads(app.config['JOBS_WORKER_THREADS'])
+    job_queue.notify()
+    response = jsonify(job_json(job))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
+def job_json(job):
+    data = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": app.json.loads(job.params),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "expires_at": job.expires_at,
+    }
+    if job.status == 'succeeded':
+        data["result"] = {"url": f"/api/jobs/{job.id}/result", "filename": job.result_name,
+                          "mimetype": job.result_mimetype, "size": job.result_size}
+    return data
+
+@app.cli.command('jobs-worker')
+@click.option('--processes', default=1, help="worker processes")
+@click.option('--threads', default=1, help="worker threads per process")
+def jobs_worker_command(processes, threads):
+    """Run background job workers in the foreground."""
+    print(f"Running {processes} job worker process(es) x {threads} thread(s)")
+    job_queue.run_processes(processes, threads)
+
+
+# --- Acknowledgements and comments ---
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 100
+
+def _store_engagement(items):
+    feedback_ids = {values["feedback_id"] for _, values in items}
+    feedbacks = {row.id: row for row in db.session.execute(
+        db.select(Feedback.id, Feedback.manager_id, Feedback.employee_id).where(Feedback.id.in_(feedback_ids)))}
+    archived = set(db.session.scalars(db.select(ArchivedFeedback.feedback_id).where(
+        ArchivedFeedback.feedback_id.in_(feedback_ids - set(feedbacks))))) if feedback_ids - set(feedbacks) else set()
+    missing = {feedback_id: {"error": "Feedback is archived and read-only", "status": 409}
+               if feedback_id in archived else {"error": "Feedback not found", "status": 404}
+               for feedback_id in feedback_ids - set(feedbacks)}
+    acks = [(i, values) for i, (kind, values) in enumerate(items) if kind == 'ack']
+    comments = [(i, values) for i, (kind, values) in enumerate(items) if kind == 'comment']
+    results = [None] * len(items)
+
+    stored = set()
+    if acks:
+        stored = {tuple(row) for row in db.session.execute(
+            db.select(Acknowledgement.feedback_id, Acknowledgement.employee_id).where(
+                Acknowledgement.feedback_id.in_({v["feedback_id"] for _, v in acks}),
+                Acknowledgement.employee_id.in_({v["employee_id"] for _, v in acks})))}
+    new_acks = []
+    for i, values in acks:
+        pair = (values["feedback_id"], values["employee_id"])
+        if pair[0] in missing:
+            results[i] = dict(missing[pair[0]])
+        elif feedbacks[pair[0]].employee_id != pair[1]:
+            # Only the employee the feedback is about can acknowledge it
+            results[i] = {"error": "You are not allowed to do this", "status": 403}
+        elif pair in stored:
+            results[i] = {"created": False}
+        else:
+            stored.add(pair)
+            new_acks.append(values)
+            results[i] = {"created": True}
+
+    keys = {v["idempotency_key"] for _, v in comments if v.get("idempotency_key")}
+    known = {}
+    if keys:
+        known = {(c.user_id, c.idempotency_key): c for c in db.session.execute(
+            db.select(Comment.id, Comment.user_id, Comment.idempotency_key, Comment.feedback_id, Comment.text)
+            .where(Comment.idempotency_key.in_(keys)))}
+    new_comments = []
+    for i, values in comments:
+        key = (values["user_id"], values.get("idempotency_key"))
+        if values["feedback_id"] in missing:
+            results[i] = dict(missing[values["feedback_id"]])
+        elif key[1] and key in known:
+            previous = known[key]
+            if (previous.feedback_id, previous.text) != (values["feedback_id"], values["text"]):
+                results[i] = {"error": "Idempotency-Key was already used for a different comment", "status": 422}
+            else:
+                results[i] = {"created": False, "id": previous.id}
+        else:
+            comment = Comment(**values)
+            new_comments.append((i, comment))
+            if key[1]:
+                known[key] = comment
+
+    if new_acks:
+        db.session.execute(db.insert(Acknowledgement), new_acks)
+        for employee_id, count in Counter(values["employee_id"] for values in new_acks).items():
+            _bump_stats(employee_id, 'employee', acknowledged=count)
+        bump_versions(*{key for values in new_acks for key in (
+            f"feedback:employee:{values['employee_id']}", f"feedback:{values['feedback_id']}")})
+    if new_comments:
+        db.session.add_all([comment for _, comment in new_comments])
+        db.session.flush()
+        for i, comment in new_comments:
+            results[i] = {"created": True, "id": comment.id}
+        # A key repeated within the batch gets the comment its first use added
+        for i, values in comments:
+            if results[i] is not None and results[i].get("id", 0) is None:
+                results[i]["id"] = known[(values["user_id"], values["idempotency_key"])].id
+        commented = {comment.feedback_id for _, comment in new_comments}
+        bump_versions(*{key for feedback_id in commented for key in (f"comments:{feedback_id}", f"feedback:{feedback_id}")})
+        index_feedback(*commented)
+    db.session.commit()
+
+    for i, (kind, values) in enumerate(items):
+        if not results[i].get("created"):
+            continue
+        feedback = feedbacks[values["feedback_id"]]
+        if kind == 'ack':
+            event_bus.publish([feedback.manager_id], 'acknowledgement',
+                              {"feedback_id": feedback.id, "employee_id": values["employee_id"]})
+        else:
+            event_bus.publish({feedback.employee_id, feedback.manager_id} - {values["user_id"]}, 'comment',
+                              {"id": results[i]["id"], "feedback_id": feedback.id, "user_id": values["user_id"]})
+    return results
+
+def write_engagement(items):
+    """Store ``(kind, values)`` acknowledgements ('ack') and comments
+    ('comment') with one INSERT per table and one commit.
+
+    Returns one result per item: ``{"created": bool}`` (plus the comment
+    ``id``), or ``{"error": ..., "status": ...}``.  An acknowledgement that
+    exists, or a comment whose idempotency key was used before, is not
+    stored again.
+    """
+    try:
+        return _store_engagement(items)
+    except IntegrityError:
+        # A concurrent request stored one of these first; the second pass sees it
+        db.session.rollback()
+        return _store_engagement(items)
+
+engagement_buffer = None
+if app.config['WRITE_BUFFER_WINDOW_MS'] > 0:
+    engagement_buffer = WriteBuffer(write_engagement, window=app.config['WRITE_BUFFER_WINDOW_MS'] / 1000,
+                                    max_items=app.config['WRITE_BUFFER_MAX_ROWS'],
+                                    durability=app.config['WRITE_BUFFER_DURABILITY'],
+                                    timeout=app.config['WRITE_BUFFER_TIMEOUT_SECONDS'], context=app.app_context)
+    atexit.register(engagement_buffer.close)
+
+def save_engagement(kind, values):
+    """Write one item now, or through the write buffer when it is enabled
+    (None when the buffer answers before committing)."""
+    if engagement_buffer is None:
+        return write_engagement([(kind, values)])[0]
+    return engagement_buffer.submit((kind, values))
+
+@migrations.migration(6, "Unique acknowledgements and comment idempotency keys")
+def _engagement_uniqueness(conn):
+    ack = Acknowledgement.__table__
+    first = db.select(func.min(ack.c.id)).group_by(ack.c.feedback_id, ack.c.employee_id)
+    duplicates = list(conn.execute(db.select(ack.c.id).where(ack.c.id.not_in(first))).scalars())
+    for start in range(0, len(duplicates), 1000):
+        conn.execute(ack.delete().where(ack.c.id.in_(duplicates[start:start + 1000])))
+    migrations.create_index(conn, 'acknowledgement', 'uq_acknowledgement_employee_id_feedback_id',
+                            'employee_id', 'feedback_id', unique=True)
+    migrations.drop_index(conn, 'acknowledgement', 'ix_acknowledgement_employee_id_feedback_id')
+    migrations.add_column(conn, 'comment', Comment.__table__.c.idempotency_key.copy())
+    migrations.create_index(conn, 'comment', 'uq_comment_user_id_idempotency_key',
+                            'user_id', 'idempotency_key', unique=True)
+    if duplicates:
+        rebuild_feedback_stats(conn)
+
+
+# --- Cold archive ---
+
+ARCHIVE_ORDER = (ArchivedFeedback.timestamp, ArchivedFeedback.feedback_id)
+
+def _archive_candidates(before, limit):
+    # The newest row of each table stays hot, so no archived id is ever
+    # handed out again by a database that reuses the highest deleted id
+    newest = {db.session.scalar(db.select(Feedback.id).order_by(Feedback.id.desc()).limit(1))}
+    for model in (Comment, Tag, Acknowledgement):
+        newest.add(db.session.scalar(db.select(model.feedback_id).order_by(model.id.desc()).limit(1)))
+    newest.discard(None)
+    return list(db.session.scalars(db.select(Feedback.id).where(
+        Feedback.timestamp < before, Feedback.id.not_in(newest)
+    ).order_by(Feedback.employee_id, Feedback.timestamp, Feedback.id).limit(limit)))
+
+def _grouped(model, feedback_ids):
+    groups = defaultdict(list)
+    for row in model.query.filter(model.feedback_id.in_(feedback_ids)).order_by(model.id):
+        groups[row.feedback_id].append(row)
+    return groups
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def _archive_batch(feedback_ids):
+    feedbacks = Feedback.query.filter(Feedback.id.in_(feedback_ids)).order_by(
+        Feedback.employee_id, Feedback.timestamp, Feedback.id).all()
+    comments, tags, acks = (_grouped(model, feedback_ids) for model in (Comment, Tag, Acknowledgement))
+    records = [{
+        "id": f.id, "employee_id": f.employee_id, "manager_id": f.manager_id, "strengths": f.strengths,
+        "improvements": f.improvements, "sentiment": f.sentiment, "timestamp": _isoformat(f.timestamp),
+        "comments": [{"id": c.id, "user_id": c.user_id, "text": c.text, "is_markdown": c.is_markdown,
+                      "timestamp": _isoformat(c.timestamp), "idempotency_key": c.idempotency_key}
+                     for c in comments[f.id]],
+        "tags": [{"id": t.id, "tag_name": t.tag_name} for t in tags[f.id]],
+        "acknowledgements": [{"id": a.id, "employee_id": a.employee_id, "timestamp": _isoformat(a.timestamp)}
+                             for a in acks[f.id]],
+    } for f in feedbacks]
+    segment, locations = archive_store.write_segment(records, group_key=lambda record: record["employee_id"])
+    try:
+        db.session.execute(db.insert(ArchivedFeedback), [{
+            "feedback_id": f.id, "employee_id": f.employee_id, "manager_id": f.manager_id,
+            "timestamp": f.timestamp, "sentiment": f.sentiment,
+            "acknowledged": any(a.employee_id == f.employee_id for a in acks[f.id]),
+            "tags": '\n'.join(t.tag_name for t in tags[f.id]) or None,
+            "segment": segment, "offset": offset, "length": length, "position": position,
+        } for f, (offset, length, position) in zip(feedbacks, locations)])
+        # Stats keep counting archived feedback, and the acknowledgement of
+        # its own employee; anyone else's stays in the segment only.
+        for f in feedbacks:
+            for a in acks[f.id]:
+                if a.employee_id != f.employee_id:
+                    _bump_stats(a.employee_id, 'employee', acknowledged=-1)
+        ids = [f.id for f in feedbacks]
+        for model in (Acknowledgement, Comment, Tag):
+            model.query.filter(model.feedback_id.in_(ids)).delete(synchronize_session=False)
+        Feedback.query.filter(Feedback.id.in_(ids)).delete(synchronize_session=False)
+        index_feedback(*ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        archive_store.remove(segment)
+        raise
+    db.session.expunge_all()
+    return len(records), segment
+
+def archive_feedback(before, batch_size=None):
+    """Move feedback older than ``before`` to the cold archive, one segment
+    per batch.  Returns ``{"feedback": n, "segments": [...]}``."""
+    batch_size = batch_size or app.config['ARCHIVE_BATCH_SIZE']
+    archived, segments = 0, []
+    while True:
+        feedback_ids = _archive_candidates(before, batch_size)
+        if not feedback_ids:
+            return {"feedback": archived, "segments": segments}
+        n, segment = _archive_batch(feedback_ids)
+        archived += n
+        segments.append(segment)
+
+def archive_location(row):
+    return row.segment, row.offset, row.length, row.position
+
+def archived_records(rows):
+    """Segment records of ``ArchivedFeedback`` rows, by feedback id."""
+    records = archive_store.read_many([archive_location(row) for row in rows])
+    return {row.feedback_id: record for row, record in zip(rows, records)}
+
+def paginate_archive(query):
+    """``paginate`` over ``ArchivedFeedback`` index rows, newest first.
+
+    Without ``limit`` or ``after`` at most ARCHIVE_UNPAGED_LIMIT rows are
+    taken.  Returns ``(page, omitted)``, ``omitted`` being how many rows an
+    unpaged listing left out.
+    """
+    limit, _ = page_args()
+    if limit is not None:
+        return paginate(query, ARCHIVE_ORDER, descending=True), 0
+    cap = app.config['ARCHIVE_UNPAGED_LIMIT']
+    rows = query.order_by(*(column.desc() for column in ARCHIVE_ORDER)).limit(cap + 1).all()
+    if len(rows) <= cap:
+        return Page(rows, None, False), 0
+    return Page(rows[:cap], None, False), query.order_by(None).count() - cap
+
+def with_archived_text(items, rows):
+    """Fill in ``strengths`` and ``improvements`` of the archived ``items``
+    from the segments; ``rows`` are the ``ArchivedFeedback`` index rows read
+    for the listing.  Only the records of ``items`` are read, so a merged
+    page decodes no more than it returns."""
+    by_id = {row.feedback_id: row for row in rows}
+    records = archived_records([by_id[item["id"]] for item in items if item["id"] in by_id])
+    for item in items:
+        if item["id"] in records:
+            item["strengths"] = records[item["id"]]["strengths"]
+            item["improvements"] = records[item["id"]]["improvements"]
+    return items
+
+def archive_page_response(page, archived_rows, omitted):
+    response = page_response(page, with_archived_text(page.rows, archived_rows))
+    if omitted:
+        response.headers['X-Archived-Omitted'] = str(omitted)
+    return response
+
+def archived_feedback(feedback_id):
+    """``(index row, record)`` of an archived feedback, or None."""
+    try:
+        row = db.session.get(ArchivedFeedback, int(feedback_id))
+    except (TypeError, ValueError):
+        return None
+    if row is None:
+        return None
+    return row, archive_store.read(*archive_location(row))
+
+def is_archived(feedback_id):
+    try:
+        return db.session.get(ArchivedFeedback, int(feedback_id)) is not None
+    except (TypeError, ValueError):
+        return False
+
+def _record_rows(items):
+    # Segment records back as row-like objects for the *_json helpers
+    return [SimpleNamespace(**{**item, "timestamp": datetime.fromisoformat(item["timestamp"])})
+            if item.get("timestamp") else SimpleNamespace(**item) for item in items]
+
+def archived_detail(feedback_id, full=False):
+    """``feedback_detail`` (with comments, tags and acknowledgements when
+    ``full``) for archived feedback, or None."""
+    archived = archived_feedback(feedback_id)
+    if archived is None:
+        return None
+    row, record = archived
+    comments = _record_rows(record["comments"]) if full else []
+    users = {user.id: user for user in User.query.filter(
+        User.id.in_({row.employee_id, row.manager_id, *(c.user_id for c in comments)}))}
+    employee, manager = users.get(row.employee_id), users.get(row.manager_id)
+    if employee is None or manager is None:
+        return None
+    detail = {
+        "id": row.feedback_id,
+        "employee_id": row.employee_id,
+        "manager_id": row.manager_id,
+        "strengths": record["strengths"],
+        "improvements": record["improvements"],
+        "sentiment": row.sentiment,
+        "timestamp": row.timestamp,
+        "employee": {"name": employee.name, "email": employee.email},
+        "manager": {"name": manager.name, "email": manager.email}
+    }
+    if full:
+        acknowledgements = _record_rows(record["acknowledgements"])
+        detail["comments"] = [comment_json(c, users[c.user_id].name if c.user_id in users else None)
+                              for c in sorted(comments, key=lambda c: (c.timestamp is not None, c.timestamp, c.id))]
+        detail["tags"] = [tag_json(t) for t in _record_rows(record["tags"])]
+        detail["acknowledgements"] = [acknowledgement_json(a) for a in acknowledgements]
+        detail["acknowledged"] = row.acknowledged
+    return detail
+
+def archived_report(feedback_id):
+    """The ``feedback_reports`` dict of an archived feedback, or None."""
+    detail = archived_detail(feedback_id)
+    if detail is None:
+        return None
+    return {
+        "id": detail["id"],
+        "employee_name": detail["employee"]["name"],
+        "manager_name": detail["manager"]["name"],
+        "date": detail["timestamp"].strftime('%Y-%m-%d'),
+        "strengths": detail["strengths"],
+        "improvements": detail["improvements"],
+    }
+
+def archived_reports(*filters, limit=None):
+    """``feedback_reports`` for archived feedback, the oldest ``limit`` if given."""
+    employee = aliased(User)
+    manager = aliased(User)
+    rows = db.session.query(
+        ArchivedFeedback, employee.name.label('employee_name'), manager.name.label('manager_name')
+    ).join(
+        employee, ArchivedFeedback.employee_id == employee.id
+    ).join(
+        manager, ArchivedFeedback.manager_id == manager.id
+    ).filter(*filters).order_by(*ARCHIVE_ORDER).limit(limit).all()
+    records = archived_records([row.ArchivedFeedback for row in rows])
+    return [{
+        "id": row.ArchivedFeedback.feedback_id,
+        "employee_name": row.employee_name,
+        "manager_name": row.manager_name,
+        "date": row.ArchivedFeedback.timestamp.strftime('%Y-%m-%d'),
+        "strengths": records[row.ArchivedFeedback.feedback_id]["strengths"],
+        "improvements": records[row.ArchivedFeedback.feedback_id]["improvements"],
+    } for row in rows]
+
+def export_reports(args, viewer_id, limit=None):
+    """Reports of the archived and then the live feedback matching the
+    filters in ``args`` that ``viewer_id`` may see, at most ``limit``."""
+    reports = archived_reports(*_feedback_filter_args(args, ArchivedFeedback),
+                               visible_feedback(viewer_id, ArchivedFeedback), limit=limit)
+    if limit is not None and len(reports) >= limit:
+        return reports
+    return reports + feedback_reports(*_feedback_filter_args(args), visible_feedback(viewer_id),
+                                      limit=None if limit is None else limit - len(reports))
+
+def feedback_sort_key(item):
+    return item["timestamp"], item["id"]
+
+def _archive_before(days=None, before=None):
+    if before:
+        return datetime.combine(date.fromisoformat(before), datetime.min.time())
+    return datetime.utcnow() - timedelta(days=app.config['ARCHIVE_AFTER_DAYS'] if days is None else days)
+
+@app.cli.command('archive')
+@click.option('--days', type=int, default=None, help="archive feedback older than this (default ARCHIVE_AFTER_DAYS)")
+@click.option('--before', default=None, help="archive feedback given before this ISO date instead")
+def archive_command(days, before):
+    """Move old feedback to the cold archive."""
+    result = archive_feedback(_archive_before(days, before))
+    print(f"Archived {result['feedback']} feedback into {len(result['segments'])} segment(s)")
+
+@app.cli.command('archive-verify')
+def archive_verify_command():
+    """Check that every archived record can be read back."""
+    problems, checked = 0, 0
+    for row in ArchivedFeedback.query.order_by(ArchivedFeedback.segment, ArchivedFeedback.offset).yield_per(1000):
+        checked += 1
+        try:
+            if archive_store.read(*archive_location(row))["id"] != row.feedback_id:
+                raise ValueError("record holds another feedback")
+        except (OSError, ValueError, IndexError, KeyError) as e:
+            problems += 1
+            print(f"feedback {row.feedback_id} in {row.segment}: {e}")
+    indexed = set(db.session.scalars(db.select(ArchivedFeedback.segment).distinct()))
+    for segment in sorted(set(archive_store.segments()) - indexed):
+        print(f"{segment} is not referenced by the index")
+    print(f"Checked {checked} archived feedback, {problems} unreadable")
+
+def _validate_archive(params, auth):
+    if not is_ops(auth):
+        raise PermissionError
+    try:
+        days = int(params.get('days', app.config['ARCHIVE_AFTER_DAYS']))
+    except (TypeError, ValueError):
+        raise ValueError("days must be an integer")
+    if days < 1:
+        raise ValueError("days must be positive")
+    return {"days": days}
+
+@job_registry.register('feedback_archive', concurrency=1, roles=('Manager',), validate=_validate_archive)
+def feedback_archive_job(params, out):
+    result = archive_feedback(_archive_before(params['days']))
+    out.write(app.json.dumps(result).encode())
+    return {"filename": 'archive.json', "mimetype": 'application/json'}
+
+
+# --- Authentication ---
+
+def require_auth(*roles, query_token=False, ops=False):
+    """Require a valid bearer token, and one of ``roles`` if given.
+
+    The verified claims are available as ``g.auth`` (user_id, role).  With
+    ``query_token`` the token may also come as ``?access_token=``, for
+    clients such as EventSource that cannot set headers.  With ``ops`` the
+    user must also be listed in OPS_USER_IDS.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+            if not token and query_token and request.args.get('access_token'):
+                scheme, token = 'Bearer', request.args['access_token']
+            if scheme != 'Bearer' or not token:
+                return jsonify({"error": "Authentication required"}), 401
+            try:
+                g.auth = token_signer.verify(token)
+            except TokenError as e:
+                return jsonify({"error": str(e)}), 401
+            if (roles and g.auth.role not in roles) or (ops and not is_ops(g.auth)):
+                return forbidden()
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def forbidden():
+    return jsonify({"error": "You are not allowed to do this"}), 403
+
+def is_ops(auth):
+    return auth.user_id in app.config['OPS_USER_IDS']
+
+def is_org_root(user_id):
+    """Whether ``user_id`` heads the org chart: people report to them and
+    they report to nobody."""
+    closure = OrgClosure.__table__
+    def listed(column):
+        return db.session.scalar(db.select(column).where(column == user_id).limit(1)) is not None
+    return listed(closure.c.ancestor_id) and not listed(closure.c.descendant_id)
+
+def is_caller(user_id):
+    """Whether ``user_id``, as sent by the client, is the signed-in user."""
+    try:
+        return int(user_id) == g.auth.user_id
+    except (TypeError, ValueError):
+        return False
+
+def visible_users(user_ids, viewer_id):
+    """The ids in ``user_ids`` whose feedback, requests and stats
+    ``viewer_id`` may see: their own, and everyone under them in the org."""
+    user_ids = set(user_ids)
+    visible = user_ids & {viewer_id}
+    if user_ids - visible:
+        closure = OrgClosure.__table__
+        visible.update(db.session.scalars(db.select(closure.c.descendant_id).where(
+            closure.c.ancestor_id == viewer_id, closure.c.descendant_id.in_(user_ids - visible))))
+    return visible
+
+def reports_to(employee_ids, manager_id):
+    """The ids in ``employee_ids`` that report to ``manager_id``, directly
+    or further down."""
+    return visible_users(set(employee_ids), manager_id) - {manager_id}
+
+def can_view_user(user_id):
+    try:
+        return bool(visible_users({int(user_id)}, g.auth.user_id))
+    except (TypeError, ValueError):
+        return False
+
+def visible_feedback(viewer_id, model=Feedback):
+    """Filter for the feedback ``viewer_id`` may see: given or received by
+    them or by anyone under them.  ``model`` may be ``ArchivedFeedback``."""
+    below = db.select(OrgClosure.descendant_id).where(OrgClosure.ancestor_id == viewer_id)
+    return db.or_(model.employee_id == viewer_id, model.manager_id == viewer_id,
+                  model.employee_id.in_(below), model.manager_id.in_(below))
+
+def feedback_parties(feedback_id):
+    """``(employee_id, manager_id)`` of live or archived feedback, or None."""
+    try:
+        feedback_id = int(feedback_id)
+    except (TypeError, ValueError):
+        return None
+    row = db.session.execute(db.select(Feedback.employee_id, Feedback.manager_id).where(
+        Feedback.id == feedback_id)).first() or db.session.execute(db.select(
+            ArchivedFeedback.employee_id, ArchivedFeedback.manager_id).where(
+            ArchivedFeedback.feedback_id == feedback_id)).first()
+    return tuple(row) if row else None
+
+def can_view_feedback(feedback_id):
+    # Unknown feedback passes, so the view answers 404 as before
+    parties = feedback_parties(feedback_id)
+    return parties is None or bool(visible_users(parties, g.auth.user_id))
+
+def can_edit_feedback(feedback_id):
+    # Its manager, or anyone above them; None (so nobody) for unknown feedback
+    parties = feedback_parties(feedback_id)
+    if parties is None:
+        return None
+    return can_view_user(parties[1])
+
+def require_access(check, arg, not_found="Not found"):
+    """Answer 403 unless ``check`` passes for the URL argument ``arg``, or
+    404 with ``not_found`` when it returns None for a missing resource.
+
+    Goes between ``require_auth`` and ``conditional``, so nobody who may not
+    see a resource learns its validators from a 304.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            allowed = check(kwargs[arg])
+            if allowed is None:
+                return jsonify({"error": not_found}), 404
+            if not allowed:
+                return forbidden()
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
 
 # --- API Routes ---
 
@@ -83,23 +1863,42 @@ class Tag(db.Model):
 def index():
     return "<h1>Employee Feedback API</h1>"
 
-# Placeholder for login
+def _hasher_busy_response():
+    response = jsonify({"error": "The server is busy, please try again shortly"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
 @app.route('/api/login', methods=['POST'])
 def login():
-    # This is a dummy login. In a real app, you'd verify a username/password
-    # and return a token.
     data = request.json
     email = data.get('email')
     password = data.get('password')
 
-    # In a real app, you'd look up the user by email and check their password
     user = User.query.filter_by(email=email).first()
 
-    if user and check_password_hash(user.password, password):
-        # Dummy token
-        return jsonify({"token": f"dummy-token-for-{user.role}", "role": user.role, "user": {"name": user.name, "id": user.id}})
+    valid = False
+    try:
+        valid = bool(user and password and password_hasher.verify(user.password, password))
+        if valid and password_hasher.needs_rehash(user.password):
+            user.password = password_hasher.hash(password)
+            db.session.commit()
+    except HasherBusy:
+        db.session.rollback()
+        if not valid:
+            return _hasher_busy_response()
+        # Verified but the re-hash could not be queued; it will happen on a later login
+    if valid:
+        token = token_signer.issue(user.id, user.role)
+        return jsonify({"token": token, "role": user.role, "user": {"name": user.name, "id": user.id}})
     return jsonify({"error": "Invalid credentials"}), 401
 
+@app.route('/api/logout', methods=['POST'])
+@require_auth()
+def logout():
+    token_signer.revoke(g.auth)
+    return jsonify({"message": "Logged out"})
+
 @app.route('/api/register', methods=['POST'])
 def register():
     data = request.json
@@ -114,7 +1913,10 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"error": "Email address already in use"}), 409
 
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+    try:
+        hashed_password = password_hasher.hash(password)
+    except HasherBusy:
+        return _hasher_busy_response()
     new_user = User(name=name, email=email, password=hashed_password, role=role)
     
     try:
@@ -127,21 +1929,38 @@ def register():
     finally:
         db.session.close()
 
+    # Every user list may now include the new user, and a new employee is
+    # available to join any team.
+    cache.delete_prefix('users:')
+    cache.delete_prefix('team_members:')
+
     return jsonify({"message": "User created successfully"}), 201
 
 @app.route('/api/users', methods=['GET'])
+@require_auth()
 def get_users():
     role = request.args.get('role')
-    query = User.query
-    if role:
-        query = query.filter(User.role == role)
-    users = query.all()
-    return jsonify([
-        {"id": user.id, "name": user.name, "email": user.email, "role": user.role}
-        for user in users
-    ])
+    key = f"users:{role or '*'}:{request.args.get('limit', '')}:{request.args.get('after', '')}"
+    payload = cache.get(key)
+    if payload is None:
+        query = User.query
+        if role:
+            query = query.filter(User.role == role)
+        try:
+            # From the primary, like cached(): the list is shared until the next registration
+            with db_router.primary():
+                page = paginate(query, (User.id,))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        payload = page_payload(page, [
+            {"id": user.id, "name": user.name, "email": user.email, "role": user.role}
+            for user in page.rows
+        ])
+        cache.set(key, payload)
+    return jsonify(payload)
 
 @app.route('/api/team', methods=['POST'])
+@require_auth('Manager')
 def add_team_member():
     data = request.json
     manager_id = data.get('manager_id')
@@ -149,17 +1968,34 @@ def add_team_member():
 
     if not manager_id or not employee_id:
         return jsonify({"error": "Manager ID and Employee ID are required"}), 400
+    try:
+        manager_id, employee_id = int(manager_id), int(employee_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Manager ID and Employee ID must be integers"}), 400
+    if not can_view_user(manager_id):
+        return forbidden()
 
     existing = Team.query.filter_by(manager_id=manager_id, employee_id=employee_id).first()
     if existing:
         return jsonify({"error": "This team member relationship already exists"}), 409
+    if creates_cycle(manager_id, employee_id):
+        return jsonify({"error": "An employee cannot be added under someone who reports to them"}), 409
 
     new_team_member = Team(manager_id=manager_id, employee_id=employee_id)
+    link_org(manager_id, employee_id)
     db.session.add(new_team_member)
-    db.session.commit()
+    bump_versions(f"team:{manager_id}")
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request added the same line first
+        db.session.rollback()
+        return jsonify({"error": "This team member relationship already exists"}), 409
+    invalidate_team(manager_id)
     return jsonify({"message": "Team member added successfully", "id": new_team_member.id}), 201
 
 @app.route('/api/team', methods=['DELETE'])
+@require_auth('Manager')
 def remove_team_member():
     data = request.json
     manager_id = data.get('manager_id')
@@ -167,37 +2003,220 @@ def remove_team_member():
 
     if not manager_id or not employee_id:
         return jsonify({"error": "Manager ID and Employee ID are required"}), 400
+    try:
+        manager_id, employee_id = int(manager_id), int(employee_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Manager ID and Employee ID must be integers"}), 400
+    if not can_view_user(manager_id):
+        return forbidden()
 
     team_member = Team.query.filter_by(manager_id=manager_id, employee_id=employee_id).first()
     if not team_member:
         return jsonify({"error": "Team member relationship not found"}), 404
 
     db.session.delete(team_member)
+    db.session.flush()
+    unlink_org(manager_id, employee_id)
+    bump_versions(f"team:{manager_id}")
     db.session.commit()
+    invalidate_team(manager_id)
     return jsonify({"message": "Team member removed successfully"}), 200
 
-@app.route('/api/team/<manager_id>', methods=['GET'])
-def get_team(manager_id):
-    team_members = User.query.join(Team, User.id == Team.employee_id).filter(Team.manager_id == manager_id).all()
-    return jsonify([{"id": user.id, "name": user.name, "email": user.email} for user in team_members])
+def _roster_error(e):
+    if isinstance(e, RosterCycle):
+        return jsonify({"error": str(e), "manager_id": e.manager_id, "employee_id": e.employee_id}), 409
+    return jsonify({"error": str(e)}), 400
+
+@app.route('/api/team/<int:manager_id>/sync', methods=['PUT'])
+@require_auth('Manager')
+@require_access(can_view_user, 'manager_id')
+def sync_team(manager_id):
+    # Body: {"employee_ids": [...]}, the manager's whole team; anyone not
+    # listed is removed.  ?dry_run=1 reports the change without making it.
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        employee_ids = parse_team(request.get_json(silent=True))
+        if len(employee_ids) > app.config['TEAM_SYNC_MAX_EDGES']:
+            raise RosterError(f"At most {app.config['TEAM_SYNC_MAX_EDGES']} employees per request")
+        added, removed, unchanged = sync_rosters({manager_id: employee_ids}, dry_run=dry_run)
+    except RosterError as e:
+        return _roster_error(e)
+    return jsonify({
+        "manager_id": manager_id,
+        "added": [employee_id for _, employee_id in added],
+        "removed": [employee_id for _, _, employee_id in removed],
+        "unchanged": unchanged,
+        "dry_run": dry_run,
+    })
 
-@app.route('/api/team/members/<manager_id>', methods=['GET'])
+@app.route('/api/team/import', methods=['POST'])
+@require_auth('Manager')
+def import_teams():
+    # Body: CSV (Content-Type text/csv, manager_id,employee_id header) or
+    # JSON, see roster.py.  ?mode=replace (the default) makes each listed
+    # manager's team exactly the listed employees; ?mode=add only adds
+    # missing lines.  ?dry_run=1 reports the change without making it.
+    mode = request.args.get('mode', 'replace')
+    if mode not in ('replace', 'add'):
+        return jsonify({"error": "mode must be replace or add"}), 400
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        rosters = parse_roster(request.get_data(), request.mimetype)
+        if sum(len(employee_ids) for employee_ids in rosters.values()) > app.config['TEAM_SYNC_MAX_EDGES']:
+            raise RosterError(f"At most {app.config['TEAM_SYNC_MAX_EDGES']} reporting lines per import")
+        others = rosters.keys() - visible_users(rosters, g.auth.user_id)
+        if others:
+            return jsonify({"error": "You can only change your own team and the teams under you",
+                            "manager_ids": sorted(others)}), 403
+        added, removed, unchanged = sync_rosters(rosters, replace=mode == 'replace', dry_run=dry_run)
+    except RosterError as e:
+        return _roster_error(e)
+    return jsonify({
+        "managers": len(rosters),
+        "added": [{"manager_id": m, "employee_id": e} for m, e in added],
+        "removed": [{"manager_id": m, "employee_id": e} for _, m, e in removed],
+        "unchanged": unchanged,
+        "dry_run": dry_run,
+    })
+
+@app.route('/api/team/<int:manager_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'manager_id')
+@conditional("team:{manager_id}")
+def get_team(manager_id):
+    def load():
+        team_members = User.query.join(Team, User.id == Team.employee_id).filter(Team.manager_id == manager_id).all()
+        return [{"id": user.id, "name": user.name, "email": user.email} for user in team_members]
+    return jsonify(cached(f"team:{manager_id}", load))
+
+@app.route('/api/team/members/<int:manager_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'manager_id')
 def get_team_members(manager_id):
-    # Subquery to get IDs of employees already in the manager's team
-    subquery = db.session.query(Team.employee_id).filter(Team.manager_id == manager_id).subquery()
-    
-    # Query for users who are not in the subquery (i.e., not on the team) and are not managers
-    available_employees = User.query.filter(
-        User.id.notin_(subquery),
-        User.role != 'Manager'
-    ).all()
-    
-    return jsonify([
-        {"id": user.id, "name": user.name, "email": user.email}
-        for user in available_employees
+    def load():
+        # Anti-join: non-managers with no Team row under this manager.  The
+        # (manager_id, employee_id) index answers each probe, where NOT IN
+        # materialised the team and could not use an index on MySQL.
+        available_employees = User.query.outerjoin(
+            Team, (Team.employee_id == User.id) & (Team.manager_id == manager_id)
+        ).filter(
+            Team.id.is_(None),
+            User.role != 'Manager'
+        ).all()
+
+        return [
+            {"id": user.id, "name": user.name, "email": user.email}
+            for user in available_employees
+        ]
+    return jsonify(cached(f"team_members:{manager_id}", load))
+
+def _max_depth_arg():
+    max_depth = request.args.get('max_depth')
+    if max_depth is None:
+        return None
+    max_depth = int(max_depth)
+    if max_depth < 1:
+        raise ValueError("max_depth must be positive")
+    return max_depth
+
+@app.route('/api/org/<int:user_id>/reports', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'user_id')
+def get_org_reports(user_id):
+    # Everyone under user_id (direct reports at depth 1, skip-levels below),
+    # optionally limited with ?max_depth=
+    try:
+        subtree = org_subtree(user_id, _max_depth_arg())
+        page = paginate(db.session.query(User, subtree.c.depth).join(
+            subtree, subtree.c.descendant_id == User.id), (User.id,))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return page_response(page, [
+        {"id": user.id, "name": user.name, "email": user.email, "role": user.role, "depth": depth}
+        for user, depth in page.rows
     ])
 
+@app.route('/api/org/<int:user_id>/feedback', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'user_id')
+def get_org_feedback(user_id):
+    # Feedback received by anyone under user_id, newest first
+    employee = aliased(User)
+    manager = aliased(User)
+    try:
+        subtree = org_subtree(user_id, _max_depth_arg())
+        query = db.session.query(
+            Feedback, employee.name.label('employee_name'), manager.name.label('manager_name')
+        ).join(
+            employee, Feedback.employee_id == employee.id
+        ).join(
+            manager, Feedback.manager_id == manager.id
+        ).filter(Feedback.employee_id.in_(db.select(subtree.c.descendant_id)))
+        archived_query = db.session.query(
+            ArchivedFeedback, employee.name.label('employee_name'), manager.name.label('manager_name')
+        ).join(
+            employee, ArchivedFeedback.employee_id == employee.id
+        ).join(
+            manager, ArchivedFeedback.manager_id == manager.id
+        ).filter(ArchivedFeedback.employee_id.in_(db.select(subtree.c.descendant_id)))
+        page = paginate(query, (Feedback.timestamp, Feedback.id), descending=True)
+        archived_page, omitted = paginate_archive(archived_query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    items = [{
+        "id": row.Feedback.id,
+        "employee_id": row.Feedback.employee_id,
+        "employee_name": row.employee_name,
+        "manager_id": row.Feedback.manager_id,
+        "manager_name": row.manager_name,
+        "sentiment": row.Feedback.sentiment,
+        "strengths": row.Feedback.strengths,
+        "improvements": row.Feedback.improvements,
+        "timestamp": row.Feedback.timestamp,
+    } for row in page.rows] + [{
+        "id": row.ArchivedFeedback.feedback_id,
+        "employee_id": row.ArchivedFeedback.employee_id,
+        "employee_name": row.employee_name,
+        "manager_id": row.ArchivedFeedback.manager_id,
+        "manager_name": row.manager_name,
+        "sentiment": row.ArchivedFeedback.sentiment,
+        "strengths": None,
+        "improvements": None,
+        "timestamp": row.ArchivedFeedback.timestamp,
+    } for row in archived_page.rows]
+    page = merge_pages(page, archived_page, items, feedback_sort_key, descending=True)
+    return archive_page_response(page, [row.ArchivedFeedback for row in archived_page.rows], omitted)
+
+@app.route('/api/org/<int:user_id>/stats', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'user_id')
+def get_org_stats(user_id):
+    # Feedback received across the subtree, per level and in total, summed
+    # from the per-employee counters in one grouped query
+    try:
+        subtree = org_subtree(user_id, _max_depth_arg())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    stats = FeedbackStats.__table__
+    rows = db.session.execute(db.select(
+        subtree.c.depth, func.count().label('headcount'),
+        *(func.coalesce(func.sum(stats.c[name]), 0).label(name) for name in STATS_COUNTERS),
+    ).select_from(subtree).outerjoin(
+        stats, (stats.c.user_id == subtree.c.descendant_id) & (stats.c.scope == 'employee')
+    ).group_by(subtree.c.depth).order_by(subtree.c.depth)).all()
+    levels = [{"depth": row.depth, "headcount": row.headcount,
+               **{name: int(getattr(row, name)) for name in STATS_COUNTERS}} for row in rows]
+    totals = {name: sum(level[name] for level in levels) for name in ("headcount",) + STATS_COUNTERS}
+    return jsonify({
+        **totals,
+        "acknowledgement_rate": round(totals["acknowledged"] / totals["total"] * 100, 2) if totals["total"] else 0,
+        "by_depth": levels,
+    })
+
 @app.route('/api/feedback/employee/<employee_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'employee_id')
+@conditional("feedback:employee:{employee_id}")
 def get_employee_feedback(employee_id):
     feedback_with_managers = db.session.query(
         Feedback,
@@ -206,13 +2225,27 @@ def get_employee_feedback(employee_id):
         User, Feedback.manager_id == User.id
     ).filter(
         Feedback.employee_id == employee_id
-    ).order_by(
-        Feedback.timestamp.desc()
-    ).all()
+    )
+    archived_with_managers = db.session.query(
+        ArchivedFeedback,
+        User.name.label('manager_name')
+    ).join(
+        User, ArchivedFeedback.manager_id == User.id
+    ).filter(
+        ArchivedFeedback.employee_id == employee_id
+    )
+    try:
+        page = paginate(feedback_with_managers, (Feedback.timestamp, Feedback.id), descending=True)
+        archived_page, omitted = paginate_archive(archived_with_managers)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    acknowledged_ids = {ack.feedback_id for ack in Acknowledgement.query.filter_by(employee_id=employee_id).all()}
+    acks = Acknowledgement.query.filter_by(employee_id=employee_id)
+    if page.paged:
+        acks = acks.filter(Acknowledgement.feedback_id.in_([feedback.id for feedback, _ in page.rows]))
+    acknowledged_ids = {ack.feedback_id for ack in acks.all()}
 
-    return jsonify([
+    items = [
         {
             "id": feedback.id,
             "manager_id": feedback.manager_id,
@@ -222,66 +2255,315 @@ def get_employee_feedback(employee_id):
             "sentiment": feedback.sentiment,
             "timestamp": feedback.timestamp,
             "acknowledged": feedback.id in acknowledged_ids
-        } for feedback, manager_name in feedback_with_managers
-    ])
+        } for feedback, manager_name in page.rows
+    ] + [
+        {
+            "id": archived.feedback_id,
+            "manager_id": archived.manager_id,
+            "manager_name": manager_name,
+            "strengths": None,
+            "improvements": None,
+            "sentiment": archived.sentiment,
+            "timestamp": archived.timestamp,
+            "acknowledged": archived.acknowledged
+        } for archived, manager_name in archived_page.rows
+    ]
+    page = merge_pages(page, archived_page, items, feedback_sort_key, descending=True)
+    return archive_page_response(page, [archived for archived, _ in archived_page.rows], omitted)
+
+@app.route('/api/feedback/search', methods=['GET'])
+@require_auth()
+def search_feedback():
+    """Ranked full-text search over feedback text, comments and tags.
+
+    ``?q=`` is required; ``manager_id``/``employee_id`` narrow the scope and
+    ``limit``/``offset`` page through the ranking.  The scope must name
+    someone the caller may see; without one a manager searches the feedback
+    they gave and an employee the feedback they received.
+    """
+    terms = search.query_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({"error": "q must contain at least one word"}), 400
+    try:
+        manager_id = request.args.get('manager_id', type=int)
+        employee_id = request.args.get('employee_id', type=int)
+        limit = int(request.args.get('limit', 20))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if not 1 <= limit <= app.config['SEARCH_MAX_LIMIT'] or not 0 <= offset <= 1000:
+        return jsonify({"error": f"limit must be 1-{app.config['SEARCH_MAX_LIMIT']} and offset 0-1000"}), 400
+    if manager_id is None and employee_id is None:
+        if g.auth.role == 'Manager':
+            manager_id = g.auth.user_id
+        else:
+            employee_id = g.auth.user_id
+    elif not visible_users({i for i in (manager_id, employee_id) if i is not None}, g.auth.user_id):
+        return forbidden()
+
+    hits = search_index.search(db.session, terms, manager_id=manager_id, employee_id=employee_id,
+                               limit=limit, offset=offset)
+    employee = aliased(User)
+    manager = aliased(User)
+    rows = db.session.query(
+        Feedback, employee.name.label('employee_name'), manager.name.label('manager_name')
+    ).join(
+        employee, Feedback.employee_id == employee.id
+    ).join(
+        manager, Feedback.manager_id == manager.id
+    ).filter(Feedback.id.in_([feedback_id for feedback_id, _ in hits])).all()
+    by_id = {row.Feedback.id: row for row in rows}
+    results = [{
+        "id": feedback_id,
+        "employee_id": by_id[feedback_id].Feedback.employee_id,
+        "employee_name": by_id[feedback_id].employee_name,
+        "manager_id": by_id[feedback_id].Feedback.manager_id,
+        "manager_name": by_id[feedback_id].manager_name,
+        "sentiment": by_id[feedback_id].Feedback.sentiment,
+        "strengths": by_id[feedback_id].Feedback.strengths,
+        "improvements": by_id[feedback_id].Feedback.improvements,
+        "timestamp": by_id[feedback_id].Feedback.timestamp,
+        "score": round(score, 6),
+    } for feedback_id, score in hits if feedback_id in by_id]
+    # Archived feedback is not indexed; say how much of the scope that leaves out
+    scope = [column == value for column, value in ((ArchivedFeedback.manager_id, manager_id),
+                                                   (ArchivedFeedback.employee_id, employee_id)) if value is not None]
+    return jsonify({
+        "query": ' '.join(terms),
+        "results": results,
+        "next_offset": offset + limit if len(hits) == limit else None,
+        "archived_not_searched": db.session.scalar(
+            db.select(func.count()).select_from(ArchivedFeedback).where(*scope)),
+    })
 
 @app.route('/api/feedback/<feedback_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_feedback, 'feedback_id')
+@conditional("feedback:{feedback_id}")
 def get_feedback(feedback_id):
-    feedback = Feedback.query.get(feedback_id)
-    if not feedback:
+    detail = feedback_detail(feedback_id) or archived_detail(feedback_id)
+    if not detail:
         return jsonify({"error": "Feedback not found"}), 404
-    
-    employee = User.query.get(feedback.employee_id)
-    manager = User.query.get(feedback.manager_id)
-    
-    return jsonify({
-        "id": feedback.id,
-        "employee_id": feedback.employee_id,
-        "manager_id": feedback.manager_id,
-        "strengths": feedback.strengths,
-        "improvements": feedback.improvements,
-        "sentiment": feedback.sentiment,
-        "timestamp": feedback.timestamp,
-        "employee": {"name": employee.name, "email": employee.email},
-        "manager": {"name": manager.name, "email": manager.email}
-    })
+    return jsonify(detail)
+
+@app.route('/api/feedback/<feedback_id>/full', methods=['GET'])
+@require_auth()
+@require_access(can_view_feedback, 'feedback_id')
+@conditional("feedback:{feedback_id}", "comments:{feedback_id}")
+def get_feedback_full(feedback_id):
+    # Everything the feedback detail view needs in one response: the
+    # feedback with both users, comments, tags and acknowledgements.
+    # Four queries regardless of how many comments or tags there are.
+    detail = feedback_detail(feedback_id)
+    if not detail:
+        detail = archived_detail(feedback_id, full=True)
+        if not detail:
+            return jsonify({"error": "Feedback not found"}), 404
+        return jsonify(detail)
+
+    comments = db.session.query(
+        Comment,
+        User.name.label('user_name')
+    ).join(
+        User, Comment.user_id == User.id
+    ).filter(
+        Comment.feedback_id == detail["id"]
+    ).order_by(
+        Comment.timestamp.asc(), Comment.id.asc()
+    ).all()
+    tags = Tag.query.filter_by(feedback_id=detail["id"]).all()
+    acknowledgements = Acknowledgement.query.filter_by(feedback_id=detail["id"]).all()
+
+    detail["comments"] = [comment_json(comment, user_name) for comment, user_name in comments]
+    detail["tags"] = [tag_json(t) for t in tags]
+    detail["acknowledgements"] = [acknowledgement_json(a) for a in acknowledgements]
+    detail["acknowledged"] = any(a.employee_id == detail["employee_id"] for a in acknowledgements)
+    return jsonify(detail)
 
 @app.route('/api/feedback', methods=['POST'])
+@require_auth('Manager')
 def submit_feedback():
-    data = request.json
+    try:
+        values, _ = validate_feedback(request.get_json(silent=True))
+    except RowError as e:
+        return jsonify({"error": str(e)}), 400
+    if not is_caller(values['manager_id']):
+        return forbidden()
+    if not reports_to({values['employee_id']}, values['manager_id']):
+        return jsonify({"error": "employee_id does not report to manager_id"}), 403
     new_feedback = Feedback(
-        employee_id=data['employee_id'],
-        manager_id=data['manager_id'],
-        strengths=data['strengths'],
-        improvements=data['improvements'],
-        sentiment=data['sentiment']
+        employee_id=values['employee_id'],
+        manager_id=values['manager_id'],
+        strengths=values['strengths'],
+        improvements=values['improvements'],
+        sentiment=values['sentiment']
     )
     db.session.add(new_feedback)
+    record_feedback_stats(new_feedback)
+    bump_versions(f"feedback:manager:{new_feedback.manager_id}", f"feedback:employee:{new_feedback.employee_id}")
+    db.session.flush()
+    record_feedback_trends(new_feedback)
+    index_feedback(new_feedback.id)
     db.session.commit()
+    event_bus.publish([new_feedback.employee_id], 'feedback',
+                      {"id": new_feedback.id, "manager_id": new_feedback.manager_id,
+                       "sentiment": new_feedback.sentiment})
     return jsonify({"message": "Feedback submitted successfully", "id": new_feedback.id}), 201
 
+def _ingest_batch(batch, manager_id):
+    """Validate and insert one batch of uploaded rows in one transaction.
+
+    ``batch`` is a list of ``(index, obj, error)``; rows must be given by
+    ``manager_id``.  Returns one result dict per row.
+    """
+    results = {}
+    valid = []
+    for index, obj, error in batch:
+        try:
+            if error:
+                raise error
+            values, tags = validate_feedback(obj)
+            if values['manager_id'] != manager_id:
+                raise RowError("manager_id must be the signed-in user")
+        except RowError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            continue
+        valid.append((index, values, tags))
+
+    user_ids = {v[field] for _, v, _ in valid for field in ('employee_id', 'manager_id')}
+    known = set(db.session.scalars(db.select(User.id).where(User.id.in_(user_ids)))) if user_ids else set()
+    reports = reports_to({v['employee_id'] for _, v, _ in valid}, manager_id) if valid else set()
+    rows = []
+    for index, values, tags in valid:
+        missing = [f for f in ('employee_id', 'manager_id') if values[f] not in known]
+        if missing:
+            results[index] = {"index": index, "status": "error", "error": f"Unknown {' and '.join(missing)}"}
+        elif values['employee_id'] not in reports:
+            results[index] = {"index": index, "status": "error", "error": "employee_id does not report to manager_id"}
+        else:
+            rows.append((index, Feedback(**values), tags))
+
+    if rows:
+        try:
+            feedbacks = [feedback for _, feedback, _ in rows]
+            # The ORM batches these into multi-row INSERTs (RETURNING the new
+            # ids where the database supports it); tags need those ids.
+            db.session.add_all(feedbacks)
+            db.session.flush()
+            new_ids = [feedback.id for feedback in feedbacks]
+            tag_rows = [{"feedback_id": feedback_id, "tag_name": name}
+                        for feedback_id, (_, _, tags) in zip(new_ids, rows) for name in tags]
+            if tag_rows:
+                db.session.execute(db.insert(Tag), tag_rows)
+            record_feedback_stats_bulk(feedbacks)
+            record_feedback_trends_bulk(new_ids)
+            bump_versions(*{f"feedback:{scope}:{getattr(feedback, scope + '_id')}"
+                            for feedback in feedbacks for scope in ('manager', 'employee')})
+            index_feedback(*new_ids)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            for index, _, _ in rows:
+                results[index] = {"index": index, "status": "error", "error": "Database error; batch rolled back"}
+        else:
+            for (index, _, _), feedback_id in zip(rows, new_ids):
+                results[index] = {"index": index, "status": "created", "id": feedback_id}
+        db.session.expunge_all()
+    return [results[index] for index, _, _ in batch]
+
+@app.route('/api/feedback/bulk', methods=['POST'])
+@require_auth('Manager')
+def bulk_submit_feedback():
+    # Body: NDJSON (Content-Type application/x-ndjson) or a JSON array of
+    # feedback objects with optional "tags" and "timestamp" (converted to
+    # UTC when it has an offset), each about someone under the caller.
+    # Rows are parsed from the stream, inserted batch by batch and reported
+    # back as they are committed, so memory stays flat for any payload size.
+    try:
+        batch_size = int(request.args.get('batch_size', app.config['BULK_INSERT_BATCH_SIZE']))
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    batch_size = max(1, min(batch_size, app.config['BULK_INSERT_MAX_BATCH_SIZE']))
+    ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+    rows = iter_ndjson(request.stream) if ndjson else iter_json_array(request.stream)
+    manager_id = g.auth.user_id
+
+    def generate():
+        counts = Counter()
+        stream_error = []
+
+        def indexed():
+            # Stop at a parse error but still insert the rows read before it
+            try:
+                for i, (obj, error) in enumerate(rows):
+                    yield i, obj, error
+            except StreamError as e:
+                stream_error.append(str(e))
+
+        yield '{"results":['
+        separator = ''
+        for batch in batched(indexed(), batch_size):
+            for result in _ingest_batch(batch, manager_id):
+                counts[result["status"]] += 1
+                yield separator + app.json.dumps(result)
+                separator = ','
+        yield ']'
+        if stream_error:
+            yield f',"error":{app.json.dumps(stream_error[0])}'
+        yield f',"created":{counts["created"]},"failed":{counts["error"]}}}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 @app.route('/api/feedback/<feedback_id>', methods=['PUT'])
+@require_auth('Manager')
+@require_access(can_edit_feedback, 'feedback_id', not_found="Feedback not found")
 def edit_feedback(feedback_id):
     data = request.json
     feedback = Feedback.query.get(feedback_id)
     if feedback:
+        old_sentiment = feedback.sentiment
         feedback.strengths = data.get('strengths', feedback.strengths)
         feedback.improvements = data.get('improvements', feedback.improvements)
         feedback.sentiment = data.get('sentiment', feedback.sentiment)
+        record_sentiment_change(feedback, old_sentiment)
+        record_trend_sentiment_change(feedback, old_sentiment)
+        bump_feedback_versions(feedback)
+        index_feedback(feedback.id)
         db.session.commit()
         return jsonify({"message": "Feedback updated successfully"})
+    if is_archived(feedback_id):
+        return jsonify({"error": "Feedback is archived and read-only"}), 409
     return jsonify({"error": "Feedback not found"}), 404
 
 @app.route('/api/feedback/<feedback_id>', methods=['DELETE'])
+@require_auth('Manager')
+@require_access(can_edit_feedback, 'feedback_id', not_found="Feedback not found")
 def delete_feedback(feedback_id):
     feedback = Feedback.query.get(feedback_id)
     if feedback:
+        record_feedback_stats(feedback, sign=-1)
+        record_feedback_trends(feedback, _feedback_tag_names(feedback.id), sign=-1)
+        # Remove dependent rows too; the foreign keys would otherwise block
+        # the delete on MySQL and the acknowledgements would stay counted.
+        acks = Acknowledgement.query.filter_by(feedback_id=feedback.id)
+        for employee_id, count in db.session.query(Acknowledgement.employee_id, func.count()).filter(
+                Acknowledgement.feedback_id == feedback.id).group_by(Acknowledgement.employee_id):
+            _bump_stats(employee_id, 'employee', acknowledged=-count)
+        acks.delete(synchronize_session=False)
+        Comment.query.filter_by(feedback_id=feedback.id).delete(synchronize_session=False)
+        Tag.query.filter_by(feedback_id=feedback.id).delete(synchronize_session=False)
+        bump_feedback_versions(feedback)
+        bump_versions(f"comments:{feedback.id}")
         db.session.delete(feedback)
+        index_feedback(feedback.id)
         db.session.commit()
         return jsonify({"message": "Feedback deleted successfully"})
+    if is_archived(feedback_id):
+        return jsonify({"error": "Feedback is archived and read-only"}), 409
     return jsonify({"error": "Feedback not found"}), 404
 
 @app.route('/api/feedback/request', methods=['POST'])
+@require_auth()
 def request_feedback():
     data = request.get_json()
     if not data:
@@ -294,6 +2576,8 @@ def request_feedback():
 
     if not requester_id or not target_manager_id:
         return jsonify({"error": "Requester and target manager IDs are required"}), 400
+    if not is_caller(requester_id):
+        return forbidden()
 
     new_request = FeedbackRequest(
         requester_id=requester_id,
@@ -305,6 +2589,11 @@ def request_feedback():
     try:
         db.session.add(new_request)
         db.session.commit()
+        event_bus.publish([target_manager_id], 'feedback_request', {
+            "id": new_request.id,
+            "requester_id": None if is_anonymous else requester_id,
+            "message": message,
+        })
     except Exception as e:
         db.session.rollback()
         # In a real app, you would log the error `e`
@@ -315,29 +2604,65 @@ def request_feedback():
     return jsonify({"message": "Feedback request sent successfully"}), 201
 
 @app.route('/api/feedback/acknowledge', methods=['POST'])
+@require_auth()
 def acknowledge_feedback():
+    # Idempotent: acknowledging the same feedback again answers 200
     data = request.json
-    new_acknowledgement = Acknowledgement(
-        feedback_id=data['feedback_id'],
-        employee_id=data['employee_id']
-    )
-    db.session.add(new_acknowledgement)
-    db.session.commit()
+    try:
+        values = {"feedback_id": int(data['feedback_id']), "employee_id": int(data['employee_id'])}
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "feedback_id and employee_id must be integers"}), 400
+    if values["employee_id"] != g.auth.user_id:
+        return forbidden()
+    try:
+        result = save_engagement('ack', values)
+    except BufferClosed:
+        return jsonify({"error": "Server is shutting down"}), 503
+    except BufferTimeout:
+        return jsonify({"error": "The write is taking too long; retry the request"}), 503
+    if result is None:
+        return jsonify({"message": "Acknowledgement queued"}), 202
+    if "error" in result:
+        return jsonify({"error": result["error"]}), result["status"]
+    if not result["created"]:
+        return jsonify({"message": "Feedback already acknowledged"}), 200
     return jsonify({"message": "Feedback acknowledged"}), 201
 
 @app.route('/api/comments', methods=['POST'])
+@require_auth()
 def add_comment():
+    # An Idempotency-Key header makes retries safe: a repeated key answers
+    # 200 with the comment its first request added.
     data = request.json
-    new_comment = Comment(
-        feedback_id=data['feedback_id'],
-        user_id=data['user_id'],
-        text=data['text']
-    )
-    db.session.add(new_comment)
-    db.session.commit()
-    return jsonify({"message": "Comment added"}), 201
+    key = request.headers.get('Idempotency-Key') or None
+    if key and len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return jsonify({"error": f"Idempotency-Key is limited to {IDEMPOTENCY_KEY_MAX_LENGTH} characters"}), 400
+    try:
+        values = {"feedback_id": int(data['feedback_id']), "user_id": int(data['user_id']), "text": data['text']}
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "feedback_id, user_id and text are required"}), 400
+    if values["user_id"] != g.auth.user_id or not can_view_feedback(values["feedback_id"]):
+        return forbidden()
+    try:
+        result = save_engagement('comment', {**values, "idempotency_key": key})
+    except BufferClosed:
+        return jsonify({"error": "Server is shutting down"}), 503
+    except BufferTimeout:
+        return jsonify({"error": "The write is taking too long; retry the request"}), 503
+    if result is None:
+        return jsonify({"message": "Comment queued"}), 202
+    if "error" in result:
+        return jsonify({"error": result["error"]}), result["status"]
+    response = jsonify({"message": "Comment added", "id": result["id"]})
+    response.status_code = 201 if result["created"] else 200
+    if not result["created"]:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
 
 @app.route('/api/comments/<feedback_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_feedback, 'feedback_id')
+@conditional("comments:{feedback_id}")
 def get_comments(feedback_id):
     comments_with_users = db.session.query(
         Comment,
@@ -346,22 +2671,23 @@ def get_comments(feedback_id):
         User, Comment.user_id == User.id
     ).filter(
         Comment.feedback_id == feedback_id
-    ).order_by(
-        Comment.timestamp.asc()
-    ).all()
-
-    return jsonify([
-        {
-            "id": comment.id,
-            "user_id": comment.user_id,
-            "user_name": user_name,
-            "text": comment.text,
-            "is_markdown": comment.is_markdown,
-            "timestamp": comment.timestamp
-        } for comment, user_name in comments_with_users
-    ])
+    )
+    try:
+        page = paginate(comments_with_users, (Comment.timestamp, Comment.id))
+        archived = None if page.rows else archived_feedback(feedback_id)
+        if archived:
+            comments = _record_rows(archived[1]["comments"])
+            names = dict(db.session.execute(db.select(User.id, User.name).where(
+                User.id.in_({c.user_id for c in comments}))).all())
+            page = paginate_items([(c, names.get(c.user_id)) for c in comments], (Comment.timestamp, Comment.id),
+                                  key=lambda row: (row[0].timestamp, row[0].id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return page_response(page, [comment_json(comment, user_name) for comment, user_name in page.rows])
 
 @app.route('/api/feedback/request/<int:request_id>', methods=['PUT'])
+@require_auth()
 def update_feedback_request_status(request_id):
     data = request.json
     new_status = data.get('status')
@@ -372,13 +2698,20 @@ def update_feedback_request_status(request_id):
     feedback_request = FeedbackRequest.query.get(request_id)
     if not feedback_request:
         return jsonify({"error": "Feedback request not found"}), 404
+    if feedback_request.target_manager_id != g.auth.user_id:
+        return forbidden()
 
     feedback_request.status = new_status
+    requester_id = feedback_request.requester_id
     db.session.commit()
+    event_bus.publish([requester_id], 'feedback_request_status',
+                      {"id": request_id, "status": new_status})
 
     return jsonify({"message": f"Feedback request {request_id} has been {new_status}"}), 200
 
 @app.route('/api/feedback/requests/<user_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'user_id')
 def get_feedback_requests(user_id):
     # Get requests where user is the target manager
     # Join with User table to get requester's name
@@ -389,65 +2722,102 @@ def get_feedback_requests(user_id):
         User, FeedbackRequest.requester_id == User.id
     ).filter(
         FeedbackRequest.target_manager_id == user_id
-    ).order_by(
-        FeedbackRequest.timestamp.desc()
-    ).all()
+    )
+    try:
+        page = paginate(requests_with_requester, (FeedbackRequest.timestamp, FeedbackRequest.id), descending=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify([{
+    return page_response(page, [{
         "id": req.FeedbackRequest.id,
         "requester_id": req.FeedbackRequest.requester_id,
         "requester_name": req.requester_name if not req.FeedbackRequest.is_anonymous else "Anonymous",
         "target_manager_id": req.FeedbackRequest.target_manager_id,
         "message": req.FeedbackRequest.message,
         "status": req.FeedbackRequest.status,
-        "timestamp": req.FeedbackRequest.timestamp.isoformat(),
+        "timestamp": req.FeedbackRequest.timestamp,
         "is_anonymous": req.FeedbackRequest.is_anonymous
-    } for req in requests_with_requester])
+    } for req in page.rows])
 
 @app.route('/api/feedback/acknowledgements/<feedback_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_feedback, 'feedback_id')
 def get_acknowledgements(feedback_id):
     acknowledgements = Acknowledgement.query.filter_by(feedback_id=feedback_id).all()
-    return jsonify([
-        {
-            "id": a.id,
-            "employee_id": a.employee_id,
-            "timestamp": a.timestamp
-        } for a in acknowledgements
-    ])
+    archived = None if acknowledgements else archived_feedback(feedback_id)
+    if archived:
+        acknowledgements = _record_rows(archived[1]["acknowledgements"])
+    return jsonify([acknowledgement_json(a) for a in acknowledgements])
 
 @app.route('/api/feedback/tags/<feedback_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_feedback, 'feedback_id')
+@conditional("feedback:{feedback_id}")
 def get_feedback_tags(feedback_id):
     tags = Tag.query.filter_by(feedback_id=feedback_id).all()
-    return jsonify([{"id": t.id, "tag_name": t.tag_name} for t in tags])
+    archived = None if tags else archived_feedback(feedback_id)
+    if archived:
+        tags = _record_rows(archived[1]["tags"])
+    return jsonify([tag_json(t) for t in tags])
 
 @app.route('/api/feedback/tags', methods=['POST'])
+@require_auth()
 def add_feedback_tag():
-    data = request.json
+    data = request.get_json(silent=True) or {}
+    try:
+        feedback_id, tag_name = int(data['feedback_id']), data['tag_name']
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "feedback_id and tag_name are required"}), 400
+    if not isinstance(tag_name, str) or not 0 < len(tag_name) <= 50:
+        return jsonify({"error": "tag_name must be 1-50 characters"}), 400
+    allowed = can_edit_feedback(feedback_id)
+    if allowed is None:
+        return jsonify({"error": "Feedback not found"}), 404
+    if not allowed:
+        return forbidden()
+    if is_archived(feedback_id):
+        return jsonify({"error": "Feedback is archived and read-only"}), 409
     new_tag = Tag(
-        feedback_id=data['feedback_id'],
-        tag_name=data['tag_name']
+        feedback_id=feedback_id,
+        tag_name=tag_name
     )
     db.session.add(new_tag)
+    feedback = db.session.get(Feedback, new_tag.feedback_id)
+    if feedback:
+        record_tag_trends(feedback, new_tag.tag_name)
+    bump_versions(f"feedback:{feedback_id}")
+    index_feedback(feedback_id)
     db.session.commit()
     return jsonify({"message": "Tag added successfully"}), 201
 
 @app.route('/api/feedback/tags/<tag_id>', methods=['DELETE'])
+@require_auth()
 def delete_feedback_tag(tag_id):
     tag = Tag.query.get(tag_id)
     if tag:
+        if not can_edit_feedback(tag.feedback_id):
+            return forbidden()
         db.session.delete(tag)
+        feedback = db.session.get(Feedback, tag.feedback_id)
+        if feedback:
+            record_tag_trends(feedback, tag.tag_name, sign=-1)
+        bump_versions(f"feedback:{tag.feedback_id}")
+        index_feedback(tag.feedback_id)
         db.session.commit()
         return jsonify({"message": "Tag deleted successfully"})
     return jsonify({"error": "Tag not found"}), 404
 
 @app.route('/api/feedback/stats/<manager_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'manager_id')
 def get_manager_stats(manager_id):
     # Get feedback statistics for a manager
-    total_feedback = Feedback.query.filter_by(manager_id=manager_id).count()
-    positive_feedback = Feedback.query.filter_by(manager_id=manager_id, sentiment='positive').count()
-    neutral_feedback = Feedback.query.filter_by(manager_id=manager_id, sentiment='neutral').count()
-    negative_feedback = Feedback.query.filter_by(manager_id=manager_id, sentiment='negative').count()
-    
+    stats = get_stats(manager_id, 'manager')
+    total_feedback = stats['total']
+    positive_feedback = stats['positive']
+    neutral_feedback = stats['neutral']
+    negative_feedback = stats['negative']
+
     return jsonify({
         "total_feedback": total_feedback,
         "positive_feedback": positive_feedback,
@@ -461,6 +2831,8 @@ def get_manager_stats(manager_id):
     })
 
 @app.route('/api/feedback/requests/employee/<employee_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'employee_id')
 def get_employee_feedback_requests(employee_id):
     # Get requests where user is the requester (employee)
     requests_with_manager = db.session.query(
@@ -470,25 +2842,30 @@ def get_employee_feedback_requests(employee_id):
         User, FeedbackRequest.target_manager_id == User.id
     ).filter(
         FeedbackRequest.requester_id == employee_id
-    ).order_by(
-        FeedbackRequest.timestamp.desc()
-    ).all()
+    )
+    try:
+        page = paginate(requests_with_manager, (FeedbackRequest.timestamp, FeedbackRequest.id), descending=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify([{
+    return page_response(page, [{
         "id": req.FeedbackRequest.id,
         "target_manager_id": req.FeedbackRequest.target_manager_id,
         "manager_name": req.manager_name,
         "message": req.FeedbackRequest.message,
         "status": req.FeedbackRequest.status,
-        "timestamp": req.FeedbackRequest.timestamp.isoformat(),
+        "timestamp": req.FeedbackRequest.timestamp,
         "is_anonymous": req.FeedbackRequest.is_anonymous
-    } for req in requests_with_manager])
+    } for req in page.rows])
 
 @app.route('/api/feedback/employee/stats/<employee_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'employee_id')
 def get_employee_stats(employee_id):
     # Get feedback statistics for an employee
-    total_feedback = Feedback.query.filter_by(employee_id=employee_id).count()
-    acknowledged_feedback = Acknowledgement.query.filter_by(employee_id=employee_id).count()
+    stats = get_stats(employee_id, 'employee')
+    total_feedback = stats['total']
+    acknowledged_feedback = stats['acknowledged']
     acknowledgement_rate = 0
     if total_feedback > 0:
         acknowledgement_rate = round((acknowledged_feedback / total_feedback) * 100, 2)
@@ -499,59 +2876,462 @@ def get_employee_stats(employee_id):
         "acknowledgement_rate": acknowledgement_rate
     })
 
-@app.route('/api/feedback/export/<feedback_id>', methods=['GET'])
-def export_feedback_pdf(feedback_id):
-    feedback = Feedback.query.get(feedback_id)
-    if not feedback:
-        return jsonify({"error": "Feedback not found"}), 404
-
-    employee = User.query.get(feedback.employee_id)
-    manager = User.query.get(feedback.manager_id)
-
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
+@app.route('/api/feedback/trends', methods=['GET'])
+@require_auth()
+def get_sentiment_trends():
+    # Sentiment counts per week or month, read from the sentiment_trend
+    # rollup: the cost depends on the number of buckets and tags, not on
+    # how much feedback they summarise.
+    period = request.args.get('period', 'week')
+    scope = request.args.get('scope', 'org')
+    if period not in trends.PERIODS:
+        return jsonify({"error": f"period must be one of {', '.join(trends.PERIODS)}"}), 400
+    if scope not in ('org', 'manager', 'team', 'employee'):
+        return jsonify({"error": "scope must be one of org, manager, team, employee"}), 400
+    if scope == 'org':
+        # Company-wide figures are for ops and the head of the org chart
+        if not is_ops(g.auth) and not is_org_root(g.auth.user_id):
+            return forbidden()
+        scope_key, user_ids = 'org', [0]
+    else:
+        try:
+            user_id = int(request.args['id'])
+        except (KeyError, ValueError):
+            return jsonify({"error": "id must be an integer user id for this scope"}), 400
+        if not can_view_user(user_id):
+            return forbidden()
+        if scope == 'team':
+            # A team's trend is the sum of its current members' trends
+            scope_key = 'employee'
+            user_ids = list(db.session.scalars(db.select(Team.employee_id).where(Team.manager_id == user_id)))
+        else:
+            scope_key, user_ids = scope, [user_id]
+    try:
+        end = trends.bucket_start(period, trends.as_date(_parse_date_arg('end')) or date.today())
+        start = trends.as_date(_parse_date_arg('start'))
+        start = (trends.bucket_start(period, start) if start
+                 else trends.shift(period, end, 1 - trends.DEFAULT_BUCKETS[period]))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if start > end:
+        return jsonify({"error": "start must not be after end"}), 400
+
+    trend = SentimentTrend.__table__
+    query = db.select(
+        trend.c.bucket, trend.c.tag_name,
+        *(func.sum(trend.c[name]).label(name) for name in ("total", *SENTIMENTS)),
+    ).where(
+        trend.c.period == period, trend.c.scope == scope_key, trend.c.user_id.in_(user_ids),
+        trend.c.bucket.between(start, end),
+    ).group_by(trend.c.bucket, trend.c.tag_name)
+    tag = request.args.get('tag')
+    if tag is not None:
+        query = query.where(trend.c.tag_name.in_((trends.ALL_TAGS, tag)))
+
+    counts = defaultdict(dict)
+    for row in db.session.execute(query) if user_ids else ():
+        counts[row.tag_name][trends.as_date(row.bucket)] = row
+
+    def series(by_bucket):
+        points = []
+        bucket = start
+        while bucket <= end:
+            row = by_bucket.get(bucket)
+            point = {"bucket": bucket.isoformat(), **{name: int(getattr(row, name) or 0) if row else 0
+                                                      for name in ("total", *SENTIMENTS)}}
+            # Net sentiment in [-1, 1]; None for an empty bucket
+            point["score"] = (round((point["positive"] - point["negative"]) / point["total"], 4)
+                              if point["total"] else None)
+            points.append(point)
+            bucket = trends.shift(period, bucket, 1)
+        return points
 
-    pdf.cell(200, 10, txt="Feedback Report", ln=True, align='C')
-    pdf.ln(10)
+    return jsonify({
+        "period": period,
+        "scope": scope,
+        "id": None if scope == 'org' else user_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "series": series(counts.pop(trends.ALL_TAGS, {})),
+        "tags": {name: series(by_bucket) for name, by_bucket in sorted(counts.items())},
+    })
 
-    pdf.cell(200, 10, txt=f"Employee: {employee.name}", ln=True)
-    pdf.cell(200, 10, txt=f"Manager: {manager.name}", ln=True)
-    pdf.cell(200, 10, txt=f"Date: {feedback.timestamp.strftime('%Y-%m-%d')}", ln=True)
-    pdf.ln(10)
+def _wants_async():
+    # Exports are queued as jobs by POSTing to the export URL; a GET must not
+    # create server-side state, so ?async=1 on a GET is refused
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def _async_refused():
+    return jsonify({"error": "POST to this URL to queue the export as a background job"}), 400
+
+@app.route('/api/feedback/export/<feedback_id>', methods=['POST'])
+@require_auth()
+def queue_feedback_pdf(feedback_id):
+    return submit_job('feedback_pdf', {"feedback_id": feedback_id})
+
+@app.route('/api/feedback/export', methods=['POST'])
+@require_auth()
+def queue_feedback_export():
+    # The same filters and format as the GET, in the query string
+    return submit_job('feedback_export', request.args.to_dict())
+
+@app.route('/api/feedback/export/batch', methods=['POST'])
+@require_auth()
+def queue_feedback_batch():
+    return submit_job('feedback_pdf_batch', request.args.to_dict())
+
+@app.route('/api/jobs', methods=['POST'])
+@require_auth()
+def create_job():
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    if kind not in job_registry:
+        return jsonify({"error": f"kind must be one of {', '.join(sorted(job_registry.kinds))}"}), 400
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+    return submit_job(kind, params)
+
+@app.route('/api/jobs', methods=['GET'])
+@require_auth()
+def list_jobs():
+    jobs = Job.query.filter(Job.owner_id == g.auth.user_id)
+    try:
+        page = paginate(jobs, (Job.id,), descending=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return page_response(page, [job_json(job) for job in page.rows])
+
+def _owned_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.owner_id != g.auth.user_id:
+        return None
+    return job
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@require_auth()
+def get_job(job_id):
+    job = _owned_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    response = jsonify(job_json(job))
+    if job.status in ('queued', 'running'):
+        response.headers['Retry-After'] = '1'
+    return response
 
-    pdf.set_font("Arial", 'B', size=12)
-    pdf.cell(200, 10, txt="Strengths", ln=True)
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, txt=feedback.strengths)
-    pdf.ln(5)
+@app.route('/api/jobs/<int:job_id>', methods=['DELETE'])
+@require_auth()
+def cancel_job(job_id):
+    job = _owned_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if not job_queue.cancel(db.session, job_id):
+        return jsonify({"error": f"Job is {job.status} and can no longer be cancelled"}), 409
+    db.session.commit()
+    return jsonify({"message": "Job cancelled"})
+
+@app.route('/api/jobs/<int:job_id>/result', methods=['GET'])
+@require_auth()
+def get_job_result(job_id):
+    job = _owned_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status == 'expired' or (job.status == 'succeeded' and not os.path.exists(job.result_path)):
+        return jsonify({"error": "The result has expired; submit the job again"}), 410
+    if job.status != 'succeeded':
+        return jsonify({"error": f"Job is {job.status}", "job": job_json(job)}), 409
+    return send_file(os.path.abspath(job.result_path), mimetype=job.result_mimetype, as_attachment=True,
+                     download_name=job.result_name, max_age=0)
+
+@app.route('/api/jobs/stats', methods=['GET'])
+@require_auth(ops=True)
+def get_job_stats():
+    return jsonify(job_queue.info(db.session))
 
-    pdf.set_font("Arial", 'B', size=12)
-    pdf.cell(200, 10, txt="Areas for Improvement", ln=True)
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, txt=feedback.improvements)
-    pdf.ln(10)
+@app.route('/api/feedback/export/<feedback_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_feedback, 'feedback_id')
+def export_feedback_pdf(feedback_id):
+    if _wants_async():
+        return _async_refused()
+    reports = feedback_reports(Feedback.id == feedback_id) or [archived_report(feedback_id)]
+    if reports[0] is None:
+        return jsonify({"error": "Feedback not found"}), 404
 
     # Create response
-    response = make_response(pdf.output(dest='S').encode('latin-1'))
+    response = make_response(pdf_renderer.render(reports[0]))
     response.headers['Content-Type'] = 'application/pdf'
     response.headers['Content-Disposition'] = f'attachment; filename=feedback_{feedback_id}.pdf'
 
     return response
 
+def _parse_date_arg(name, end_of_day=False, args=None):
+    value = (request.args if args is None else args).get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        # A bare date as the upper bound includes that whole day
+        parsed += timedelta(days=1)
+    return parsed
+
+def _feedback_filter_args(args=None, model=Feedback):
+    """Feedback filters from manager_id, employee_id, sentiment, start and end
+    (in the query string, or in ``args``), on ``model``'s columns."""
+    args = request.args if args is None else args
+    try:
+        start = _parse_date_arg('start', args=args)
+        end = _parse_date_arg('end', end_of_day=True, args=args)
+    except ValueError:
+        raise ValueError("start and end must be ISO-8601 dates")
+    filters = []
+    if args.get('manager_id'):
+        filters.append(model.manager_id == args['manager_id'])
+    if args.get('employee_id'):
+        filters.append(model.employee_id == args['employee_id'])
+    if args.get('sentiment'):
+        if args['sentiment'] not in SENTIMENTS:
+            raise ValueError(f"sentiment must be one of {', '.join(SENTIMENTS)}")
+        filters.append(model.sentiment == args['sentiment'])
+    if start:
+        filters.append(model.timestamp >= start)
+    if end:
+        filters.append(model.timestamp < end)
+    return filters
+
+EXPORT_COLUMNS = ('id', 'timestamp', 'employee_id', 'employee_name', 'manager_id', 'manager_name',
+                  'sentiment', 'strengths', 'improvements', 'tags', 'acknowledged')
+EXPORT_FETCH_SIZE = 1000
+_TAG_SEPARATOR = '\x1f'
+
+def _export_rows(args, viewer_id):
+    """Export records of the feedback matching the filters in ``args`` that
+    ``viewer_id`` may see: the archived feedback, which is the oldest, then
+    the live rows, each in (timestamp, id) order."""
+    # The archive is read to the end before the live query starts, so only
+    # one server-side cursor is open at a time
+    return chain(
+        _archived_export_rows([*_feedback_filter_args(args, ArchivedFeedback),
+                               visible_feedback(viewer_id, ArchivedFeedback)]),
+        _live_export_rows([*_feedback_filter_args(args), visible_feedback(viewer_id)]))
+
+def _live_export_rows(filters):
+    # One query over a server-side cursor: tags and the acknowledgement flag
+    # come from correlated subqueries so no per-row lookups are needed.
+    employee = aliased(User)
+    manager = aliased(User)
+    tags = db.select(func.aggregate_strings(Tag.tag_name, _TAG_SEPARATOR)).where(
+        Tag.feedback_id == Feedback.id).scalar_subquery()
+    acknowledged = db.select(Acknowledgement.id).where(
+        Acknowledgement.feedback_id == Feedback.id,
+        Acknowledgement.employee_id == Feedback.employee_id).exists()
+    query = db.select(
+        Feedback.id, Feedback.timestamp, Feedback.employee_id, employee.name, Feedback.manager_id,
+        manager.name, Feedback.sentiment, Feedback.strengths, Feedback.improvements,
+        tags, acknowledged
+    ).join(
+        employee, Feedback.employee_id == employee.id
+    ).join(
+        manager, Feedback.manager_id == manager.id
+    ).where(*filters).order_by(Feedback.timestamp, Feedback.id).execution_options(
+        stream_results=True, yield_per=EXPORT_FETCH_SIZE)
+    for row in db.session.execute(query):
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+        record["tags"] = record["tags"].split(_TAG_SEPARATOR) if record["tags"] else []
+        record["acknowledged"] = bool(record["acknowledged"])
+        yield record
+
+def _archived_export_rows(filters):
+    # Tags and the acknowledgement flag are on the index rows; the text is
+    # read from the segments a fetch batch at a time
+    employee = aliased(User)
+    manager = aliased(User)
+    query = db.select(ArchivedFeedback, employee.name, manager.name).join(
+        employee, ArchivedFeedback.employee_id == employee.id
+    ).join(
+        manager, ArchivedFeedback.manager_id == manager.id
+    ).where(*filters).order_by(*ARCHIVE_ORDER).execution_options(
+        stream_results=True, yield_per=EXPORT_FETCH_SIZE)
+    for rows in db.session.execute(query).partitions():
+        records = archived_records([archived for archived, _, _ in rows])
+        for archived, employee_name, manager_name in rows:
+            yield {
+                "id": archived.feedback_id,
+                "timestamp": archived.timestamp.isoformat() if archived.timestamp else None,
+                "employee_id": archived.employee_id,
+                "employee_name": employee_name,
+                "manager_id": archived.manager_id,
+                "manager_name": manager_name,
+                "sentiment": archived.sentiment,
+                "strengths": records[archived.feedback_id]["strengths"],
+                "improvements": records[archived.feedback_id]["improvements"],
+                "tags": archived.tags.split('\n') if archived.tags else [],
+                "acknowledged": archived.acknowledged,
+            }
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def _export_csv(records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    # Send the header straight away, then roughly 64 KB at a time
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for record in records:
+        writer.writerow(['; '.join(record[c]) if c == 'tags' else record[c] for c in EXPORT_COLUMNS])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _export_ndjson(records):
+    lines, size = [], 0
+    for record in records:
+        line = app.json.dumps(record) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+@app.route('/api/feedback/export', methods=['GET'])
+@require_auth()
+def export_feedback_stream():
+    # Streams every matching feedback row as CSV (default) or NDJSON while it
+    # is read from the database, so memory stays flat for any export size.
+    if _wants_async():
+        return _async_refused()
+    output = request.args.get('format', 'csv')
+    if output not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+    try:
+        records = _export_rows(request.args, g.auth.user_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if output == 'csv':
+        response = Response(stream_with_context(_export_csv(records)), mimetype='text/csv')
+    else:
+        response = Response(stream_with_context(_export_ndjson(records)), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename=feedback_export.{output}'
+    return response
+
+@app.route('/api/feedback/export/batch', methods=['GET'])
+@require_auth()
+def export_feedback_batch():
+    if _wants_async():
+        return _async_refused()
+    output = request.args.get('format', 'zip')
+    if output not in ('zip', 'pdf'):
+        return jsonify({"error": "format must be 'zip' or 'pdf'"}), 400
+    try:
+        filters = _feedback_filter_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not filters:
+        return jsonify({"error": "Provide manager_id, employee_id or a start/end date range"}), 400
+
+    # One past the cap is enough to refuse, without loading every match
+    max_reports = app.config['PDF_BATCH_MAX_REPORTS']
+    reports = export_reports(request.args, g.auth.user_id, limit=max_reports + 1)
+    if not reports:
+        return jsonify({"error": "No feedback matches the filters"}), 404
+    if len(reports) > max_reports:
+        return jsonify({"error": f"More than {max_reports} reports match; narrow the filters"}), 413
+
+    if output == 'pdf':
+        response = make_response(pdf_renderer.render_merged(reports))
+        response.headers['Content-Type'] = 'application/pdf'
+        response.headers['Content-Disposition'] = 'attachment; filename=feedback_reports.pdf'
+        return response
+    response = Response(stream_zip(pdf_renderer, reports), mimetype='application/zip')
+    response.headers['Content-Disposition'] = 'attachment; filename=feedback_reports.zip'
+    return response
+
 @app.route('/api/user/<user_id>', methods=['GET'])
+@require_auth()
 def get_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    return jsonify({
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "role": user.role
-    })
+    key = f"user:{user_id}"
+    payload = cache.get(key)
+    if payload is None:
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        payload = {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "role": user.role
+        }
+        cache.set(key, payload)
+    return jsonify(payload)
+
+@app.route('/api/archive/stats', methods=['GET'])
+@require_auth(ops=True)
+def get_archive_stats():
+    return jsonify({**archive_store.info(),
+                    "archived_feedback": db.session.scalar(db.select(db.func.count()).select_from(ArchivedFeedback))})
+
+@app.route('/api/cache/stats', methods=['GET'])
+@require_auth(ops=True)
+def get_cache_stats():
+    return jsonify(cache.info())
+
+@app.route('/api/events', methods=['GET'])
+@require_auth(query_token=True)
+def stream_events():
+    """Server-Sent Events for the signed-in user: feedback_request,
+    feedback_request_status, feedback, comment and acknowledgement."""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    try:
+        subscription = event_bus.subscribe(g.auth.user_id, last_event_id)
+    except TooManySubscribers:
+        response = jsonify({"error": "Too many open event streams, please try again shortly"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    # The stream holds no database connection; release this request's session now
+    db.session.remove()
+    response = Response(sse_stream(subscription, app.config['EVENTS_KEEPALIVE_SECONDS']),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/events/stats', methods=['GET'])
+@require_auth(ops=True)
+def get_event_stats():
+    return jsonify(event_bus.info())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus scrape target; not under /api so it can sit behind a
+    # different ingress rule
+    token = app.config['METRICS_TOKEN']
+    if token and not secrets.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({"error": "Invalid metrics token"}), 401
+    return Response(request_metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/metrics/n-plus-one', methods=['GET'])
+@require_auth(ops=True)
+def get_n_plus_one_report():
+    return jsonify(request_metrics.info())
+
+@app.route('/api/db/pool', methods=['GET'])
+@require_auth(ops=True)
+def get_db_pool_stats():
+    return jsonify({"engines": pool_monitor.info(), "routing": db_router.info(),
+                    "write_buffer": engagement_buffer.info() if engagement_buffer else None})
 
 @app.route('/api/feedback/manager/<manager_id>', methods=['GET'])
+@require_auth()
+@require_access(can_view_user, 'manager_id')
+@conditional("feedback:manager:{manager_id}")
 def get_manager_feedback(manager_id):
     feedback_with_employees = db.session.query(
         Feedback,
@@ -560,20 +3340,40 @@ def get_manager_feedback(manager_id):
         User, Feedback.employee_id == User.id
     ).filter(
         Feedback.manager_id == manager_id
-    ).order_by(
-        Feedback.timestamp.desc()
-    ).all()
+    )
+    archived_with_employees = db.session.query(
+        ArchivedFeedback,
+        User.name.label('employee_name')
+    ).join(
+        User, ArchivedFeedback.employee_id == User.id
+    ).filter(
+        ArchivedFeedback.manager_id == manager_id
+    )
+    try:
+        page = paginate(feedback_with_employees, (Feedback.timestamp, Feedback.id), descending=True)
+        archived_page, omitted = paginate_archive(archived_with_employees)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify([{
+    items = [{
         "id": f.Feedback.id,
         "employee_name": f.employee_name,
         "strengths": f.Feedback.strengths,
         "improvements": f.Feedback.improvements,
         "sentiment": f.Feedback.sentiment,
-        "timestamp": f.Feedback.timestamp.isoformat(),
-    } for f in feedback_with_employees])
+        "timestamp": f.Feedback.timestamp,
+    } for f in page.rows] + [{
+        "id": a.ArchivedFeedback.feedback_id,
+        "employee_name": a.employee_name,
+        "strengths": None,
+        "improvements": None,
+        "sentiment": a.ArchivedFeedback.sentiment,
+        "timestamp": a.ArchivedFeedback.timestamp,
+    } for a in archived_page.rows]
+    page = merge_pages(page, archived_page, items, feedback_sort_key, descending=True)
+    return archive_page_response(page, [a.ArchivedFeedback for a in archived_page.rows], omitted)
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
-    app.run(host='0.0.0.0', port=5001, debug=True) 
+        init_db()
+    app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,137 @@
+"""Cold storage for old feedback in compressed segment files.
+
+A segment is an append-once file of zlib-compressed blocks.  Each block
+holds up to ``block_records`` NDJSON records (one feedback with its
+comments, tags and acknowledgements) of one group, the employee, so the
+records a list page needs are usually in one block.  A record is located by
+``(segment, offset, length, position)``: the block's byte range and the
+record's line within it.  The app keeps those locations in a database table
+next to the few columns its queries filter and sort on; everything else is
+only in the segment.
+
+Segments are written under a temporary name, fsynced and renamed, so a
+segment is either complete or absent, and they are read through ``mmap``:
+only the blocks that are asked for are paged in, and recently decompressed
+blocks are kept in a small LRU.
+"""
+import json
+import mmap
+import os
+import secrets
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from itertools import groupby
+
+MAGIC = b'FBSEG1\n'
+SUFFIX = '.seg'
+
+
+class ArchiveStore:
+    def __init__(self, directory, block_records=64, compression_level=6, cache_blocks=256):
+        self.directory = directory
+        self.block_records = block_records
+        self.compression_level = compression_level
+        self.cache_blocks = cache_blocks
+        self._maps = {}
+        self._blocks = OrderedDict()  # (segment, offset) -> list of record lines
+        self._lock = threading.Lock()
+        self.block_reads = 0
+        self.cache_hits = 0
+
+    def path(self, segment):
+        return os.path.join(self.directory, segment)
+
+    # Writing
+
+    def write_segment(self, records, group_key):
+        """Write ``records`` (dicts, ordered so each group is contiguous) to a
+        new segment; returns ``(segment, [(offset, length, position), ...])``."""
+        os.makedirs(self.directory, exist_ok=True)
+        segment = f"feedback-{time.strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}{SUFFIX}"
+        tmp = self.path(segment) + '.tmp'
+        locations = []
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            offset = len(MAGIC)
+            for _, group in groupby(records, key=group_key):
+                group = list(group)
+                for start in range(0, len(group), self.block_records):
+                    lines = [json.dumps(record, separators=(',', ':')) for record in
+                             group[start:start + self.block_records]]
+                    block = zlib.compress('\n'.join(lines).encode(), self.compression_level)
+                    f.write(block)
+                    locations.extend((offset, len(block), position) for position in range(len(lines)))
+                    offset += len(block)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path(segment))
+        return segment, locations
+
+    def remove(self, segment):
+        """Delete a segment, e.g. one whose records could not be indexed."""
+        with self._lock:
+            segment_map = self._maps.pop(segment, None)
+            for key in [key for key in self._blocks if key[0] == segment]:
+                del self._blocks[key]
+        if segment_map is not None:
+            segment_map.close()
+        try:
+            os.remove(self.path(segment))
+        except FileNotFoundError:
+            pass
+
+    # Reading
+
+    def _map(self, segment):
+        segment_map = self._maps.get(segment)
+        if segment_map is None:
+            with open(self.path(segment), 'rb') as f:
+                segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if segment_map[:len(MAGIC)] != MAGIC:
+                segment_map.close()
+                raise ValueError(f"{segment} is not a feedback archive segment")
+            self._maps[segment] = segment_map
+        return segment_map
+
+    def _block(self, segment, offset, length):
+        key = (segment, offset)
+        with self._lock:
+            lines = self._blocks.get(key)
+            if lines is not None:
+                self._blocks.move_to_end(key)
+                self.cache_hits += 1
+                return lines
+            data = self._map(segment)[offset:offset + length]
+        lines = zlib.decompress(data).split(b'\n')
+        with self._lock:
+            self.block_reads += 1
+            self._blocks[key] = lines
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+        return lines
+
+    def read(self, segment, offset, length, position):
+        return json.loads(self._block(segment, offset, length)[position])
+
+    def read_many(self, locations):
+        """Records for ``(segment, offset, length, position)`` locations, in order."""
+        return [self.read(*location) for location in locations]
+
+    def segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SUFFIX))
+
+    def info(self):
+        segments = self.segments()
+        return {
+            "directory": self.directory,
+            "segments": len(segments),
+            "bytes": sum(os.path.getsize(self.path(segment)) for segment in segments),
+            "open_maps": len(self._maps),
+            "cached_blocks": len(self._blocks),
+            "block_reads": self.block_reads,
+            "cache_hits": self.cache_hits,
+        }
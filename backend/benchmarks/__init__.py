@@ -0,0 +1,6 @@
+"""Benchmarks for the feedback API.
+
+Run from the ``backend`` directory, e.g. ``python -m benchmarks.bench_indexes``.
+Every benchmark seeds its own SQLite database unless ``--url`` points it at
+another (e.g. a local MySQL) database.
+"""
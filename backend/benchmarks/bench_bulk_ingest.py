@@ -0,0 +1,76 @@
+"""Rows per second: POST /api/feedback vs. POST /api/feedback/bulk.
+
+    python -m benchmarks.bench_bulk_ingest --rows 5000 --batch-sizes 100 500 2000
+
+Each row carries two tags.  The single-row path posts the feedback and then
+each tag separately, as the UI does.  The bulk path sends the same rows as
+NDJSON and reports the peak Python heap during the upload, which should stay
+flat as --rows grows.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks.common import authed_client, load_app
+from benchmarks.seed import SeedConfig, seed
+
+
+def make_rows(org, n):
+    for i in range(n):
+        employee_id = org.employee_ids[i % len(org.employee_ids)]
+        yield {"employee_id": employee_id, "manager_id": org.manager_ids[0],
+               "strengths": f"Strength {i}", "improvements": f"Improvement {i}",
+               "sentiment": ('positive', 'neutral', 'negative')[i % 3],
+               "tags": ['Teamwork', 'Communication']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--single-rows', type=int, default=1000,
+                        help="rows sent through the single-row endpoint")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        # One team, so every row is about a report of the signed-in manager
+        org = seed(feedback_app, SeedConfig(managers=1, employees_per_manager=20, feedback_per_employee=0))
+    client = authed_client(feedback_app)
+    results = {}
+
+    start = time.perf_counter()
+    for row in make_rows(org, args.single_rows):
+        tags = row.pop('tags')
+        feedback_id = client.post('/api/feedback', json=row).json['id']
+        for tag_name in tags:
+            client.post('/api/feedback/tags', json={"feedback_id": feedback_id, "tag_name": tag_name})
+    seconds = time.perf_counter() - start
+    results["single_row"] = {"rows": args.single_rows, "seconds": round(seconds, 3),
+                             "rows_per_second": round(args.single_rows / seconds, 1)}
+
+    for batch_size in args.batch_sizes:
+        body = ''.join(json.dumps(row) + '\n' for row in make_rows(org, args.rows)).encode()
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.post(f'/api/feedback/bulk?batch_size={batch_size}', data=body,
+                               content_type='application/x-ndjson')
+        summary = response.json
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert summary['created'] == args.rows, summary.get('error')
+        results[f"bulk_batch_{batch_size}"] = {
+            "rows": args.rows, "seconds": round(seconds, 3),
+            "rows_per_second": round(args.rows / seconds, 1),
+            # includes the request body and the buffered response
+            "peak_heap_mb": round(peak / 1e6, 2),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
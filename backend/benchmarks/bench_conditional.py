@@ -0,0 +1,74 @@
+"""Bytes and CPU per repeated load, with and without conditional GETs.
+
+    python -m benchmarks.bench_conditional --feedback-per-employee 50 --repeat 200
+
+Each route is loaded ``--repeat`` times the way the dashboard did before
+(a full 200 every time) and then revalidated with ``If-None-Match`` as a
+browser does once it has the ETag.  CPU is process time per request, so it
+covers the query, serialisation and the validator lookup.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import authed_client, load_app
+from benchmarks.seed import SeedConfig, seed
+
+
+def run(client, url, repeat, headers=None):
+    body_bytes = 0
+    status = None
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url, headers=headers or {})
+        body_bytes += len(response.data)
+        status = response.status_code
+    return {
+        "status": status,
+        "bytes_per_load": body_bytes // repeat,
+        "cpu_ms_per_load": round((time.process_time() - cpu) / repeat * 1000, 3),
+        "wall_ms_per_load": round((time.perf_counter() - wall) / repeat * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--employees-per-manager', type=int, default=10)
+    parser.add_argument('--feedback-per-employee', type=int, default=50)
+    parser.add_argument('--comments', type=int, default=5, help="comments per feedback")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=2, employees_per_manager=args.employees_per_manager,
+                                            feedback_per_employee=args.feedback_per_employee,
+                                            comments_per_feedback=args.comments))
+    manager_id, employee_id = org.manager_ids[0], org.employee_ids[0]
+    client = authed_client(feedback_app, manager_id, 'Manager')
+    routes = {
+        "get_manager_feedback": f"/api/feedback/manager/{manager_id}",
+        "get_employee_feedback": f"/api/feedback/employee/{employee_id}",
+        "get_comments": "/api/comments/1",
+        "get_team": f"/api/team/{manager_id}",
+        "get_feedback_full": "/api/feedback/1/full",
+    }
+    results = {}
+    for name, url in routes.items():
+        full = run(client, url, args.repeat)
+        etag = client.get(url).headers['ETag']
+        revalidated = run(client, url, args.repeat, {"If-None-Match": etag})
+        results[name] = {
+            "full": full,
+            "revalidated": revalidated,
+            "bytes_saved_per_load": full["bytes_per_load"] - revalidated["bytes_per_load"],
+            "cpu_saved_pct": round(100 * (1 - revalidated["cpu_ms_per_load"] / full["cpu_ms_per_load"]), 1),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Throughput of acknowledgements and comments under concurrent clients.
+
+    python -m benchmarks.bench_engagement --clients 16 --requests 200
+
+Runs the app in a threaded HTTP server and has --clients threads, each on
+its own keep-alive connection, post --requests writes (alternating
+comments, each with an Idempotency-Key, and acknowledgements, a share of
+them repeats).  The run is repeated writing each request on its own
+(the default), through the write buffer in 'commit' mode and in
+'buffered' mode, and reports requests/second, latency percentiles, the
+number of commits, and checks that no acknowledgement or keyed comment
+was stored twice.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from sqlalchemy import event
+
+from benchmarks.common import auth_header, load_app, percentile, serve_in_thread
+from benchmarks.seed import SeedConfig, seed
+from writebuffer import WriteBuffer
+
+
+def client(base, token, bodies, latencies, statuses):
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=120)
+    for path, body, headers in bodies:
+        start = time.perf_counter()
+        conn.request('POST', path, body=json.dumps(body),
+                     headers={"Content-Type": "application/json", "Authorization": token, **headers})
+        response = conn.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+    conn.close()
+
+
+def workload(run, client_index, requests, feedback_ids, employee_of, tokens, repeat_every):
+    bodies = []
+    for n in range(requests):
+        feedback_id = feedback_ids[(client_index * requests + n) % len(feedback_ids)]
+        if n % 2:
+            # Every repeat_every-th acknowledgement repeats an earlier one
+            if repeat_every and n % repeat_every == 1:
+                feedback_id = feedback_ids[(client_index * requests) % len(feedback_ids)]
+            bodies.append(('/api/feedback/acknowledge',
+                           {"feedback_id": feedback_id, "employee_id": employee_of[feedback_id]},
+                           {"Authorization": tokens[employee_of[feedback_id]]}))
+        else:
+            # Every key is sent twice, with the same body
+            key = f"{run}-{client_index}-{n // 4}"
+            feedback_id = feedback_ids[(client_index * requests + n // 4) % len(feedback_ids)]
+            bodies.append(('/api/comments', {"feedback_id": feedback_id, "user_id": employee_of[feedback_id],
+                                             "text": f"Comment {key}"},
+                           {"Idempotency-Key": key, "Authorization": tokens[employee_of[feedback_id]]}))
+    return bodies
+
+
+def run_mode(feedback_app, engine, base, token, run, args, feedback_ids, employee_of, tokens):
+    commits = []
+
+    def count_commit(conn):
+        commits.append(1)
+
+    event.listen(engine, 'commit', count_commit)
+    latencies, statuses, threads = [], {}, []
+    for i in range(args.clients):
+        bodies = workload(run, i, args.requests, feedback_ids, employee_of, tokens, args.repeat_every)
+        threads.append(threading.Thread(target=client, args=(base, token, bodies, latencies, statuses)))
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if feedback_app.engagement_buffer is not None:
+        feedback_app.engagement_buffer.flush()
+    seconds = time.perf_counter() - start
+    event.remove(engine, 'commit', count_commit)
+
+    with feedback_app.app.app_context():
+        db, Ack, Comment = feedback_app.db, feedback_app.Acknowledgement, feedback_app.Comment
+        duplicate_acks = db.session.scalar(db.select(db.func.count()).select_from(
+            db.select(Ack.feedback_id).group_by(Ack.feedback_id, Ack.employee_id).having(
+                db.func.count() > 1).subquery()))
+        keyed_comments = db.session.scalar(db.select(db.func.count()).where(Comment.idempotency_key.like(f"{run}-%")))
+    latencies.sort()
+    total = args.clients * args.requests
+    return {
+        "requests": total,
+        "seconds": round(seconds, 2),
+        "requests_per_second": round(total / seconds, 1),
+        "p50_ms": round(percentile(latencies, 0.5), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "commits": len(commits),
+        "statuses": statuses,
+        "duplicate_acknowledgements": duplicate_acks,
+        "keyed_comments": keyed_comments,
+        "expected_keyed_comments": sum(len({n // 4 for n in range(0, args.requests, 2)}) for _ in range(args.clients)),
+        "buffer": feedback_app.engagement_buffer.info() if feedback_app.engagement_buffer else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help="writes per client")
+    parser.add_argument('--window-ms', type=float, default=5)
+    parser.add_argument('--max-rows', type=int, default=500)
+    parser.add_argument('--repeat-every', type=int, default=5, help="repeat every Nth acknowledgement (0: never)")
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=10, employees_per_manager=10, feedback_per_employee=20,
+                                            comments_per_feedback=0))
+        Feedback = feedback_app.Feedback
+        employee_of = dict(feedback_app.db.session.execute(
+            feedback_app.db.select(Feedback.id, Feedback.employee_id)).all())
+        engine = feedback_app.db.engine
+    feedback_ids = sorted(employee_of)
+
+    server, base = serve_in_thread(feedback_app.app)
+    token = auth_header(feedback_app, org.manager_ids[0])
+    # Each write is sent by the employee the feedback belongs to
+    tokens = {employee_id: auth_header(feedback_app, employee_id, 'Employee') for employee_id in org.employee_ids}
+    results = {}
+    for name, durability in (("direct", None), ("buffer_commit", 'commit'), ("buffer_buffered", 'buffered')):
+        feedback_app.engagement_buffer = None if durability is None else WriteBuffer(
+            feedback_app.write_engagement, window=args.window_ms / 1000, max_items=args.max_rows,
+            durability=durability, context=feedback_app.app.app_context)
+        # Each run acknowledges a fresh slice of feedback
+        offset = len(results) * (len(feedback_ids) // 3)
+        run_ids = feedback_ids[offset:offset + len(feedback_ids) // 3]
+        results[name] = run_mode(feedback_app, engine, base, token, name, args, run_ids, employee_of, tokens)
+        if feedback_app.engagement_buffer is not None:
+            feedback_app.engagement_buffer.close()
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
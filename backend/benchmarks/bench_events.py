@@ -0,0 +1,111 @@
+"""How many idle SSE subscribers one process holds, and fan-out latency.
+
+    python -m benchmarks.bench_events --subscribers 100 500 1000
+
+For each count, opens that many ``/api/events`` streams against a threaded
+HTTP server, then reports the process RSS and thread count with every stream
+idle, how long one publish call takes, and how long until every subscriber
+has received the event.
+"""
+import argparse
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.common import load_app, serve_in_thread
+
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def open_stream(host, port, token):
+    sock = socket.create_connection((host, port))
+    sock.sendall(f"GET /api/events?access_token={token} HTTP/1.1\r\nHost: {host}\r\n"
+                 f"Accept: text/event-stream\r\n\r\n".encode())
+    received = b''
+    while b': subscribed' not in received:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise RuntimeError(f"stream closed: {received[:200]!r}")
+        received += chunk
+    sock.setblocking(False)
+    return sock
+
+
+def fan_out(sockets, publish):
+    selector = selectors.DefaultSelector()
+    for sock in sockets:
+        selector.register(sock, selectors.EVENT_READ)
+    pending = set(sockets)
+    start = time.perf_counter()
+    publish_seconds = publish()
+    while pending:
+        for key, _ in selector.select(timeout=10):
+            if key.fileobj.recv(4096) and key.fileobj in pending:
+                pending.discard(key.fileobj)
+                selector.unregister(key.fileobj)
+        if time.perf_counter() - start > 30:
+            break
+    selector.close()
+    return publish_seconds, time.perf_counter() - start, len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--users', type=int, default=50, help="distinct users the streams belong to")
+    args = parser.parse_args()
+
+    feedback_app = load_app()
+    feedback_app.event_bus.max_subscribers = max(args.subscribers)
+    feedback_app.app.config['EVENTS_KEEPALIVE_SECONDS'] = 60
+    server, base_url = serve_in_thread(feedback_app.app)
+    parts = urlsplit(base_url)
+    tokens = [feedback_app.token_signer.issue(user_id, 'Employee') for user_id in range(1, args.users + 1)]
+    baseline = {"rss_mb": rss_mb(), "threads": threading.active_count()}
+
+    results = []
+    for count in args.subscribers:
+        start = time.perf_counter()
+        sockets = [open_stream(parts.hostname, parts.port, tokens[i % len(tokens)]) for i in range(count)]
+        connect_seconds = time.perf_counter() - start
+        time.sleep(0.5)
+
+        def publish():
+            t = time.perf_counter()
+            feedback_app.event_bus.publish(range(1, args.users + 1), 'feedback', {"id": 0})
+            return time.perf_counter() - t
+
+        publish_seconds, delivered_seconds, missing = fan_out(sockets, publish)
+        results.append({
+            "subscribers": count,
+            "connect_seconds": round(connect_seconds, 3),
+            "rss_mb": rss_mb(),
+            "threads": threading.active_count(),
+            "publish_ms": round(publish_seconds * 1000, 3),
+            "all_delivered_ms": round(delivered_seconds * 1000, 1),
+            "undelivered": missing,
+            "bus": feedback_app.event_bus.info(),
+        })
+        for sock in sockets:
+            sock.close()
+        # Streams notice the closed socket on their next write
+        feedback_app.event_bus.publish(range(1, args.users + 1), 'ping', {})
+        deadline = time.time() + 10
+        while feedback_app.event_bus.info()['subscribers'] and time.time() < deadline:
+            time.sleep(0.1)
+    server.shutdown()
+    print(json.dumps({"pid": os.getpid(), "baseline": baseline, "results": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
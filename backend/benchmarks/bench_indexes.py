@@ -0,0 +1,102 @@
+"""Query plans and timings for the list endpoints before/after migration 1.
+
+    python -m benchmarks.bench_indexes --managers 50 --feedback-per-employee 200
+
+The schema is created, the lookup indexes are dropped to mimic a database
+created before they existed, the data is seeded, and every route below is
+timed and EXPLAINed.  Then the migrations are applied and the same routes are
+measured again.
+"""
+import argparse
+import json
+
+from sqlalchemy import inspect, text
+
+from benchmarks.common import authed_client, capture_sql, explain, load_app, summarize, time_call
+from benchmarks.seed import SeedConfig, seed
+
+LOOKUP_INDEXES = {
+    'feedback': ('ix_feedback_manager_id_timestamp', 'ix_feedback_employee_id_timestamp'),
+    'feedback_request': ('ix_feedback_request_target_manager_id_timestamp',
+                         'ix_feedback_request_requester_id_timestamp'),
+    'comment': ('ix_comment_feedback_id_timestamp',),
+    'acknowledgement': ('ix_acknowledgement_employee_id_feedback_id', 'ix_acknowledgement_feedback_id'),
+    'tag': ('ix_tag_feedback_id',),
+    'team': ('ix_team_manager_id_employee_id',),
+}
+
+
+def drop_lookup_indexes(engine):
+    with engine.begin() as conn:
+        for table, names in LOOKUP_INDEXES.items():
+            existing = {ix['name'] for ix in inspect(conn).get_indexes(table)}
+            for name in names:
+                if name in existing:
+                    if conn.dialect.name == 'mysql':
+                        conn.execute(text(f"DROP INDEX {name} ON `{table}`"))
+                    else:
+                        conn.execute(text(f"DROP INDEX {name}"))
+
+
+def measure(feedback_app, routes, repeat):
+    client = authed_client(feedback_app)
+    engine = feedback_app.db.engine
+    results = {}
+    for name, url in routes:
+        with capture_sql(engine) as statements:
+            client.get(url)
+        with engine.connect() as conn:
+            plans = [explain(conn, stmt, params) for stmt, params in statements]
+        timings = time_call(lambda: client.get(url), repeat)
+        results[name] = {"url": url, "plans": plans, **summarize(timings)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--managers', type=int, default=20)
+    parser.add_argument('--employees-per-manager', type=int, default=10)
+    parser.add_argument('--feedback-per-employee', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help="print the raw results as JSON")
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    with feedback_app.app.app_context():
+        feedback_app.db.create_all()
+        drop_lookup_indexes(feedback_app.db.engine)
+        org = seed(feedback_app, SeedConfig(managers=args.managers,
+                                            employees_per_manager=args.employees_per_manager,
+                                            feedback_per_employee=args.feedback_per_employee))
+        manager_id, employee_id = org.manager_ids[0], org.employee_ids[0]
+        routes = [
+            ("get_manager_feedback", f"/api/feedback/manager/{manager_id}"),
+            ("get_employee_feedback", f"/api/feedback/employee/{employee_id}"),
+            ("get_feedback_requests", f"/api/feedback/requests/{manager_id}"),
+            ("get_employee_feedback_requests", f"/api/feedback/requests/employee/{employee_id}"),
+            # The last feedback of employee_id, which the manager can see
+            ("get_comments", f"/api/comments/{args.feedback_per_employee}"),
+            ("get_feedback_tags", f"/api/feedback/tags/{args.feedback_per_employee}"),
+        ]
+        before = measure(feedback_app, routes, args.repeat)
+        applied = feedback_app.migrations.upgrade(feedback_app.db.engine)
+        after = measure(feedback_app, routes, args.repeat)
+
+    if args.json:
+        print(json.dumps({"feedback_rows": org.feedback_count, "applied": applied,
+                          "before": before, "after": after}, indent=2))
+        return
+    print(f"{org.feedback_count} feedback rows; applied migrations {applied}\n")
+    for name, _ in routes:
+        b, a = before[name], after[name]
+        speedup = b['median_ms'] / a['median_ms'] if a['median_ms'] else float('inf')
+        print(f"{name}: {b['median_ms']:.2f} ms -> {a['median_ms']:.2f} ms ({speedup:.1f}x)")
+        for label, result in (("before", b), ("after", a)):
+            for plan in result['plans']:
+                print(f"  {label}: " + " | ".join(plan))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Serialisation and compression cost of large feedback lists.
+
+    python -m benchmarks.bench_json --rows 1000 10000 --repeat 20
+
+Builds lists shaped like ``get_employee_feedback`` (raw ``datetime``
+timestamps included) and times Flask's default JSON provider against
+``FastJSONProvider``, then reports size and time for each compression
+setting on the encoded body.  No database is involved.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from compression import Compressor, brotli
+from fastjson import FastJSONProvider
+
+WORDS = ('clear', 'proactive', 'thorough', 'reliable', 'ownership', 'deadlines', 'reviews', 'stakeholders')
+
+
+def feedback_list(n, rng):
+    start = datetime(2024, 1, 1)
+    return [{
+        "id": i,
+        "manager_id": rng.randint(1, 50),
+        "manager_name": f"Manager {i % 50}",
+        "strengths": ' '.join(rng.choices(WORDS, k=25)),
+        "improvements": ' '.join(rng.choices(WORDS, k=25)),
+        "sentiment": rng.choice(('positive', 'neutral', 'negative')),
+        "timestamp": start + timedelta(minutes=i, microseconds=rng.randint(0, 999999)),
+        "acknowledged": bool(i % 2),
+    } for i in range(n)]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    settings = [("gzip-1", Compressor(gzip_level=1)), ("gzip-6", Compressor(gzip_level=6)),
+                ("gzip-9", Compressor(gzip_level=9))]
+    if brotli is not None:
+        settings += [(f"br-{q}", Compressor(brotli_quality=q)) for q in (1, 4, 11)]
+
+    results = {"json_backend": fast_provider.backend, "by_rows": {}}
+    for rows in args.rows:
+        items = feedback_list(rows, random.Random(rows))
+        with app.app_context():
+            default_ms = best_of(lambda: default_provider.response(items).get_data(), args.repeat)
+            fast_ms = best_of(lambda: fast_provider.response(items).get_data(), args.repeat)
+        body = fast_provider.dumps_bytes(items)
+        compression = {}
+        for name, compressor in settings:
+            encoding = 'br' if name.startswith('br') else 'gzip'
+            compressed = compressor.compress(body, encoding)
+            compression[name] = {"bytes": len(compressed), "ratio": round(len(body) / len(compressed), 1),
+                                 "ms": best_of(lambda: compressor.compress(body, encoding), args.repeat)}
+        results["by_rows"][rows] = {
+            "body_bytes": len(body),
+            "default_provider_ms": default_ms,
+            "fast_provider_ms": fast_ms,
+            "speedup": round(default_ms / fast_ms, 1) if fast_ms else None,
+            "compression": compression,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
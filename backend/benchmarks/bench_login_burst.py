@@ -0,0 +1,124 @@
+"""Latency of a non-auth endpoint while a burst of logins is in flight.
+
+    python -m benchmarks.bench_login_burst --logins 40 --workers 2
+
+Runs the app in a threaded HTTP server, resets every account to the
+pbkdf2:sha256:600000 hashes that init.sql seeds, and fires --logins
+concurrent logins.  Meanwhile a probe polls GET /api/feedback/stats/<id>
+and records its latency.  The run is repeated with hashing on the request
+threads (workers=0) and in the process pool, and reports probe p50/p95/p99
+plus how many logins succeeded or were turned away with 503.
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks.common import auth_header, load_app, serve_in_thread
+from benchmarks.seed import SeedConfig, seed
+from passwords import PasswordHasher
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2) if ordered else None
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def probe(url, token, stop, latencies, interval):
+    request = urllib.request.Request(url, headers={"Authorization": token})
+    while not stop.is_set():
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+
+
+def run_burst(feedback_app, base, org, logins, legacy_hash, probe_url):
+    token = auth_header(feedback_app, org.manager_ids[0])
+    with feedback_app.app.app_context():
+        feedback_app.User.query.update({"password": legacy_hash})
+        feedback_app.db.session.commit()
+
+    baseline = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(probe_url, token, stop, baseline, 0.01))
+    prober.start()
+    time.sleep(1.0)
+    stop.set()
+    prober.join()
+
+    statuses, during = [], []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(probe_url, token, stop, during, 0.01))
+    emails = [f"employee{i // 10}-{i % 10}@example.com" for i in range(len(org.employee_ids))]
+
+    def login(email):
+        statuses.append(post_json(f"{base}/api/login", {"email": email, "password": org.password}))
+
+    threads = [threading.Thread(target=login, args=(emails[i % len(emails)],)) for i in range(logins)]
+    prober.start()
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    burst_seconds = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    return {
+        "burst_seconds": round(burst_seconds, 2),
+        "logins_ok": statuses.count(200),
+        "logins_503": statuses.count(503),
+        "probe_baseline_p50_ms": percentile(baseline, 0.5),
+        "probe_p50_ms": percentile(during, 0.5),
+        "probe_p95_ms": percentile(during, 0.95),
+        "probe_p99_ms": percentile(during, 0.99),
+        "probe_samples": len(during),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=2, help="hashing processes for the pool run")
+    parser.add_argument('--max-pending', type=int, default=16)
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=4, employees_per_manager=10, feedback_per_employee=5))
+    legacy_hash = generate_password_hash(org.password, method='pbkdf2:sha256:600000')
+
+    server, base = serve_in_thread(feedback_app.app)
+    probe_url = f"{base}/api/feedback/stats/{org.manager_ids[0]}"
+
+    method = feedback_app.password_hasher.method
+    results = {}
+    for name, workers, max_pending in (("request_thread", 0, args.logins),
+                                       ("process_pool", args.workers, args.max_pending)):
+        feedback_app.password_hasher = PasswordHasher(method=method, workers=workers, max_pending=max_pending)
+        results[name] = run_burst(feedback_app, base, org, args.logins, legacy_hash, probe_url)
+        feedback_app.password_hasher.shutdown()
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Org hierarchy queries: closure table versus walking Team level by level.
+
+    python -m benchmarks.bench_org --directors 10 --managers 200 --employees-per-manager 50
+
+Seeds directors over managers over employees and times, for one director:
+the subtree through ``org_closure`` against one Team query per level (the
+recursive approach), the subtree stats and feedback endpoints, and the
+available-employees list with the old ``NOT IN`` subquery against the
+anti-join ``get_team_members`` now uses.
+"""
+import argparse
+import json
+
+from benchmarks.common import authed_client, load_app, summarize, time_call
+from benchmarks.seed import SeedConfig, seed
+
+
+def walk_levels(feedback_app, root_id):
+    """Subtree ids with one ``Team`` query per level."""
+    db, Team = feedback_app.db, feedback_app.Team
+    seen, frontier = set(), [root_id]
+    while frontier:
+        frontier = [employee_id for employee_id in db.session.scalars(
+            db.select(Team.employee_id).where(Team.manager_id.in_(frontier))) if employee_id not in seen]
+        seen.update(frontier)
+    return seen
+
+
+def not_in_members(feedback_app, manager_id):
+    User, Team, db = feedback_app.User, feedback_app.Team, feedback_app.db
+    subquery = db.session.query(Team.employee_id).filter(Team.manager_id == manager_id).subquery()
+    return User.query.filter(User.id.notin_(db.select(subquery.c.employee_id)), User.role != 'Manager').all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--directors', type=int, default=10)
+    parser.add_argument('--managers', type=int, default=200)
+    parser.add_argument('--employees-per-manager', type=int, default=50)
+    parser.add_argument('--feedback-per-employee', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=args.managers, directors=args.directors,
+                                            employees_per_manager=args.employees_per_manager,
+                                            feedback_per_employee=args.feedback_per_employee,
+                                            requests_per_employee=0))
+    director, manager = org.director_ids[0], org.manager_ids[0]
+    client = authed_client(feedback_app, director, 'Manager')
+
+    def closure_subtree():
+        with feedback_app.app.app_context():
+            subtree = feedback_app.org_subtree(director)
+            return set(feedback_app.db.session.scalars(feedback_app.db.select(subtree.c.descendant_id)))
+
+    def in_context(fn, *fn_args):
+        def call():
+            with feedback_app.app.app_context():
+                return fn(feedback_app, *fn_args)
+        return call
+
+    assert closure_subtree() == in_context(walk_levels, director)()
+    results = {
+        "subtree/closure": summarize(time_call(closure_subtree, args.repeat)),
+        "subtree/per_level": summarize(time_call(in_context(walk_levels, director), args.repeat)),
+        "endpoint/reports": summarize(time_call(
+            lambda: client.get(f"/api/org/{director}/reports?limit=100"), args.repeat)),
+        "endpoint/feedback": summarize(time_call(
+            lambda: client.get(f"/api/org/{director}/feedback?limit=50"), args.repeat)),
+        "endpoint/stats": summarize(time_call(lambda: client.get(f"/api/org/{director}/stats"), args.repeat)),
+        "members/not_in": summarize(time_call(in_context(not_in_members, manager), args.repeat)),
+    }
+    # The query itself; the endpoint caches its result
+    results["members/anti_join"] = summarize(time_call(in_context(
+        lambda app, manager_id: app.User.query.outerjoin(
+            app.Team, (app.Team.employee_id == app.User.id) & (app.Team.manager_id == manager_id)
+        ).filter(app.Team.id.is_(None), app.User.role != 'Manager').all(), manager), args.repeat))
+    with feedback_app.app.app_context():
+        closure_rows = feedback_app.db.session.query(feedback_app.OrgClosure).count()
+    print(json.dumps({
+        "users": args.directors + args.managers * (1 + args.employees_per_manager),
+        "closure_rows": closure_rows,
+        "timings": results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Reports per second: per-item PDF export vs. the batch endpoint.
+
+    python -m benchmarks.bench_pdf_export --reports 400 --workers 4
+
+Measures downloading every report of one manager one by one through
+``/api/feedback/export/<id>`` (the pre-batch path, with the render cache
+cleared before every request) against ``/api/feedback/export/batch`` cold,
+then warm from the render cache, and as a single merged PDF.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import authed_client, load_app
+from benchmarks.seed import SeedConfig, seed
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--reports', type=int, default=400, help="reports for the exported manager")
+    parser.add_argument('--workers', type=int, default=0, help="render processes (0: one per CPU)")
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    renderer = feedback_app.pdf_renderer
+    renderer.workers = args.workers or None
+    employees = 10
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=1, employees_per_manager=employees,
+                                            feedback_per_employee=max(1, args.reports // employees)))
+        manager_id = org.manager_ids[0]
+        ids = [r['id'] for r in feedback_app.feedback_reports(feedback_app.Feedback.manager_id == manager_id)]
+    client = authed_client(feedback_app)
+    batch_url = f"/api/feedback/export/batch?manager_id={manager_id}"
+
+    def per_item():
+        for feedback_id in ids:
+            renderer.cache = type(renderer.cache)(renderer.cache.max_bytes)
+            assert client.get(f"/api/feedback/export/{feedback_id}").status_code == 200
+
+    def batch():
+        response = client.get(batch_url)
+        assert response.status_code == 200
+        response.get_data()
+
+    def merged():
+        assert client.get(batch_url + "&format=pdf").status_code == 200
+
+    batch()  # start the process pool outside the measurement
+    renderer.cache = type(renderer.cache)(renderer.cache.max_bytes)
+    results = {}
+    for name, fn in (("per_item", per_item), ("batch_zip_cold", batch),
+                     ("batch_zip_cached", batch), ("batch_merged_pdf", merged)):
+        seconds = timed(fn)
+        results[name] = {"seconds": round(seconds, 3), "reports_per_second": round(len(ids) / seconds, 1)}
+    renderer.shutdown()
+    print(json.dumps({"reports": len(ids), "workers": renderer.workers, "results": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Read-replica routing and pool usage on two local SQLite files.
+
+    python -m benchmarks.bench_replicas --threads 8 --requests 400
+
+The primary and the replica are separate SQLite files; "replication" is an
+explicit copy with the sqlite3 backup API, so replica lag is visible.  The
+script checks that a manager sees their own new feedback right after posting
+it (read-your-writes on the primary), that another user reading through the
+replica does not until the copy runs, and then drives concurrent GETs to
+show reads spread over the replica pool alongside the pool gauges.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks.common import authed_client, load_app, summarize
+from benchmarks.seed import SeedConfig, seed
+
+
+def replicate(primary_path, replica_path):
+    src, dst = sqlite3.connect(primary_path), sqlite3.connect(replica_path)
+    with dst:
+        src.backup(dst)
+    src.close()
+    dst.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help="GETs per thread")
+    parser.add_argument('--window', type=float, default=1.0, help="read-your-writes seconds")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='feedback-replicas-')
+    primary_path = os.path.join(workdir, 'primary.db')
+    replica_path = os.path.join(workdir, 'replica.db')
+    os.environ['DATABASE_REPLICA_URLS'] = f"sqlite:///{replica_path}"
+    os.environ['DB_READ_YOUR_WRITES_SECONDS'] = str(args.window)
+    feedback_app = load_app(f"sqlite:///{primary_path}")
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=2, employees_per_manager=5, feedback_per_employee=10))
+    replicate(primary_path, replica_path)
+
+    manager_id, employee_id = org.manager_ids[0], org.employee_ids[0]
+    manager = authed_client(feedback_app, manager_id, 'Manager')
+    feedback_app.app.config['OPS_USER_IDS'].add(manager_id)  # to read /api/db/pool
+    employee = authed_client(feedback_app, employee_id, 'Employee')
+
+    def manager_count():
+        return len(manager.get(f"/api/feedback/manager/{manager_id}").json)
+
+    def employee_count():
+        return len(employee.get(f"/api/feedback/employee/{employee_id}").json)
+
+    checks = {"before_write": {"manager": manager_count(), "employee": employee_count()}}
+    manager.post('/api/feedback', json={"employee_id": employee_id, "manager_id": manager_id,
+                                        "strengths": "Routing", "improvements": "Lag",
+                                        "sentiment": "positive"})
+    checks["after_write"] = {"manager": manager_count(), "employee": employee_count()}
+    time.sleep(args.window)
+    checks["after_window"] = {"manager": manager_count(), "employee": employee_count()}
+    replicate(primary_path, replica_path)
+    checks["after_replication"] = {"manager": manager_count(), "employee": employee_count()}
+
+    timings = []
+    lock = threading.Lock()
+
+    def reader():
+        client = authed_client(feedback_app, employee_id, 'Employee')
+        local = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            client.get(f"/api/feedback/employee/{employee_id}")
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "visibility": checks,
+        "concurrent_reads": {"requests": len(timings), "requests_per_second": round(len(timings) / seconds, 1),
+                             **summarize(timings)},
+        "pool": manager.get('/api/db/pool').json,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Reorg throughput: bulk roster import against one request per reporting line.
+
+    python -m benchmarks.bench_roster --managers 200 --employees-per-manager 50
+
+Seeds directors over managers over employees (10,000 reporting lines with
+the defaults) and moves every employee to the next manager.  The move is
+made three ways, each from the same starting org:
+
+* per_pair: ``DELETE /api/team`` plus ``POST /api/team`` for each moved
+  employee, timed over the first --per-pair employees and extrapolated;
+* import_rebuild: one ``POST /api/team/import`` with every team, the closure
+  rebuilt in one pass;
+* import_incremental: the same import with the closure patched line by line.
+
+Reports the time, the number of SQL statements, and checks that the
+resulting teams and closure match a rebuild from scratch.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import authed_client, capture_sql, load_app
+from benchmarks.seed import SeedConfig, seed
+
+
+def reorg(teams, managers):
+    """Every employee of manager i moved to manager i + 1."""
+    return {str(managers[(i + 1) % len(managers)]): teams[manager_id] for i, manager_id in enumerate(managers)}
+
+
+def snapshot(feedback_app):
+    db = feedback_app.db
+    with feedback_app.app.app_context():
+        team = sorted(tuple(row) for row in db.session.execute(
+            db.select(feedback_app.Team.manager_id, feedback_app.Team.employee_id)))
+        closure = feedback_app.OrgClosure.__table__
+        return team, sorted(tuple(row) for row in db.session.execute(db.select(closure)))
+
+
+def check(feedback_app, expected_team):
+    team, closure = snapshot(feedback_app)
+    with feedback_app.app.app_context(), feedback_app.db.engine.begin() as conn:
+        feedback_app.rebuild_org_closure(conn)
+    return {"team_matches": team == expected_team, "closure_matches": closure == snapshot(feedback_app)[1]}
+
+
+def restore(feedback_app, team):
+    db, Team = feedback_app.db, feedback_app.Team
+    with feedback_app.app.app_context():
+        db.session.execute(db.delete(Team))
+        db.session.execute(db.insert(Team), [{"manager_id": m, "employee_id": e} for m, e in team])
+        db.session.commit()
+        with db.engine.begin() as conn:
+            feedback_app.rebuild_org_closure(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--directors', type=int, default=10)
+    parser.add_argument('--managers', type=int, default=200)
+    parser.add_argument('--employees-per-manager', type=int, default=50)
+    parser.add_argument('--per-pair', type=int, default=500, help="employees moved one request at a time")
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=args.managers, directors=args.directors,
+                                            employees_per_manager=args.employees_per_manager,
+                                            feedback_per_employee=0, requests_per_employee=0))
+        engine = feedback_app.db.engine
+    client = authed_client(feedback_app, org.director_ids[0] if org.director_ids else org.manager_ids[0])
+    start_team, _ = snapshot(feedback_app)
+    teams = {manager_id: [] for manager_id in org.manager_ids}
+    for manager_id, employee_id in start_team:
+        if manager_id in teams:
+            teams[manager_id].append(employee_id)
+    body = reorg(teams, org.manager_ids)
+    moved = sum(len(employee_ids) for employee_ids in body.values())
+    expected = sorted({(m, e) for m, e in start_team if m not in teams}
+                      | {(int(m), e) for m, employee_ids in body.items() for e in employee_ids})
+    results = {}
+
+    # One request pair per moved employee, over a sample
+    sample = [(int(new), old, e) for (old, employee_ids), new in zip(teams.items(), body)
+              for e in employee_ids][:args.per_pair]
+    with capture_sql(engine) as statements:
+        started = time.perf_counter()
+        for new_manager, old_manager, employee_id in sample:
+            client.delete('/api/team', json={"manager_id": old_manager, "employee_id": employee_id})
+            client.post('/api/team', json={"manager_id": new_manager, "employee_id": employee_id})
+        seconds = time.perf_counter() - started
+    results["per_pair"] = {"moved": len(sample), "seconds": round(seconds, 3),
+                           "statements": len(statements), "requests": 2 * len(sample),
+                           "estimated_seconds_for_all": round(seconds / max(len(sample), 1) * moved, 1)}
+
+    for name, threshold in (("import_rebuild", None), ("import_incremental", 10 ** 9)):
+        restore(feedback_app, start_team)
+        if threshold is not None:
+            feedback_app.app.config['TEAM_SYNC_REBUILD_THRESHOLD'] = threshold
+        with capture_sql(engine) as statements:
+            started = time.perf_counter()
+            response = client.post('/api/team/import', json=body)
+            seconds = time.perf_counter() - started
+        assert response.status_code == 200, response.json
+        results[name] = {"moved": moved, "seconds": round(seconds, 3), "statements": len(statements),
+                         "added": len(response.json["added"]), "removed": len(response.json["removed"]),
+                         **check(feedback_app, expected)}
+
+    restore(feedback_app, start_team)
+    started = time.perf_counter()
+    response = client.post('/api/team/import?dry_run=1', json=body)
+    results["dry_run"] = {"seconds": round(time.perf_counter() - started, 3),
+                          "added": len(response.json["added"]), "removed": len(response.json["removed"])}
+    print(json.dumps({"reporting_lines": len(start_team), "moved_employees": moved, "results": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
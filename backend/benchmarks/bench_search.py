@@ -0,0 +1,75 @@
+"""Search latency on a large seeded corpus.
+
+    python -m benchmarks.bench_search --managers 100 --employees-per-manager 50 \\
+        --feedback-per-employee 200 --target-ms 200
+
+The defaults seed one million feedback rows (plus a comment and two tags
+each) with a Zipf-distributed keyword vocabulary, build the search index,
+then time ``/api/feedback/search`` for rare, mid-frequency and common terms,
+multi-word and prefix queries, each unscoped and scoped to one manager and
+one employee.  A query passes when its p95 is under ``--target-ms``.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import authed_client, load_app, summarize, time_call
+from benchmarks.seed import SeedConfig, seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file)")
+    parser.add_argument('--managers', type=int, default=100)
+    parser.add_argument('--employees-per-manager', type=int, default=50)
+    parser.add_argument('--feedback-per-employee', type=int, default=200)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--target-ms', type=float, default=200)
+    args = parser.parse_args()
+
+    feedback_app = load_app(args.url)
+    start = time.perf_counter()
+    with feedback_app.app.app_context():
+        feedback_app.init_db()
+        org = seed(feedback_app, SeedConfig(managers=args.managers,
+                                            employees_per_manager=args.employees_per_manager,
+                                            feedback_per_employee=args.feedback_per_employee,
+                                            requests_per_employee=0, vocabulary=args.vocabulary))
+    seed_seconds = time.perf_counter() - start
+    client = authed_client(feedback_app, org.manager_ids[0], 'Manager')
+    queries = {
+        "rare_keyword": f"kw{args.vocabulary - 7}",
+        "mid_keyword": "kw500",
+        "common_keyword": "kw1",
+        "common_word": "thorough",
+        "two_words": "kw1 kw2",
+        "prefix": "kw12",
+        "tag": "leadership",
+    }
+    scopes = {
+        "all": "",
+        "manager": f"&manager_id={org.manager_ids[0]}",
+        "employee": f"&employee_id={org.employee_ids[0]}",
+    }
+    results = {}
+    for name, q in queries.items():
+        for scope, params in scopes.items():
+            url = f"/api/feedback/search?q={q}&limit=20{params}"
+            response = client.get(url)
+            assert response.status_code == 200, response.json
+            stats = summarize(time_call(lambda: client.get(url), args.repeat))
+            results[f"{name}/{scope}"] = {**stats, "hits": len(response.json['results']),
+                                          "pass": stats['p95_ms'] < args.target_ms}
+    print(json.dumps({
+        "backend": feedback_app.search_index.info(),
+        "feedback_rows": org.feedback_count,
+        "seed_and_index_seconds": round(seed_seconds, 1),
+        "target_ms": args.target_ms,
+        "all_pass": all(r['pass'] for r in results.values()),
+        "queries": results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Trend latency from the rollup versus aggregating raw feedback.
+
+    python -m benchmarks.bench_trends --feedback-per-employee 20 200 --repeat 20
+
+For each corpus size, times ``/api/feedback/trends`` (org, manager, team and
+employee scopes, weekly and monthly) and, for comparison, the equivalent
+GROUP BY over the raw feedback and tag rows.  The rollup read should stay
+flat as the corpus grows while the raw aggregation grows with it.
+"""
+import argparse
+import json
+
+from sqlalchemy import func
+
+from benchmarks.common import authed_client, load_app, summarize, time_call
+from benchmarks.seed import SeedConfig, seed
+
+
+def raw_trend(feedback_app, period, manager_id=None):
+    """The monthly/weekly org or manager trend computed from raw rows."""
+    db, feedback, tag = feedback_app.db, feedback_app.Feedback.__table__, feedback_app.Tag.__table__
+    bucket = func.strftime('%Y-%m' if period == 'month' else '%Y-%W', feedback.c.timestamp)
+    queries = [
+        db.select(bucket, feedback.c.sentiment, func.count()).group_by(bucket, feedback.c.sentiment),
+        db.select(bucket, tag.c.tag_name, feedback.c.sentiment, func.count()).join(
+            tag, tag.c.feedback_id == feedback.c.id).group_by(bucket, tag.c.tag_name, feedback.c.sentiment),
+    ]
+    if manager_id is not None:
+        queries = [query.where(feedback.c.manager_id == manager_id) for query in queries]
+    with feedback_app.app.app_context():
+        for query in queries:
+            db.session.execute(query).all()
+        db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="database URL (default: a fresh SQLite file per size)")
+    parser.add_argument('--managers', type=int, default=20)
+    parser.add_argument('--employees-per-manager', type=int, default=10)
+    parser.add_argument('--feedback-per-employee', type=int, nargs='+', default=[20, 200])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    feedback_app = load_app(args.url)
+    for per_employee in args.feedback_per_employee:
+        with feedback_app.app.app_context():
+            feedback_app.db.drop_all()
+            feedback_app.init_db()
+            org = seed(feedback_app, SeedConfig(managers=args.managers,
+                                                employees_per_manager=args.employees_per_manager,
+                                                feedback_per_employee=per_employee,
+                                                requests_per_employee=0))
+            trend_rows = feedback_app.db.session.query(feedback_app.SentimentTrend).count()
+        manager = org.manager_ids[0]
+        client = authed_client(feedback_app, manager, 'Manager')
+        timings = {}
+        for period in ('week', 'month'):
+            for scope, params in (('org', ''), ('manager', f'&id={manager}'), ('team', f'&id={manager}'),
+                                  ('employee', f'&id={org.employee_ids[0]}')):
+                url = f"/api/feedback/trends?period={period}&scope={scope}{params}"
+                assert client.get(url).status_code == 200
+                timings[f"rollup/{period}/{scope}"] = summarize(time_call(lambda: client.get(url), args.repeat))
+            for scope, manager_id in (('org', None), ('manager', manager)):
+                timings[f"raw/{period}/{scope}"] = summarize(time_call(
+                    lambda: raw_trend(feedback_app, period, manager_id), args.repeat))
+        results[org.feedback_count] = {"trend_rows": trend_rows, "timings": timings}
+    print(json.dumps({"by_feedback_rows": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
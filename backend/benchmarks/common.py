@@ -0,0 +1,99 @@
+"""Helpers shared by the benchmark scripts."""
+import contextlib
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+def load_app(url=None):
+    """Import the Flask app bound to ``url`` (a fresh SQLite file by default).
+
+    ``app.py`` reads its database URL and SECRET_KEY at import time, so this
+    has to run before anything else imports it.
+    """
+    if url is None:
+        fd, path = tempfile.mkstemp(prefix='feedback-bench-', suffix='.db')
+        os.close(fd)
+        url = f"sqlite:///{path}"
+    os.environ['DATABASE_URL'] = url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    import app as feedback_app
+    return feedback_app
+
+
+def auth_header(feedback_app, user_id=1, role='Manager'):
+    return f"Bearer {feedback_app.token_signer.issue(user_id, role)}"
+
+
+def authed_client(feedback_app, user_id=1, role='Manager'):
+    """A test client that sends a valid token for ``user_id`` on every request."""
+    client = feedback_app.app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = auth_header(feedback_app, user_id, role)
+    return client
+
+
+@contextlib.contextmanager
+def capture_sql(engine):
+    """Collect ``(statement, parameters)`` for every statement run on ``engine``."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(conn, statement, parameters):
+    """Return the query plan for ``statement`` as a list of strings."""
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().fetchall()
+    return [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}"
+            for row in rows]
+
+
+def time_call(fn, repeat):
+    """Run ``fn`` ``repeat`` times and return the timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(percentile(ordered, 0.95), 3),
+        "p99_ms": round(percentile(ordered, 0.99), 3),
+        "min_ms": round(ordered[0], 3),
+    }
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def serve_in_thread(wsgi_app):
+    """Serve ``wsgi_app`` from a threaded HTTP server; returns ``(server, base_url)``."""
+    server = make_server('127.0.0.1', 0, wsgi_app, threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -0,0 +1,81 @@
+"""Diff two ``benchmarks.suite`` result files and flag regressions.
+
+    python -m benchmarks.compare before.json after.json --threshold 15 --metric p95_ms
+
+A route regresses when its latency metric grew by more than
+``--threshold`` percent (and by at least ``--min-ms``, so sub-millisecond
+noise is ignored) or when it issues more SQL statements than before.  Under
+load, the overall requests per second regresses when it dropped by more
+than the threshold.  Exits with status 1 if anything regressed, so it can
+gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(before, after, metric='p95_ms', threshold=10.0, min_ms=0.5):
+    rows, regressions = [], []
+    for name in sorted(set(before['routes']) | set(after['routes'])):
+        old, new = before['routes'].get(name), after['routes'].get(name)
+        if old is None or new is None:
+            rows.append((name, old and old[metric], new and new[metric], None, 'added' if old is None else 'removed'))
+            continue
+        change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+        notes = []
+        if change > threshold and new[metric] - old[metric] >= min_ms:
+            notes.append(f"{metric} +{change:.0f}%")
+        if new['sql_statements'] > old['sql_statements']:
+            notes.append(f"sql {old['sql_statements']} -> {new['sql_statements']}")
+        if notes:
+            regressions.append(name)
+        rows.append((name, old[metric], new[metric], change, ', '.join(notes)))
+    load = None
+    if before.get('load') and after.get('load'):
+        old_rps, new_rps = before['load']['rps'], after['load']['rps']
+        change = (new_rps - old_rps) / old_rps * 100 if old_rps else 0.0
+        load = (old_rps, new_rps, change)
+        if change < -threshold:
+            regressions.append('load')
+    return rows, load, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--metric', default='p95_ms', choices=('median_ms', 'p95_ms', 'p99_ms', 'min_ms'))
+    parser.add_argument('--threshold', type=float, default=10.0, help="allowed slowdown in percent")
+    parser.add_argument('--min-ms', type=float, default=0.5, help="ignore changes smaller than this")
+    parser.add_argument('--json', action='store_true', help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    rows, load, regressions = compare(before, after, args.metric, args.threshold, args.min_ms)
+
+    if args.json:
+        print(json.dumps({
+            "metric": args.metric, "threshold_pct": args.threshold,
+            "routes": {name: {"before": old, "after": new, "change_pct": None if change is None else round(change, 1),
+                              "regression": bool(note) and name in regressions, "note": note}
+                       for name, old, new, change, note in rows},
+            "load_rps": None if load is None else {"before": load[0], "after": load[1], "change_pct": round(load[2], 1)},
+            "regressions": regressions,
+        }, indent=2))
+    else:
+        print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}  ({args.metric}, threshold {args.threshold}%)")
+        for name, old, new, change, note in rows:
+            change_text = '' if change is None else f"{change:+7.1f}%"
+            print(f"{name:34} {old if old is not None else '-':>10} {new if new is not None else '-':>10} "
+                  f"{change_text:>9}  {note}")
+        if load:
+            print(f"{'load rps':34} {load[0]:>10} {load[1]:>10} {load[2]:+7.1f}%")
+        print(f"{len(regressions)} regression(s){': ' + ', '.join(regressions) if regressions else ''}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
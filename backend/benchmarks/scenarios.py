@@ -0,0 +1,236 @@
+"""One request recipe per route, for the benchmark suite.
+
+Each scenario is keyed by Flask endpoint name and builds a ``Call`` for the
+next iteration.  ``PAGED`` lists the keyset-paged listings, which the suite
+also walks with ``after=`` to the last page.  Builders may make untimed setup requests first (a delete
+needs something to delete), and use ``Context.n`` to keep writes unique, so
+every iteration does the same work.  Routes that cannot be timed as a
+single request/response are listed in ``SKIPPED`` with the reason, and the
+suite reports any endpoint that is in neither table.
+"""
+import json
+from dataclasses import dataclass, field
+
+from benchmarks.common import auth_header
+
+
+@dataclass
+class Call:
+    method: str
+    url: str
+    json: object = None
+    data: bytes = None
+    content_type: str = None
+    headers: dict = field(default_factory=dict)
+
+    @property
+    def read_only(self):
+        return self.method == 'GET'
+
+
+class Context:
+    """Seeded ids plus helpers shared by the scenario builders."""
+
+    def __init__(self, feedback_app, org, client):
+        self.app = feedback_app
+        self.org = org
+        self.client = client
+        self.manager = org.manager_ids[0]
+        self.employee = org.employee_ids[0]
+        self.outsider = org.employee_ids[-1]  # on another manager's team
+        self.director = org.director_ids[0] if org.director_ids else self.manager
+        # The operational endpoints are timed as the manager too
+        feedback_app.app.config['OPS_USER_IDS'].add(self.manager)
+        with feedback_app.app.app_context():
+            Feedback = feedback_app.Feedback
+            self.feedback = feedback_app.db.session.scalar(
+                feedback_app.db.select(Feedback.id).where(Feedback.employee_id == self.employee)
+                .order_by(Feedback.id).limit(1))
+            FeedbackRequest = feedback_app.FeedbackRequest
+            self.feedback_request = feedback_app.db.session.scalar(
+                feedback_app.db.select(FeedbackRequest.id).where(FeedbackRequest.target_manager_id == self.manager)
+                .order_by(FeedbackRequest.id).limit(1))
+        self._n = 0
+        # Writes go to a feedback of their own, so the rows they add do not
+        # change what the read scenarios return
+        self.scratch = self.new_feedback()
+
+    def as_user(self, user_id, role='Manager'):
+        """Headers that send a call as ``user_id`` instead of the manager."""
+        return {"Authorization": auth_header(self.app, user_id, role)}
+
+    def n(self):
+        self._n += 1
+        return self._n
+
+    def new_feedback(self):
+        response = self.client.post('/api/feedback', json=self.feedback_body())
+        return response.json['id']
+
+    def new_tag(self):
+        self.client.post('/api/feedback/tags', json={"feedback_id": self.scratch, "tag_name": f"Bench {self.n()}"})
+        return max(tag['id'] for tag in self.client.get(f'/api/feedback/tags/{self.scratch}').json)
+
+    def feedback_body(self):
+        n = self.n()
+        return {"employee_id": self.employee, "manager_id": self.manager,
+                "strengths": f"Clear and reliable delivery {n}", "improvements": "Earlier estimates",
+                "sentiment": ('positive', 'neutral', 'negative')[n % 3]}
+
+
+def _bulk(ctx, rows=100):
+    body = '\n'.join(json.dumps({**ctx.feedback_body(), "tags": ["Teamwork"]}) for _ in range(rows))
+    return Call('POST', '/api/feedback/bulk', data=body.encode(), content_type='application/x-ndjson')
+
+
+def _edit_feedback(ctx):
+    n = ctx.n()
+    return Call('PUT', f'/api/feedback/{ctx.scratch}', json={
+        "strengths": f"Edited {n}", "sentiment": ('positive', 'neutral')[n % 2]})
+
+
+def _remove_team_member(ctx):
+    ctx.client.post('/api/team', json={"manager_id": ctx.manager, "employee_id": ctx.outsider})
+    return Call('DELETE', '/api/team', json={"manager_id": ctx.manager, "employee_id": ctx.outsider})
+
+
+def _add_team_member(ctx):
+    ctx.client.delete('/api/team', json={"manager_id": ctx.manager, "employee_id": ctx.outsider})
+    return Call('POST', '/api/team', json={"manager_id": ctx.manager, "employee_id": ctx.outsider})
+
+
+def _team_ids(ctx):
+    return [member['id'] for member in ctx.client.get(f'/api/team/{ctx.manager}').json]
+
+
+def _sync_team(ctx):
+    # Alternately adds and removes the outsider, like the add/remove scenarios
+    team = [employee_id for employee_id in _team_ids(ctx) if employee_id != ctx.outsider]
+    if ctx.n() % 2:
+        team.append(ctx.outsider)
+    return Call('PUT', f'/api/team/{ctx.manager}/sync', json={"employee_ids": team})
+
+
+def _import_teams(ctx):
+    body = '\n'.join(['manager_id,employee_id', *(f'{ctx.manager},{employee_id}' for employee_id in _team_ids(ctx))])
+    return Call('POST', '/api/team/import', data=body.encode(), content_type='text/csv')
+
+
+def _job(ctx):
+    # A finished job: the suite runs no worker threads, so drain the queue here
+    response = ctx.client.post('/api/jobs', json={"kind": "feedback_pdf", "params": {"feedback_id": ctx.feedback}})
+    queue = ctx.app.job_queue
+    with ctx.app.app.app_context():
+        while (job := queue.claim('bench')) is not None:
+            queue.run(job, 'bench')
+    return response.json['id']
+
+
+def _cancel_job(ctx):
+    response = ctx.client.post('/api/jobs', json={"kind": "feedback_pdf", "params": {"feedback_id": ctx.feedback}})
+    return Call('DELETE', f"/api/jobs/{response.json['id']}")
+
+
+def _logout(ctx):
+    # A token of its own: logging out revokes it
+    return Call('POST', '/api/logout', headers={"Authorization": auth_header(ctx.app, ctx.manager, 'Manager')})
+
+
+SCENARIOS = {
+    'index': lambda ctx: Call('GET', '/'),
+    'login': lambda ctx: Call('POST', '/api/login', json={"email": "manager0@example.com", "password": "password"}),
+    'logout': _logout,
+    'register': lambda ctx: Call('POST', '/api/register', json={
+        "name": "Bench User", "email": f"bench{ctx.n()}@example.com", "password": "password"}),
+    'get_users': lambda ctx: Call('GET', '/api/users?role=Employee&limit=50'),
+    'get_user': lambda ctx: Call('GET', f'/api/user/{ctx.employee}'),
+    'get_team': lambda ctx: Call('GET', f'/api/team/{ctx.manager}'),
+    'get_team_members': lambda ctx: Call('GET', f'/api/team/members/{ctx.manager}'),
+    'add_team_member': _add_team_member,
+    'remove_team_member': _remove_team_member,
+    'sync_team': _sync_team,
+    'import_teams': _import_teams,
+    'get_org_reports': lambda ctx: Call('GET', f'/api/org/{ctx.director}/reports?limit=100', headers=ctx.as_user(ctx.director)),
+    'get_org_feedback': lambda ctx: Call('GET', f'/api/org/{ctx.director}/feedback?limit=50', headers=ctx.as_user(ctx.director)),
+    'get_org_stats': lambda ctx: Call('GET', f'/api/org/{ctx.director}/stats', headers=ctx.as_user(ctx.director)),
+    'submit_feedback': lambda ctx: Call('POST', '/api/feedback', json=ctx.feedback_body()),
+    'bulk_submit_feedback': _bulk,
+    'get_feedback': lambda ctx: Call('GET', f'/api/feedback/{ctx.feedback}'),
+    'get_feedback_full': lambda ctx: Call('GET', f'/api/feedback/{ctx.feedback}/full'),
+    'edit_feedback': _edit_feedback,
+    'delete_feedback': lambda ctx: Call('DELETE', f'/api/feedback/{ctx.new_feedback()}'),
+    'get_employee_feedback': lambda ctx: Call('GET', f'/api/feedback/employee/{ctx.employee}?limit=50'),
+    'get_manager_feedback': lambda ctx: Call('GET', f'/api/feedback/manager/{ctx.manager}?limit=50'),
+    'get_employee_stats': lambda ctx: Call('GET', f'/api/feedback/employee/stats/{ctx.employee}'),
+    'get_manager_stats': lambda ctx: Call('GET', f'/api/feedback/stats/{ctx.manager}'),
+    'get_sentiment_trends': lambda ctx: Call('GET', f'/api/feedback/trends?scope=team&id={ctx.manager}'),
+    'search_feedback': lambda ctx: Call('GET', '/api/feedback/search?q=clear+reli&limit=20'),
+    'acknowledge_feedback': lambda ctx: Call('POST', '/api/feedback/acknowledge', json={
+        "feedback_id": ctx.scratch, "employee_id": ctx.employee}, headers=ctx.as_user(ctx.employee, 'Employee')),
+    'get_acknowledgements': lambda ctx: Call('GET', f'/api/feedback/acknowledgements/{ctx.feedback}'),
+    'add_comment': lambda ctx: Call('POST', '/api/comments', json={
+        "feedback_id": ctx.scratch, "user_id": ctx.manager, "text": f"Follow-up {ctx.n()}"}),
+    'get_comments': lambda ctx: Call('GET', f'/api/comments/{ctx.feedback}'),
+    'add_feedback_tag': lambda ctx: Call('POST', '/api/feedback/tags', json={
+        "feedback_id": ctx.scratch, "tag_name": f"Bench {ctx.n()}"}),
+    'get_feedback_tags': lambda ctx: Call('GET', f'/api/feedback/tags/{ctx.feedback}'),
+    'delete_feedback_tag': lambda ctx: Call('DELETE', f'/api/feedback/tags/{ctx.new_tag()}'),
+    'request_feedback': lambda ctx: Call('POST', '/api/feedback/request', json={
+        "requester_id": ctx.employee, "target_manager_id": ctx.manager, "message": "Quarterly check-in"},
+        headers=ctx.as_user(ctx.employee, 'Employee')),
+    'update_feedback_request_status': lambda ctx: Call('PUT', f'/api/feedback/request/{ctx.feedback_request}',
+                                                       json={"status": ('approved', 'declined')[ctx.n() % 2]}),
+    'get_feedback_requests': lambda ctx: Call('GET', f'/api/feedback/requests/{ctx.manager}?limit=50'),
+    'get_employee_feedback_requests': lambda ctx: Call('GET', f'/api/feedback/requests/employee/{ctx.employee}'),
+    'export_feedback_stream': lambda ctx: Call('GET', f'/api/feedback/export?manager_id={ctx.manager}'),
+    'export_feedback_pdf': lambda ctx: Call('GET', f'/api/feedback/export/{ctx.feedback}'),
+    'export_feedback_batch': lambda ctx: Call('GET', f'/api/feedback/export/batch?employee_id={ctx.employee}'),
+    'queue_feedback_pdf': lambda ctx: Call('POST', f'/api/feedback/export/{ctx.feedback}'),
+    'queue_feedback_export': lambda ctx: Call('POST', f'/api/feedback/export?manager_id={ctx.manager}'),
+    'queue_feedback_batch': lambda ctx: Call('POST', f'/api/feedback/export/batch?employee_id={ctx.employee}'),
+    'create_job': lambda ctx: Call('POST', '/api/jobs', json={
+        "kind": "feedback_pdf", "params": {"feedback_id": ctx.feedback}}),
+    'list_jobs': lambda ctx: Call('GET', '/api/jobs?limit=20'),
+    'get_job': lambda ctx: Call('GET', f'/api/jobs/{_job(ctx)}'),
+    'get_job_result': lambda ctx: Call('GET', f'/api/jobs/{_job(ctx)}/result'),
+    'cancel_job': _cancel_job,
+    'get_job_stats': lambda ctx: Call('GET', '/api/jobs/stats'),
+    'get_archive_stats': lambda ctx: Call('GET', '/api/archive/stats'),
+    'get_cache_stats': lambda ctx: Call('GET', '/api/cache/stats'),
+    'get_db_pool_stats': lambda ctx: Call('GET', '/api/db/pool'),
+    'get_event_stats': lambda ctx: Call('GET', '/api/events/stats'),
+    'get_n_plus_one_report': lambda ctx: Call('GET', '/api/metrics/n-plus-one'),
+    'get_metrics': lambda ctx: Call('GET', '/metrics'),
+}
+
+def api_rows(ctx, n=5):
+    """Write feedback, comments and feedback requests through the API, so the
+    listings hold rows stamped the way the server stamps them (the seed
+    writes its own timestamps)."""
+    for _ in range(n):
+        ctx.new_feedback()
+        ctx.client.post('/api/comments', json={"feedback_id": ctx.scratch, "user_id": ctx.manager,
+                                               "text": f"Paging {ctx.n()}"})
+        ctx.client.post('/api/feedback/request', json={
+            "requester_id": ctx.employee, "target_manager_id": ctx.manager, "message": f"Paging {ctx.n()}"},
+            headers=ctx.as_user(ctx.employee, 'Employee'))
+
+
+# Listing URL without paging parameters, and who reads it
+PAGED = {
+    'get_users': lambda ctx: ('/api/users?role=Employee', {}),
+    'get_org_reports': lambda ctx: (f'/api/org/{ctx.director}/reports', ctx.as_user(ctx.director)),
+    'get_org_feedback': lambda ctx: (f'/api/org/{ctx.director}/feedback', ctx.as_user(ctx.director)),
+    'get_employee_feedback': lambda ctx: (f'/api/feedback/employee/{ctx.employee}', {}),
+    'get_manager_feedback': lambda ctx: (f'/api/feedback/manager/{ctx.manager}', {}),
+    'get_comments': lambda ctx: (f'/api/comments/{ctx.scratch}', {}),
+    'get_feedback_requests': lambda ctx: (f'/api/feedback/requests/{ctx.manager}', {}),
+    'get_employee_feedback_requests': lambda ctx: (
+        f'/api/feedback/requests/employee/{ctx.employee}', ctx.as_user(ctx.employee, 'Employee')),
+    'list_jobs': lambda ctx: ('/api/jobs', {}),
+}
+
+SKIPPED = {
+    'stream_events': "open-ended Server-Sent Events stream (see bench_events)",
+    'static': "no static files are served",
+}
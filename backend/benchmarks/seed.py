@@ -0,0 +1,169 @@
+"""Synthetic organisation seeding for the benchmarks.
+
+Rows are written with executemany-style bulk inserts so seeding a few
+hundred thousand feedback rows takes seconds rather than minutes.
+"""
+import itertools
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+TAG_NAMES = ('Communication', 'Leadership', 'Teamwork', 'Technical Skills',
+             'Problem Solving', 'Time Management', 'Creativity', 'Initiative')
+WORDS = ('clear', 'reliable', 'proactive', 'thorough', 'collaborative', 'focused',
+         'delivery', 'ownership', 'mentoring', 'planning', 'estimates', 'reviews',
+         'design', 'testing', 'documentation', 'stakeholders', 'deadlines', 'quality')
+
+CHUNK = 5000
+
+
+@dataclass
+class SeedConfig:
+    managers: int = 20
+    employees_per_manager: int = 10
+    feedback_per_employee: int = 20
+    comments_per_feedback: int = 1
+    tags_per_feedback: int = 2
+    ack_ratio: float = 0.6
+    requests_per_employee: int = 2
+    days: int = 730
+    seed: int = 1234
+    # Extra synthetic words ('kw0', 'kw1', ...) drawn with a Zipf skew, two
+    # per text, so search benchmarks have rare as well as common terms.
+    vocabulary: int = 0
+    # Directors above the managers (each manager reports to one, round
+    # robin), so the org hierarchy has a skip level.
+    directors: int = 0
+    # Cheap hash so seeding stays fast; benchmarks that exercise login
+    # re-hash the accounts they log in with.
+    password_method: str = 'pbkdf2:sha256:1000'
+
+
+@dataclass
+class SeededOrg:
+    manager_ids: list
+    employee_ids: list
+    feedback_count: int
+    password: str = 'password'
+    director_ids: list = field(default_factory=list)
+
+
+def _text(rng, words=12, extra=None):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    if extra:
+        text += ' ' + ' '.join(extra())
+    return text.capitalize() + '.'
+
+
+def _zipf_words(rng, size):
+    """Return a function picking two of ``size`` keywords, word k with weight 1/(k+1)."""
+    if not size:
+        return None
+    words = [f"kw{k}" for k in range(size)]
+    cum_weights = list(itertools.accumulate(1 / (k + 1) for k in range(size)))
+    return lambda: rng.choices(words, cum_weights=cum_weights, k=2)
+
+
+def _insert(session, model, rows):
+    for start in range(0, len(rows), CHUNK):
+        session.execute(insert(model), rows[start:start + CHUNK])
+
+
+def seed(feedback_app, config=None):
+    """Populate the database behind ``feedback_app`` and return a ``SeededOrg``.
+
+    Must be called inside an application context.  Ids are assigned
+    explicitly so the child tables can be written without reading back the
+    generated keys.
+    """
+    config = config or SeedConfig()
+    rng = random.Random(config.seed)
+    extra = _zipf_words(rng, config.vocabulary)
+    db = feedback_app.db
+    session = db.session
+    password = generate_password_hash('password', method=config.password_method)
+    now = datetime.utcnow()
+
+    def when():
+        return now - timedelta(seconds=rng.randrange(config.days * 86400))
+
+    users, manager_ids, employee_ids = [], [], []
+    user_id = 0
+    for m in range(config.managers):
+        user_id += 1
+        manager_ids.append(user_id)
+        users.append({"id": user_id, "name": f"Manager {m}", "email": f"manager{m}@example.com",
+                      "password": password, "role": 'Manager'})
+    teams = []
+    for m, manager_id in enumerate(manager_ids):
+        for e in range(config.employees_per_manager):
+            user_id += 1
+            employee_ids.append(user_id)
+            users.append({"id": user_id, "name": f"Employee {m}-{e}",
+                          "email": f"employee{m}-{e}@example.com",
+                          "password": password, "role": 'Employee'})
+            teams.append({"manager_id": manager_id, "employee_id": user_id})
+    manager_of = {t["employee_id"]: t["manager_id"] for t in teams}
+    director_ids = []
+    for d in range(config.directors):
+        user_id += 1
+        director_ids.append(user_id)
+        users.append({"id": user_id, "name": f"Director {d}", "email": f"director{d}@example.com",
+                      "password": password, "role": 'Manager'})
+    for m, manager_id in enumerate(manager_ids if director_ids else ()):
+        teams.append({"manager_id": director_ids[m % len(director_ids)], "employee_id": manager_id})
+    _insert(session, feedback_app.User, users)
+    _insert(session, feedback_app.Team, teams)
+
+    feedback, comments, tags, acks, requests = [], [], [], [], []
+    feedback_id = comment_id = 0
+    for employee_id in employee_ids:
+        manager_id = manager_of[employee_id]
+        for _ in range(config.feedback_per_employee):
+            feedback_id += 1
+            created = when()
+            feedback.append({"id": feedback_id, "employee_id": employee_id, "manager_id": manager_id,
+                             "strengths": _text(rng, extra=extra), "improvements": _text(rng, extra=extra),
+                             "sentiment": rng.choice(SENTIMENTS), "timestamp": created})
+            for c in range(config.comments_per_feedback):
+                comment_id += 1
+                comments.append({"id": comment_id, "feedback_id": feedback_id,
+                                 "user_id": employee_id if c % 2 == 0 else manager_id,
+                                 "text": _text(rng, 8), "is_markdown": True,
+                                 "timestamp": created + timedelta(hours=c + 1)})
+            for tag_name in rng.sample(TAG_NAMES, config.tags_per_feedback):
+                tags.append({"feedback_id": feedback_id, "tag_name": tag_name})
+            if rng.random() < config.ack_ratio:
+                acks.append({"feedback_id": feedback_id, "employee_id": employee_id,
+                             "timestamp": created + timedelta(days=1)})
+        for _ in range(config.requests_per_employee):
+            requests.append({"requester_id": employee_id, "target_manager_id": manager_id,
+                             "message": _text(rng, 6), "status": 'pending',
+                             "timestamp": when(), "is_anonymous": rng.random() < 0.2})
+        if len(feedback) >= CHUNK:
+            _flush(session, feedback_app, feedback, comments, tags, acks, requests)
+    _flush(session, feedback_app, feedback, comments, tags, acks, requests)
+    session.commit()
+    # Bulk inserts bypass the write paths that maintain the rollups and the
+    # search index
+    with db.engine.begin() as conn:
+        feedback_app.rebuild_feedback_stats(conn)
+        feedback_app.rebuild_search_index(conn)
+        feedback_app.rebuild_sentiment_trends(conn)
+        feedback_app.rebuild_org_closure(conn)
+    return SeededOrg(manager_ids=manager_ids, employee_ids=employee_ids, feedback_count=feedback_id,
+                     director_ids=director_ids)
+
+
+def _flush(session, feedback_app, feedback, comments, tags, acks, requests):
+    _insert(session, feedback_app.Feedback, feedback)
+    _insert(session, feedback_app.Comment, comments)
+    _insert(session, feedback_app.Tag, tags)
+    _insert(session, feedback_app.Acknowledgement, acks)
+    _insert(session, feedback_app.FeedbackRequest, requests)
+    for rows in (feedback, comments, tags, acks, requests):
+        rows.clear()
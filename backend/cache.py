@@ -0,0 +1,182 @@
+"""Read-through cache for rarely written, often read payloads.
+
+The default backend is an in-process LRU with a TTL.  ``RedisCache`` adapts
+any client with the redis-py ``get``/``set``/``delete``/``scan_iter``
+methods (a local Redis, or a compatible stand-in), so several app processes
+can share one cache and see each other's invalidations.
+
+Values must be JSON-serialisable; they are the payloads the routes return.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.sets = self.evictions = self.expirations = self.invalidations = 0
+
+    def incr(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class CacheBackend:
+    """Interface every cache backend implements.
+
+    ``get`` returns ``None`` on a miss, so ``None`` itself is not cacheable.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_or_set(self, key, loader, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def info(self):
+        return {"backend": type(self).__name__, "ttl": self.ttl, **self.stats.as_dict()}
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, max_entries=1024, ttl=300):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.stats.incr('expirations')
+                entry = None
+            if entry is None:
+                self.stats.incr('misses')
+                return None
+            self._entries.move_to_end(key)
+        self.stats.incr('hits')
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        self.stats.incr('sets')
+        if evicted:
+            self.stats.incr('evictions', evicted)
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = sum(self._entries.pop(key, None) is not None for key in keys)
+        self.stats.incr('invalidations', removed)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            doomed = [key for key in self._entries if key.startswith(prefix)]
+            for key in doomed:
+                del self._entries[key]
+        self.stats.incr('invalidations', len(doomed))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            size = len(self._entries)
+        return {**super().info(), "size": size, "max_entries": self.max_entries}
+
+
+class RedisCache(CacheBackend):
+    """Cache backend on a redis-py compatible client.
+
+    Evictions and expirations are the server's business and are not counted
+    here.
+    """
+
+    def __init__(self, client, ttl=300, namespace='feedback:'):
+        super().__init__(ttl)
+        self.client = client
+        self.namespace = namespace
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the 'redis' package installed")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        raw = self.client.get(self.namespace + key)
+        if raw is None:
+            self.stats.incr('misses')
+            return None
+        self.stats.incr('hits')
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.namespace + key, json.dumps(value), ex=ttl if ttl is not None else self.ttl)
+        self.stats.incr('sets')
+
+    def delete(self, *keys):
+        if keys:
+            self.stats.incr('invalidations', self.client.delete(*(self.namespace + key for key in keys)))
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.namespace + prefix + '*'))
+        if keys:
+            self.stats.incr('invalidations', self.client.delete(*keys))
+
+    def clear(self):
+        self.delete_prefix('')
+
+
+def create_cache(config):
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = config.get('CACHE_TTL', 300)
+    if backend == 'memory':
+        return LRUCache(max_entries=config.get('CACHE_MAX_ENTRIES', 1024), ttl=ttl)
+    if backend == 'redis':
+        return RedisCache.from_url(config['CACHE_REDIS_URL'], ttl=ttl)
+    raise ValueError(f"Unknown CACHE_BACKEND {backend!r}")
@@ -0,0 +1,55 @@
+"""Negotiated gzip/brotli compression of buffered responses.
+
+Applied in ``after_request``.  A response is compressed when the client
+accepts an encoding we support, the body is at least ``min_size`` bytes,
+its mimetype is textual and it has no Content-Encoding yet.  Streamed
+responses (exports, event streams) and already-compressed formats such as
+PDF and zip are left alone.  Brotli is used only if the ``brotli`` package is
+installed and the client prefers it or ranks it equally with gzip.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain',
+    'text/css', 'application/javascript',
+))
+
+
+class Compressor:
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4, mimetypes=COMPRESSIBLE_MIMETYPES):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.mimetypes = mimetypes
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def choose_encoding(self, accept_encodings):
+        """Best supported encoding from a werkzeug ``Accept`` header, or None."""
+        return accept_encodings.best_match(self.encodings)
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def after_request(self, response, request):
+        if response.mimetype not in self.mimetypes:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+                or response.status_code in (204, 304) or 'Content-Encoding' in response.headers):
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        encoding = self.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        response.set_data(self.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,180 @@
+"""Connection pool options and read-replica routing.
+
+``GET``/``HEAD`` requests read from a replica, picked round-robin once per
+request so every query in it sees the same snapshot.  Anything else, every
+flush and any INSERT/UPDATE/DELETE statement go to the primary.
+
+Replicas lag behind the primary, so after a user's request commits a write
+their reads stay on the primary for ``window`` seconds (read-your-writes).
+The window is tracked per process, like the token revocation list; with
+several app processes a user may still read from a replica right after a
+write handled elsewhere, so keep the window above the usual replication lag.
+"""
+import contextlib
+import itertools
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_METHODS = frozenset(('GET', 'HEAD'))
+_UNSET = object()
+
+
+def engine_options(url, pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800,
+                   pool_pre_ping=True):
+    """Keyword arguments for ``create_engine`` with the pool settings applied.
+
+    In-memory SQLite uses a single shared connection, so it gets no sizing.
+    """
+    options = {'pool_pre_ping': pool_pre_ping, 'pool_recycle': pool_recycle}
+    if url in ('sqlite://', 'sqlite:///:memory:'):
+        return options
+    options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+    return options
+
+
+class ReplicaRouter:
+    """Chooses the bind key each request reads from.
+
+    ``replicas`` are keys of ``SQLALCHEMY_BINDS``; ``principal`` returns who
+    the current request is acting for (or None), to apply the
+    read-your-writes window.
+    """
+
+    def __init__(self, replicas, window=5.0, principal=lambda: None):
+        self.replicas = list(replicas)
+        self.window = window
+        self.principal = principal
+        self._next = itertools.count()
+        self._last_write = {}  # principal -> time.monotonic() of the last commit
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def read_bind(self):
+        """Bind key for a read in the current request; None means the primary."""
+        if not self.replicas or not has_request_context() or request.method not in READ_METHODS:
+            return None
+        key = g.get('db_read_bind', _UNSET)
+        if key is _UNSET:
+            key = g.db_read_bind = self._choose()
+        return key
+
+    @contextlib.contextmanager
+    def primary(self):
+        """Read from the primary inside the block, e.g. to fill a shared cache."""
+        if not has_request_context():
+            yield
+            return
+        previous = g.get('db_read_bind', _UNSET)
+        g.db_read_bind = None
+        try:
+            yield
+        finally:
+            if previous is _UNSET:
+                g.pop('db_read_bind', None)
+            else:
+                g.db_read_bind = previous
+
+    def _choose(self):
+        principal = self.principal()
+        if principal is not None and self.wrote_recently(principal):
+            self.stats['primary_reads'] += 1
+            return None
+        key = self.replicas[next(self._next) % len(self.replicas)]
+        self.stats[f'{key}_reads'] += 1
+        return key
+
+    def wrote_recently(self, principal):
+        last = self._last_write.get(principal)
+        return last is not None and time.monotonic() - last < self.window
+
+    def record_write(self):
+        principal = self.principal() if has_request_context() else None
+        self.stats['writes'] += 1
+        if principal is None or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[principal] = now
+            if len(self._last_write) > 10000:
+                cutoff = now - self.window
+                self._last_write = {p: t for p, t in self._last_write.items() if t >= cutoff}
+
+    def info(self):
+        return {"replicas": self.replicas, "read_your_writes_seconds": self.window,
+                "requests": dict(self.stats)}
+
+
+class RoutingSession(Session):
+    """``db.session`` class that sends reads to ``router.read_bind()``."""
+
+    def __init__(self, db, router=None, **kwargs):
+        super().__init__(db, **kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.router is not None and not self._flushing \
+                and not isinstance(clause, UpdateBase):
+            key = self.router.read_bind()
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _executed(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _committed(session):
+    if session.info.pop('wrote', False) and session.router is not None:
+        session.router.record_write()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _rolled_back(session):
+    session.info.pop('wrote', None)
+
+
+class PoolMonitor:
+    """Connection pool counters and gauges for a set of engines."""
+
+    def __init__(self):
+        self._engines = {}
+        self._counts = {}
+
+    def watch(self, name, engine):
+        counts = self._counts[name] = Counter()
+        self._engines[name] = engine
+
+        def on(event_name):
+            def listener(*args):
+                counts[event_name] += 1
+            event.listen(engine.pool, event_name, listener)
+
+        for event_name in ('connect', 'checkout', 'checkin', 'invalidate', 'soft_invalidate', 'close'):
+            on(event_name)
+
+    def info(self):
+        result = {}
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            gauges = {"pool": type(pool).__name__, "status": pool.status()}
+            for attr in ('size', 'checkedin', 'checkedout', 'overflow'):
+                if hasattr(pool, attr):
+                    gauges[attr] = getattr(pool, attr)()
+            gauges["events"] = dict(self._counts[name])
+            result[name] = gauges
+        return result
@@ -0,0 +1,71 @@
+"""Flask JSON provider backed by orjson, when it is installed.
+
+Every ``datetime``/``date`` is written as ISO-8601, the same text as
+``.isoformat()``, whether a handler converted it or not (Flask's default
+provider writes raw datetimes as HTTP dates instead).  orjson encodes
+straight to bytes, which the response uses as-is.  Without orjson the
+provider falls back to the standard library with the same output.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(obj):
+    # Types neither encoder handles natively; matches Flask's choices
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    sort_keys = False
+    compact = None  # None: indented only in debug mode, like Flask's default
+    mimetype = 'application/json'
+
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+
+    def dumps_bytes(self, obj, indent=False):
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_default, option=option)
+        return json.dumps(obj, default=_default, sort_keys=self.sort_keys, ensure_ascii=False,
+                          indent=2 if indent else None,
+                          separators=None if indent else (',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = self.dumps_bytes(obj, indent=indent)
+        if indent:
+            body += b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
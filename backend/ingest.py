@@ -0,0 +1,163 @@
+"""Incremental parsing and validation for bulk feedback uploads.
+
+Uploads are read from the request stream a chunk at a time, so memory use
+depends on the batch size, not on the size of the payload.  Two body formats
+are accepted: NDJSON (one object per line) and a single JSON array.
+"""
+import codecs
+import io
+import json
+from datetime import datetime, timezone
+from itertools import islice
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+MAX_ROW_BYTES = 1024 * 1024
+MAX_TAGS = 20
+_WHITESPACE = ' \t\n\r'
+
+
+class RowError(ValueError):
+    """A single row is invalid; the rest of the upload is unaffected."""
+
+
+class StreamError(ValueError):
+    """The body cannot be parsed any further."""
+
+
+def iter_ndjson(stream):
+    """Yield ``(obj, error)`` for each non-blank line of ``stream``."""
+    if isinstance(stream, io.RawIOBase):
+        # Unbuffered streams (e.g. the WSGI input) read lines byte by byte
+        stream = io.BufferedReader(stream, buffer_size=64 * 1024)
+    while True:
+        line = stream.readline(MAX_ROW_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_ROW_BYTES:
+            raise StreamError(f"Row larger than {MAX_ROW_BYTES} bytes")
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as e:
+            yield None, RowError(f"Invalid JSON: {e}")
+
+
+def iter_json_array(stream, chunk_size=64 * 1024):
+    """Yield ``(obj, None)`` for each element of a JSON array read from ``stream``.
+
+    Elements are decoded as soon as they are complete.  A syntax error cannot
+    be recovered from, so it raises ``StreamError``.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    state = {"buf": '', "pos": 0, "eof": False}
+
+    def more():
+        chunk = stream.read(chunk_size)
+        rest = state["buf"][state["pos"]:]
+        if len(rest) > MAX_ROW_BYTES:
+            raise StreamError(f"Row larger than {MAX_ROW_BYTES} bytes")
+        if chunk:
+            state["buf"] = rest + utf8.decode(chunk)
+        else:
+            state["buf"] = rest + utf8.decode(b'', final=True)
+            state["eof"] = True
+        state["pos"] = 0
+
+    def peek():
+        # Next non-whitespace character, or None at the end of the body
+        while True:
+            buf, pos = state["buf"], state["pos"]
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buf):
+                return buf[pos]
+            if state["eof"]:
+                return None
+            more()
+
+    if peek() != '[':
+        raise StreamError("Expected a JSON array")
+    state["pos"] += 1
+    if peek() == ']':
+        return
+    while True:
+        if peek() is None:
+            raise StreamError("Unterminated JSON array")
+        while True:
+            try:
+                obj, end = decoder.raw_decode(state["buf"], state["pos"])
+            except json.JSONDecodeError as e:
+                if state["eof"]:
+                    raise StreamError(f"Invalid JSON: {e}")
+                more()
+                continue
+            if end == len(state["buf"]) and not state["eof"]:
+                # A number could continue in the next chunk
+                more()
+                continue
+            break
+        state["pos"] = end
+        yield obj, None
+        separator = peek()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise StreamError("Expected ',' or ']' between array elements")
+        state["pos"] += 1
+
+
+def _required_text(obj, field):
+    value = obj.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise RowError(f"{field} is required")
+    return value
+
+
+def _required_id(obj, field):
+    value = obj.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise RowError(f"{field} must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"{field} must be an integer")
+
+
+def validate_feedback(obj):
+    """Return ``(feedback_values, tag_names)`` for one uploaded row."""
+    if not isinstance(obj, dict):
+        raise RowError("Row must be a JSON object")
+    values = {
+        "employee_id": _required_id(obj, 'employee_id'),
+        "manager_id": _required_id(obj, 'manager_id'),
+        "strengths": _required_text(obj, 'strengths'),
+        "improvements": _required_text(obj, 'improvements'),
+        "sentiment": obj.get('sentiment'),
+    }
+    if values["sentiment"] not in SENTIMENTS:
+        raise RowError(f"sentiment must be one of {', '.join(SENTIMENTS)}")
+    if obj.get('timestamp') is not None:
+        try:
+            values["timestamp"] = datetime.fromisoformat(obj['timestamp'])
+        except (TypeError, ValueError):
+            raise RowError("timestamp must be an ISO-8601 date-time")
+        if values["timestamp"].tzinfo is not None:
+            # Stored timestamps are naive UTC
+            values["timestamp"] = values["timestamp"].astimezone(timezone.utc).replace(tzinfo=None)
+    tags = obj.get('tags') or []
+    if not isinstance(tags, list) or len(tags) > MAX_TAGS or not all(
+            isinstance(t, str) and 0 < len(t) <= 50 for t in tags):
+        raise RowError(f"tags must be a list of at most {MAX_TAGS} names of 1-50 characters")
+    return values, tags
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
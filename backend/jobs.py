@@ -0,0 +1,282 @@
+"""Background jobs: a queue in the ``job`` table and workers that drain it.
+
+A job is a row with a ``kind`` (a registered handler), JSON ``params`` and a
+status that moves ``queued`` -> ``running`` -> ``succeeded``/``failed``
+(or ``cancelled`` while still queued, ``expired`` once its result is
+removed).  The handler writes its result to a file under ``result_dir``
+that the API serves until ``result_ttl`` has passed.
+
+Workers claim jobs with a conditional UPDATE, so any number of threads and
+processes, on any number of hosts sharing the database, can drain the same
+queue.  A claimed job holds a lease that its worker renews while the
+handler runs; if the worker dies, the job is claimed again once the lease
+runs out.  A failed attempt is retried with exponential backoff up to
+``max_attempts``.  Each kind has a concurrency limit counted over the
+running jobs in the table; two workers claiming at the same moment can
+briefly exceed it by one.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select
+
+log = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+@dataclass
+class JobKind:
+    name: str
+    handler: object        # handler(params, out) -> {"filename": ..., "mimetype": ...}
+    validate: object       # validate(params, auth) -> normalised params; raises ValueError
+    concurrency: int
+    roles: tuple
+
+
+class JobRegistry:
+    def __init__(self):
+        self.kinds = {}
+
+    def register(self, name, concurrency=2, roles=(), validate=None):
+        """Decorator registering ``handler(params, out)`` as job kind ``name``."""
+        def decorator(handler):
+            self.kinds[name] = JobKind(name, handler, validate or (lambda params, auth: params),
+                                       concurrency, tuple(roles))
+            return handler
+        return decorator
+
+    def __contains__(self, name):
+        return name in self.kinds
+
+    def __getitem__(self, name):
+        return self.kinds[name]
+
+
+class JobQueue:
+    def __init__(self, table, registry, engine, context, result_dir, lease_seconds=300, max_attempts=3,
+                 retry_backoff=5.0, result_ttl=86400, poll_interval=1.0):
+        # ``engine`` and ``context`` are callables: the database engine, and
+        # a context manager (the app context) that queue access and handlers
+        # run inside.
+        self.table = table
+        self.registry = registry
+        self.engine = engine
+        self.context = context
+        self.result_dir = result_dir
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._threads = []
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # Producer side
+
+    def submit(self, session, kind, params, owner_id=None):
+        """Queue a job in ``session``'s transaction and return the values of
+        its row, id included (reading it back could hit a lagging replica)."""
+        now = datetime.utcnow()
+        values = dict(kind=kind, params=json.dumps(params), status='queued', owner_id=owner_id, attempts=0,
+                      max_attempts=self.max_attempts, created_at=now, run_after=now)
+        result = session.execute(self.table.insert().values(**values))
+        return {"id": result.inserted_primary_key[0], **values}
+
+    def notify(self):
+        """Wake the in-process workers after a submit has committed."""
+        self._wake.set()
+
+    def cancel(self, session, job_id):
+        t = self.table
+        return session.execute(t.update().where(t.c.id == job_id, t.c.status == 'queued').values(
+            status='cancelled', finished_at=datetime.utcnow(),
+            expires_at=datetime.utcnow() + timedelta(seconds=self.result_ttl))).rowcount == 1
+
+    def pending_for(self, session, owner_id):
+        t = self.table
+        return session.execute(select(func.count()).select_from(t).where(
+            t.c.owner_id == owner_id, t.c.status.in_(ACTIVE_STATUSES))).scalar()
+
+    # Worker side
+
+    def _claimable(self, now):
+        t = self.table
+        return or_(and_(t.c.status == 'queued', t.c.run_after <= now),
+                   and_(t.c.status == 'running', t.c.lease_expires < now))
+
+    def claim(self, worker):
+        """Take the oldest runnable job whose kind has capacity, or None."""
+        t = self.table
+        now = datetime.utcnow()
+        with self.engine().begin() as conn:
+            running = dict(conn.execute(select(t.c.kind, func.count()).where(
+                t.c.status == 'running', t.c.lease_expires >= now).group_by(t.c.kind)).all())
+            kinds = [name for name, kind in self.registry.kinds.items()
+                     if running.get(name, 0) < kind.concurrency]
+            if not kinds:
+                return None
+            candidates = conn.execute(select(t.c.id).where(
+                self._claimable(now), t.c.kind.in_(kinds)).order_by(t.c.id).limit(8)).scalars().all()
+            for job_id in candidates:
+                claimed = conn.execute(t.update().where(t.c.id == job_id, self._claimable(now)).values(
+                    status='running', worker=worker, started_at=now, attempts=t.c.attempts + 1,
+                    lease_expires=now + timedelta(seconds=self.lease_seconds))).rowcount
+                if claimed:
+                    return conn.execute(select(t).where(t.c.id == job_id)).one()
+        return None
+
+    def _renew(self, job_id, worker):
+        t = self.table
+        with self.engine().begin() as conn:
+            return conn.execute(t.update().where(t.c.id == job_id, t.c.worker == worker,
+                                                 t.c.status == 'running').values(
+                lease_expires=datetime.utcnow() + timedelta(seconds=self.lease_seconds))).rowcount == 1
+
+    def _finish(self, job, worker, values):
+        t = self.table
+        with self.engine().begin() as conn:
+            # Only if the lease is still ours; otherwise another worker has it
+            return conn.execute(t.update().where(t.c.id == job.id, t.c.worker == worker,
+                                                 t.c.status == 'running').values(**values)).rowcount == 1
+
+    def run(self, job, worker):
+        """Run a claimed job to success, retry or failure."""
+        kind = self.registry[job.kind]
+        os.makedirs(self.result_dir, exist_ok=True)
+        path = os.path.join(self.result_dir, f"job-{job.id}-{job.attempts}")
+        stop_renewing = threading.Event()
+
+        def renew():
+            while not stop_renewing.wait(self.lease_seconds / 3):
+                try:
+                    with self.context():
+                        if not self._renew(job.id, worker):
+                            return
+                except Exception:
+                    log.exception("Could not renew the lease of job %s", job.id)
+
+        renewer = threading.Thread(target=renew, name=f'job-{job.id}-lease', daemon=True)
+        renewer.start()
+        try:
+            with self.context(), open(path, 'wb') as out:
+                meta = kind.handler(json.loads(job.params), out) or {}
+        except Exception as e:
+            log.exception("Job %s (%s) attempt %s failed", job.id, job.kind, job.attempts)
+            stop_renewing.set()
+            _remove(path)
+            now = datetime.utcnow()
+            if job.attempts < job.max_attempts:
+                values = {"status": 'queued', "error": str(e)[:1000], "worker": None,
+                          "run_after": now + timedelta(seconds=self.retry_backoff * 2 ** (job.attempts - 1))}
+            else:
+                values = {"status": 'failed', "error": str(e)[:1000], "finished_at": now,
+                          "expires_at": now + timedelta(seconds=self.result_ttl)}
+            with self.context():
+                self._finish(job, worker, values)
+            return False
+        stop_renewing.set()
+        now = datetime.utcnow()
+        with self.context():
+            finished = self._finish(job, worker, {
+                "status": 'succeeded', "finished_at": now, "error": None,
+                "expires_at": now + timedelta(seconds=self.result_ttl),
+                "result_path": path, "result_name": meta.get('filename', f"job-{job.id}"),
+                "result_mimetype": meta.get('mimetype', 'application/octet-stream'),
+                "result_size": os.path.getsize(path),
+            })
+        if not finished:
+            _remove(path)
+        return True
+
+    def expire(self):
+        """Delete results past their expiry; returns how many were removed."""
+        t = self.table
+        now = datetime.utcnow()
+        with self.engine().begin() as conn:
+            rows = conn.execute(select(t.c.id, t.c.result_path).where(
+                t.c.status.in_(('succeeded', 'failed', 'cancelled')), t.c.expires_at < now)).all()
+            for job_id, path in rows:
+                if path:
+                    _remove(path)
+                conn.execute(t.update().where(t.c.id == job_id).values(status='expired', result_path=None))
+        return len(rows)
+
+    def work(self, worker, stop=None, sweep_every=60.0):
+        """Claim and run jobs until ``stop`` is set."""
+        stop = stop or self._stop
+        next_sweep = 0.0
+        while not stop.is_set():
+            try:
+                with self.context():
+                    if time.monotonic() >= next_sweep:
+                        self.expire()
+                        next_sweep = time.monotonic() + sweep_every
+                    job = self.claim(worker)
+            except Exception:
+                log.exception("Job worker %s could not reach the queue", worker)
+                job = None
+            if job is not None:
+                self.run(job, worker)
+                continue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    # Running workers
+
+    def start_threads(self, count):
+        """Start ``count`` worker threads in this process (once)."""
+        with self._threads_lock:
+            while len(self._threads) < count:
+                name = f"{socket.gethostname()}:{os.getpid()}:t{len(self._threads)}"
+                thread = threading.Thread(target=self.work, args=(name,), name=f'job-worker-{len(self._threads)}',
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def run_processes(self, processes, threads=1):
+        """Run worker processes in the foreground until interrupted.
+
+        Uses fork so the children inherit the configured app; each drops the
+        connections it inherited before touching the database.
+        """
+        context = multiprocessing.get_context('fork')
+        children = [context.Process(target=self._process_main, args=(threads,), name=f'job-worker-{i}')
+                    for i in range(processes)]
+        for child in children:
+            child.start()
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+
+    def _process_main(self, threads):
+        with self.context():
+            self.engine().dispose(close=False)
+        self.start_threads(threads)
+        for thread in self._threads:
+            thread.join()
+
+    def info(self, session):
+        t = self.table
+        counts = dict(session.execute(select(t.c.status, func.count()).group_by(t.c.status)).all())
+        return {"statuses": counts, "worker_threads": len(self._threads),
+                "kinds": {name: {"concurrency": kind.concurrency} for name, kind in self.registry.kinds.items()}}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,329 @@
+"""Request metrics in Prometheus text format, plus an opt-in profiler.
+
+``RequestMetrics`` times every request by route template (``/api/feedback/<feedback_id>``,
+not the concrete URL, so label cardinality stays bounded) and counts the SQL
+statements each request runs and the time spent in them, using engine
+events.  A request that runs the same SELECT more than
+``n_plus_one_threshold`` times is counted and logged as a likely N+1.
+
+``SamplingProfiler`` samples the stacks of in-flight request threads every
+few milliseconds and, for requests slower than ``slow_ms``, writes the
+samples as folded stacks (``frame;frame;frame count``), the input format of
+flamegraph.pl and speedscope.
+
+Everything is kept in process memory; with several worker processes each
+serves its own ``/metrics``, as with the Prometheus client's default mode.
+"""
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as Tally, deque
+
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = Tally()
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels):
+        return self._values[tuple(labels[name] for name in self.labelnames)]
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {values[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(values[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {values[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """The text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class SamplingProfiler:
+    """Samples registered threads from one background thread."""
+
+    def __init__(self, directory, slow_ms, interval=0.005, max_depth=128):
+        self.directory = directory
+        self.slow_ms = slow_ms
+        self.interval = interval
+        self.max_depth = max_depth
+        self.dumps = 0
+        self._active = {}  # thread id -> Tally of folded stacks
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        samples = Tally()
+        with self._lock:
+            self._active[threading.get_ident()] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return samples
+
+    def stop(self):
+        with self._lock:
+            return self._active.pop(threading.get_ident(), None)
+
+    def _fold(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            module = frame.f_globals.get('__name__') or os.path.basename(frame.f_code.co_filename)
+            names.append(f"{module}:{frame.f_code.co_name}")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = dict(self._active)
+                if not active:
+                    # Cleared under the lock so a concurrent start() cannot be missed
+                    self._wake.clear()
+            if not active:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[self._fold(frame)] += 1
+            time.sleep(self.interval)
+
+    def dump(self, route, samples, duration_ms):
+        """Write ``samples`` for a request if it was slow; returns the path or None."""
+        if duration_ms < self.slow_ms or not samples:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{int(duration_ms)}ms.folded")
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.dumps += 1
+        return path
+
+
+class _RequestState:
+    __slots__ = ('route', 'method', 'start', 'status', 'size', 'sql_count', 'sql_seconds', 'selects', 'deferred')
+
+    def __init__(self, route, method):
+        self.route, self.method = route, method
+        self.start = time.perf_counter()
+        self.status, self.size = 500, None
+        self.sql_count, self.sql_seconds = 0, 0.0
+        self.selects = Tally()
+        self.deferred = False
+
+
+class RequestMetrics:
+    def __init__(self, registry=None, n_plus_one_threshold=10, profiler=None):
+        self.registry = registry or Registry()
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.profiler = profiler
+        self.recent_n_plus_one = deque(maxlen=50)
+        self._current = contextvars.ContextVar('request_metrics_state', default=None)
+        r = self.registry
+        self.requests = r.histogram('http_request_duration_seconds', "Request latency by route",
+                                    ('method', 'route', 'status'))
+        self.response_size = r.histogram('http_response_size_bytes', "Response body size (after compression)",
+                                         ('method', 'route'), SIZE_BUCKETS)
+        self.sql_statements = r.histogram('http_request_sql_statements', "SQL statements per request",
+                                          ('method', 'route'), COUNT_BUCKETS)
+        self.sql_time = r.histogram('http_request_sql_duration_seconds', "Time in SQL per request",
+                                    ('method', 'route'))
+        self.n_plus_one = r.counter('http_request_n_plus_one', "Requests repeating one SELECT above the threshold",
+                                    ('method', 'route'))
+        self.pdf_render = r.histogram('pdf_render_duration_seconds', "PDF rendering time by mode",
+                                      ('mode',))
+        self.pdf_documents = r.counter('pdf_rendered_documents', "Reports rendered to PDF (cache misses)",
+                                       ('mode',))
+
+    # Request lifecycle
+
+    def begin(self, route, method):
+        if self.profiler is not None:
+            self.profiler.start()
+        self._current.set(_RequestState(route, method))
+
+    def set_response(self, status, size):
+        state = self._current.get()
+        if state is not None:
+            state.status, state.size = status, size
+
+    def defer(self):
+        """Leave the end of the current request to the returned callable.
+
+        For a streamed body, which is still being sent when the request is
+        torn down: pass the callable to ``response.call_on_close`` so the
+        timing (and the SQL the body runs) covers the whole stream.
+        """
+        state = self._current.get()
+        if state is None:
+            return lambda: None
+        state.deferred = True
+        return lambda: self._finish(state)
+
+    def end(self):
+        state = self._current.get()
+        if state is not None and not state.deferred:
+            self._finish(state)
+
+    def _finish(self, state):
+        if self._current.get() is state:
+            self._current.set(None)
+        duration = time.perf_counter() - state.start
+        labels = {"method": state.method, "route": state.route}
+        self.requests.observe(duration, status=str(state.status), **labels)
+        if state.size is not None:
+            self.response_size.observe(state.size, **labels)
+        self.sql_statements.observe(state.sql_count, **labels)
+        self.sql_time.observe(state.sql_seconds, **labels)
+        if state.selects:
+            statement, repeats = state.selects.most_common(1)[0]
+            if repeats > self.n_plus_one_threshold:
+                self.n_plus_one.inc(**labels)
+                self.recent_n_plus_one.append({"route": state.route, "method": state.method,
+                                               "repeats": repeats, "statement": statement[:300]})
+                log.warning("Possible N+1 in %s %s: %d x %s", state.method, state.route, repeats,
+                            ' '.join(statement.split())[:200])
+        if self.profiler is not None:
+            samples = self.profiler.stop()
+            path = self.profiler.dump(f"{state.method} {state.route}", samples, duration * 1000)
+            if path:
+                log.info("Profiled slow request %s %s (%.0f ms): %s", state.method, state.route,
+                         duration * 1000, path)
+
+    # SQL
+
+    def watch_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_query_start')
+        elapsed = time.perf_counter() - started.pop() if started else 0.0
+        state = self._current.get()
+        if state is None:
+            return
+        state.sql_count += 1
+        state.sql_seconds += elapsed
+        if statement.lstrip()[:6].upper() == 'SELECT':
+            state.selects[statement] += 1
+
+    # Other timings
+
+    def observe_pdf_render(self, mode, seconds, documents):
+        self.pdf_render.observe(seconds, mode=mode)
+        self.pdf_documents.inc(documents, mode=mode)
+
+    def render(self):
+        return self.registry.render()
+
+    def info(self):
+        return {
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "recent_n_plus_one": list(self.recent_n_plus_one),
+            "profiler": None if self.profiler is None else {
+                "slow_ms": self.profiler.slow_ms, "directory": self.profiler.directory,
+                "dumps": self.profiler.dumps,
+            },
+        }
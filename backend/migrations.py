@@ -0,0 +1,129 @@
+"""Versioned schema migrations.
+
+``db.create_all()`` only creates tables that are missing, so anything added
+to an existing table (indexes, constraints, new columns) has to be applied
+from here.  Every migration runs once per database and is recorded in the
+``schema_version`` table.  Migrations check the live schema before changing
+it, so they are safe to run against databases created by ``init.sql`` or by
+a newer ``create_all()`` that already has the objects.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect, select
+
+_metadata = MetaData()
+
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register ``fn(conn)`` as migration ``version``."""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def create_index(conn, table_name, index_name, *columns, unique=False):
+    """Create an index unless an index with that name already exists."""
+    existing = {ix['name'] for ix in inspect(conn).get_indexes(table_name)}
+    if index_name in existing:
+        return False
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    Index(index_name, *(table.c[col] for col in columns), unique=unique).create(conn)
+    return True
+
+
+def drop_index(conn, table_name, index_name):
+    """Drop an index if it exists."""
+    existing = {ix['name'] for ix in inspect(conn).get_indexes(table_name)}
+    if index_name not in existing:
+        return False
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    Index(index_name, _table=table).drop(conn)
+    return True
+
+
+def add_column(conn, table_name, column):
+    """Add ``column`` (a ``Column``) unless the table already has it."""
+    existing = {col['name'] for col in inspect(conn).get_columns(table_name)}
+    if column.name in existing:
+        return False
+    quote = conn.dialect.identifier_preparer.quote
+    conn.exec_driver_sql(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(column.name)} "
+                         f"{column.type.compile(dialect=conn.dialect)}")
+    return True
+
+
+# --- Migrations ---
+
+@migration(1, "Composite indexes for the filter-and-sort list queries")
+def _lookup_indexes(conn):
+    create_index(conn, 'feedback', 'ix_feedback_manager_id_timestamp', 'manager_id', 'timestamp')
+    create_index(conn, 'feedback', 'ix_feedback_employee_id_timestamp', 'employee_id', 'timestamp')
+    create_index(conn, 'feedback_request', 'ix_feedback_request_target_manager_id_timestamp',
+                 'target_manager_id', 'timestamp')
+    create_index(conn, 'feedback_request', 'ix_feedback_request_requester_id_timestamp',
+                 'requester_id', 'timestamp')
+    create_index(conn, 'comment', 'ix_comment_feedback_id_timestamp', 'feedback_id', 'timestamp')
+    create_index(conn, 'acknowledgement', 'ix_acknowledgement_employee_id_feedback_id',
+                 'employee_id', 'feedback_id')
+    create_index(conn, 'acknowledgement', 'ix_acknowledgement_feedback_id', 'feedback_id')
+    create_index(conn, 'tag', 'ix_tag_feedback_id', 'feedback_id')
+    create_index(conn, 'team', 'ix_team_manager_id_employee_id', 'manager_id', 'employee_id')
+
+
+
+@migration(8, "Store SQLite timestamps in the format SQLAlchemy binds")
+def _sqlite_timestamps(conn):
+    # SQLite's CURRENT_TIMESTAMP default wrote 'YYYY-MM-DD HH:MM:SS', while
+    # SQLAlchemy binds a datetime as 'YYYY-MM-DD HH:MM:SS.ffffff'.  As text
+    # such a row sorts below the cursor made from it, so keyset pages over
+    # it never advanced.  The models now set the timestamp in Python.
+    if conn.dialect.name != 'sqlite':
+        return
+    existing = set(inspect(conn).get_table_names())
+    for table_name in ('feedback', 'comment', 'acknowledgement', 'feedback_request'):
+        if table_name in existing:
+            conn.exec_driver_sql(f"UPDATE {table_name} SET timestamp = timestamp || '.000000' "
+                                 f"WHERE length(timestamp) = 19")
+
+
+# --- Runner ---
+
+def applied_versions(conn):
+    schema_version.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def current_version(engine):
+    with engine.begin() as conn:
+        return max(applied_versions(conn), default=0)
+
+
+def upgrade(engine, target=None):
+    """Apply pending migrations in order and return the versions applied.
+
+    Each migration commits on its own so a failure leaves the earlier ones
+    recorded.
+    """
+    applied = []
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, description, fn in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()))
+        applied.append(version)
+    return applied
@@ -0,0 +1,152 @@
+"""Keyset (cursor) pagination for the list endpoints.
+
+A page is requested with ``?limit=N`` and continued with
+``?after=<next_cursor>``.  The cursor is an opaque token holding the sort key
+of the last row returned, and the next page filters on
+``(timestamp, id) < (cursor timestamp, cursor id)``.  With an index on the
+filter column plus ``timestamp`` every page costs the same however deep it
+is, unlike ``OFFSET`` which has to walk past every skipped row.
+
+Callers that send neither parameter get the whole list in the original
+response shape.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+Page = namedtuple('Page', 'rows next_cursor paged')
+
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(raw, list) or len(raw) != len(columns):
+        raise ValueError("Invalid cursor")
+    values = []
+    for column, value in zip(columns, raw):
+        if value is not None and column.type.python_type is datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+        values.append(value)
+    return values
+
+
+def page_args():
+    """Return ``(limit, after)`` from the query string, or ``(None, None)``."""
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    if limit is None and after is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_LIMIT
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_LIMIT), after
+
+
+def _after_clause(columns, values, descending):
+    # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y), spelled out because
+    # MySQL does not use a range scan for row-constructor comparisons.
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        cmp = column < value if descending else column > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], cmp))
+    return or_(*clauses)
+
+
+def _row_value(row, column):
+    entity, key = column.class_, column.key
+    if isinstance(row, entity):
+        return getattr(row, key)
+    return getattr(getattr(row, entity.__name__), key)
+
+
+def paginate(query, columns, descending=False):
+    """Apply the request's keyset parameters to ``query``.
+
+    ``columns`` is the sort key, most significant first, and must end in a
+    unique column (the primary key) so the order is total.  Raises
+    ``ValueError`` for a malformed ``limit`` or cursor.
+    """
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in columns))
+    limit, after = page_args()
+    if limit is None:
+        return Page(query.all(), None, False)
+    if after:
+        query = query.filter(_after_clause(columns, decode_cursor(after, columns), descending))
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_row_value(rows[-1], c) for c in columns])
+    return Page(rows, next_cursor, True)
+
+
+def _sortable(values):
+    # None sorts before any value, as NULL does in SQLite, instead of raising
+    # TypeError when compared with a datetime
+    return tuple((value is not None, value) for value in values)
+
+
+def paginate_items(items, columns, key, descending=False):
+    """``paginate`` for rows already in memory.
+
+    ``key(item)`` returns the item's values of ``columns``, any of which may
+    be None.
+    """
+    items = sorted(items, key=lambda item: _sortable(key(item)), reverse=descending)
+    limit, after = page_args()
+    if limit is None:
+        return Page(items, None, False)
+    if after:
+        cursor = _sortable(decode_cursor(after, columns))
+        items = [item for item in items
+                 if (_sortable(key(item)) < cursor if descending else _sortable(key(item)) > cursor)]
+    next_cursor = encode_cursor(key(items[limit - 1])) if len(items) > limit else None
+    return Page(items[:limit], next_cursor, True)
+
+
+def merge_pages(first, second, items, key, descending=False):
+    """Combine two pages of one listing read from different tables.
+
+    ``first`` and ``second`` come from ``paginate`` over the same sort key;
+    ``items`` are the rows of both, rendered, and ``key(item)`` returns an
+    item's sort key.  The result holds the first ``limit`` items of the
+    merged order, and its cursor continues both listings.
+    """
+    items = sorted(items, key=lambda item: _sortable(key(item)), reverse=descending)
+    if not first.paged:
+        return Page(items, None, False)
+    limit, _ = page_args()
+    more = first.next_cursor is not None or second.next_cursor is not None or len(items) > limit
+    items = items[:limit]
+    return Page(items, encode_cursor(key(items[-1])) if more and items else None, True)
+
+
+def page_payload(page, items):
+    """Shape ``items`` the way the caller asked for them."""
+    if not page.paged:
+        return items
+    return {"items": items, "next_cursor": page.next_cursor}
+
+
+def page_response(page, items):
+    return jsonify(page_payload(page, items))
@@ -0,0 +1,85 @@
+"""Password hashing off the request worker.
+
+Hashing and verifying run in a small process pool.  The number of jobs
+queued or running is capped; past the cap ``HasherBusy`` is raised straight
+away so the caller can answer 503 instead of piling up requests that each
+hold a worker thread for hundreds of milliseconds.
+
+Stored hashes use werkzeug's ``method$salt$hash`` format.  ``needs_rehash``
+tells whether a hash was made with a different method than the configured
+one, so logins can migrate old hashes as users sign in.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Too many hashing jobs are queued; retry later."""
+
+
+class PasswordHasher:
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=32, timeout=10.0):
+        # workers=0 hashes on the calling thread (still capped by max_pending)
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.rejected = 0
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise HasherBusy()
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job ends, not until the caller stops
+        # waiting, so jobs left running after a timeout still count
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.method
+
+    def info(self):
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
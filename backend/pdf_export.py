@@ -0,0 +1,253 @@
+"""PDF rendering for feedback reports.
+
+Rendering is CPU-bound pure Python, so batch exports fan it out over a
+process pool.  The functions take plain dicts (not ORM objects) so they can
+be pickled to the workers.  Rendered bytes are cached by feedback id plus a
+hash of the rendered fields; editing the feedback (or renaming a user)
+changes the hash, so stale documents are never served and unchanged ones are
+never rendered twice.  A merged PDF is assembled from those cached
+per-report documents.
+"""
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from fpdf import FPDF
+
+REPORT_FIELDS = ('id', 'employee_name', 'manager_name', 'date', 'strengths', 'improvements')
+
+# Below this many cache misses the IPC overhead outweighs the parallelism
+MIN_PARALLEL_BATCH = 4
+
+
+def _add_report_page(pdf, report):
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    pdf.cell(200, 10, txt="Feedback Report", ln=True, align='C')
+    pdf.ln(10)
+
+    pdf.cell(200, 10, txt=f"Employee: {report['employee_name']}", ln=True)
+    pdf.cell(200, 10, txt=f"Manager: {report['manager_name']}", ln=True)
+    pdf.cell(200, 10, txt=f"Date: {report['date']}", ln=True)
+    pdf.ln(10)
+
+    pdf.set_font("Arial", 'B', size=12)
+    pdf.cell(200, 10, txt="Strengths", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 10, txt=report['strengths'])
+    pdf.ln(5)
+
+    pdf.set_font("Arial", 'B', size=12)
+    pdf.cell(200, 10, txt="Areas for Improvement", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 10, txt=report['improvements'])
+    pdf.ln(10)
+
+
+def render_report(report):
+    """Render one feedback report and return the PDF bytes."""
+    pdf = FPDF()
+    _add_report_page(pdf, report)
+    return pdf.output(dest='S').encode('latin-1')
+
+
+_STREAM = re.compile(rb'<<[^>]*/Length (\d+)>>\nstream\n')
+_REF = rb'(\d+) 0 R'
+
+
+def _pdf_objects(data):
+    """``{number: body}`` for every object of a PDF written by FPDF."""
+    start = data.rindex(b'\nxref\n') + len(b'\nxref\n')
+    header, _, entries = data[start:].partition(b'\n')
+    objects = {}
+    for number, entry in enumerate(entries.split(b'\n')[1:int(header.split()[1])], start=1):
+        begin = data.index(b' obj\n', int(entry[:10])) + len(b' obj\n')
+        stream = _STREAM.match(data, begin)
+        end = data.index(b'\nendobj', stream.end() + int(stream.group(1)) if stream else begin)
+        objects[number] = data[begin:end]
+    return objects
+
+
+def _fonts(objects):
+    return [(name, objects[int(number)]) for name, number in re.findall(rb'/(F\d+) ' + _REF, objects[2])]
+
+
+def merge_documents(documents):
+    """Concatenate PDFs from ``render_report`` into one document.
+
+    Every report is drawn with the same fonts, so the pages can share the
+    first document's resources: its objects are kept and the other pages
+    and their content streams appended, renumbered, without decoding them.
+    """
+    first = _pdf_objects(documents[0])
+    objects = dict(first)
+    kids = []
+    number = max(objects) + 1
+    for data in documents:
+        doc = first if data is documents[0] else _pdf_objects(data)
+        if doc is not first and _fonts(doc) != _fonts(first):
+            raise ValueError("documents drawn with different fonts cannot be merged")
+        for page in map(int, re.findall(_REF, re.search(rb'/Kids \[(.*?)\]', doc[1]).group(1))):
+            if doc is first:
+                kids.append(page)
+                continue
+            contents = int(re.search(rb'/Contents ' + _REF, doc[page]).group(1))
+            objects[number] = re.sub(rb'/Contents ' + _REF, b'/Contents %d 0 R' % (number + 1), doc[page])
+            objects[number + 1] = doc[contents]
+            kids.append(number)
+            number += 2
+    objects[1] = re.sub(rb'/Count \d+', b'/Count %d' % len(kids), re.sub(
+        rb'/Kids \[.*?\]', b'/Kids [' + b''.join(b'%d 0 R ' % kid for kid in kids) + b']', first[1]))
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.3\n')
+    offsets = []
+    for n in range(1, number):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n%s\nendobj\n' % (n, objects[n]))
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % number)
+    out.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    trailer = documents[0][documents[0].rindex(b'trailer\n'):documents[0].rindex(b'startxref')]
+    out.write(re.sub(rb'/Size \d+', b'/Size %d' % number, trailer))
+    out.write(b'startxref\n%d\n%%%%EOF\n' % xref)
+    return out.getvalue()
+
+
+def content_version(report):
+    canonical = json.dumps([report[f] for f in REPORT_FIELDS], separators=(',', ':'))
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered documents, bounded by total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class PdfRenderer:
+    """Renders reports through the cache and a lazily started process pool.
+
+    ``on_render(mode, seconds, documents)``, if set, is called after each
+    actual render ('report' for cache misses, 'merged' for assembling a
+    merged PDF from the per-report documents).
+    """
+
+    def __init__(self, workers=None, cache_max_bytes=64 * 1024 * 1024, on_render=None):
+        self.workers = workers
+        self.cache = RenderCache(cache_max_bytes)
+        self.on_render = on_render
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def render(self, report):
+        return self.render_many([report])[0]
+
+    def render_many(self, reports):
+        """Return the PDF bytes for each report, in order."""
+        keys = [(r['id'], content_version(r)) for r in reports]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, data in enumerate(results) if data is None]
+        if not missing:
+            return results
+        start = time.perf_counter()
+        if len(missing) >= MIN_PARALLEL_BATCH and self.workers != 1:
+            rendered = self._executor().map(render_report, [reports[i] for i in missing],
+                                            chunksize=max(1, len(missing) // 32))
+        else:
+            rendered = map(render_report, [reports[i] for i in missing])
+        for i, data in zip(missing, rendered):
+            self.cache.put(keys[i], data)
+            results[i] = data
+        self._rendered('report', start, len(missing))
+        return results
+
+    def render_merged(self, reports):
+        """One PDF with every report, each rendered (or cached) on its own."""
+        documents = self.render_many(reports)
+        start = time.perf_counter()
+        data = merge_documents(documents)
+        self._rendered('merged', start, len(reports))
+        return data
+
+    def _rendered(self, mode, start, documents):
+        if self.on_render is not None:
+            self.on_render(mode, time.perf_counter() - start, documents)
+
+
+class _ZipSink(io.RawIOBase):
+    # Unseekable sink: zipfile then writes data descriptors after each entry,
+    # so the archive can be streamed while it is being built.
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(renderer, reports, chunk_size=64):
+    """Yield a ZIP of one PDF per report, rendering ``chunk_size`` at a time."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for start in range(0, len(reports), chunk_size):
+            chunk = reports[start:start + chunk_size]
+            for report, data in zip(chunk, renderer.render_many(chunk)):
+                archive.writestr(f"feedback_{report['id']}.pdf", data)
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,143 @@
+"""In-process publish/subscribe for per-user notifications.
+
+Routes publish small events after their commit; each connected client holds
+a ``Subscription`` with a bounded queue that its Server-Sent Events stream
+drains.  Publishing never waits: an event for a subscriber whose queue is
+full is dropped and the subscriber is told to ``resync`` (refetch its lists)
+instead.  Recent events are kept in a ring buffer so a client reconnecting
+with ``Last-Event-ID`` gets what it missed.
+
+Event data is encoded with the ``dumps`` the bus is given, the app's JSON
+provider, so datetimes and other values read the same as in REST responses.
+
+The bus only reaches subscribers connected to the same process.
+"""
+import itertools
+import json
+import queue
+import threading
+from collections import defaultdict, deque
+
+
+class TooManySubscribers(Exception):
+    """The process already holds ``max_subscribers`` open streams."""
+
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, event_id, event_type, data):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def encode(self, dumps):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {dumps(self.data)}\n\n"
+
+
+class Subscription:
+    def __init__(self, bus, user_id, max_queue):
+        self.bus = bus
+        self.user_id = user_id
+        self.queue = queue.Queue(max_queue)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue ``event``; returns False if it was dropped."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    def get(self, timeout):
+        """Next event, ``'resync'`` after an overflow, or None on timeout."""
+        if self.overflowed:
+            self.overflowed = False
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            return 'resync'
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, max_queue=100, max_subscribers=1000, history=1000, dumps=None):
+        self.max_queue = max_queue
+        self.dumps = dumps or (lambda data: json.dumps(data, default=str))
+        self.max_subscribers = max_subscribers
+        self._subscribers = defaultdict(set)  # user_id -> {Subscription}
+        self._count = 0
+        self._history = deque(maxlen=history)  # (event_id, user_id, event)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id, last_event_id=None):
+        subscription = Subscription(self, user_id, self.max_queue)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._subscribers[user_id].add(subscription)
+            self._count += 1
+            missed = []
+            if last_event_id is not None:
+                missed = [event for event_id, uid, event in self._history
+                          if uid == user_id and event_id > last_event_id]
+        for event in missed:
+            subscription.deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids, event_type, data):
+        """Queue an event for every subscription of each of ``user_ids``."""
+        with self._lock:
+            targets = []
+            for user_id in set(user_ids):
+                event = Event(next(self._ids), event_type, data)
+                self._history.append((event.id, user_id, event))
+                targets.extend((sub, event) for sub in self._subscribers.get(user_id, ()))
+            self.published += 1
+        for subscription, event in targets:
+            if not subscription.deliver(event):
+                self.dropped += 1
+
+    def info(self):
+        return {"subscribers": self._count, "users": len(self._subscribers),
+                "published": self.published, "dropped": self.dropped,
+                "max_subscribers": self.max_subscribers, "max_queue": self.max_queue}
+
+
+def sse_stream(subscription, keepalive):
+    """Yield Server-Sent Events for ``subscription`` until the client goes away.
+
+    A comment line is sent every ``keepalive`` seconds of silence so proxies
+    keep the connection open and a dead client is noticed on the next write.
+    """
+    try:
+        yield "retry: 3000\n: subscribed\n\n"
+        while True:
+            event = subscription.get(keepalive)
+            if event is None:
+                yield ": keepalive\n\n"
+            elif event == 'resync':
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                yield event.encode(subscription.bus.dumps)
+    finally:
+        subscription.close()
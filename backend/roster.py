@@ -0,0 +1,148 @@
+"""Parsing and diffing for bulk team roster changes.
+
+A roster upload lists reporting lines, either as CSV with a
+``manager_id,employee_id`` header or as JSON: an array of
+``{"manager_id": ..., "employee_id": ...}`` objects, or an object mapping
+each manager id to its list of employee ids (the only way to ask for an
+empty team).  Both parse to ``{manager_id: {employee_id, ...}}``.
+
+``diff_rosters`` compares that with the current Team rows of the same
+managers, and ``find_cycle`` checks the org chart the change would leave.
+"""
+import csv
+import io
+import json
+
+
+class RosterError(ValueError):
+    """The upload cannot be read or names an invalid id."""
+
+
+class RosterCycle(RosterError):
+    """The change would make someone report, directly or not, to themselves."""
+
+    def __init__(self, manager_id, employee_id):
+        super().__init__("An employee cannot be added under someone who reports to them")
+        self.manager_id = manager_id
+        self.employee_id = employee_id
+
+
+def _id(value, name):
+    if isinstance(value, bool):
+        raise RosterError(f"{name} must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise RosterError(f"{name} must be an integer")
+    if value < 1:
+        raise RosterError(f"{name} must be positive")
+    return value
+
+
+def _add(rosters, manager_id, employee_id, where):
+    try:
+        rosters.setdefault(_id(manager_id, 'manager_id'), set()).add(_id(employee_id, 'employee_id'))
+    except RosterError as e:
+        raise RosterError(f"{where}: {e}")
+
+
+def parse_csv(data):
+    reader = csv.DictReader(io.StringIO(data.decode('utf-8-sig') if isinstance(data, bytes) else data))
+    if not reader.fieldnames or not {'manager_id', 'employee_id'} <= {f.strip() for f in reader.fieldnames}:
+        raise RosterError("CSV needs a manager_id,employee_id header")
+    rosters = {}
+    for row in reader:
+        row = {(k or '').strip(): v for k, v in row.items()}
+        _add(rosters, row['manager_id'], row['employee_id'], f"line {reader.line_num}")
+    return rosters
+
+
+def parse_json(body):
+    rosters = {}
+    if isinstance(body, dict):
+        for manager_id, employee_ids in body.items():
+            if not isinstance(employee_ids, list):
+                raise RosterError(f"manager {manager_id}: expected a list of employee ids")
+            rosters.setdefault(_id(manager_id, 'manager_id'), set())
+            for employee_id in employee_ids:
+                _add(rosters, manager_id, employee_id, f"manager {manager_id}")
+    elif isinstance(body, list):
+        for i, item in enumerate(body):
+            if not isinstance(item, dict):
+                raise RosterError(f"item {i}: expected an object")
+            _add(rosters, item.get('manager_id'), item.get('employee_id'), f"item {i}")
+    else:
+        raise RosterError("Expected a JSON array or object")
+    return rosters
+
+
+def parse_roster(data, mimetype):
+    """``{manager_id: {employee_id, ...}}`` from a CSV or JSON upload body."""
+    if mimetype in ('text/csv', 'application/csv'):
+        return parse_csv(data)
+    try:
+        body = json.loads(data)
+    except ValueError as e:
+        raise RosterError(f"Invalid JSON: {e}")
+    return parse_json(body)
+
+
+def parse_team(body):
+    """The employee ids of one team: ``{"employee_ids": [...]}`` or a bare list."""
+    if isinstance(body, dict):
+        body = body.get('employee_ids')
+    if not isinstance(body, list):
+        raise RosterError("Expected employee_ids as a list")
+    return {_id(employee_id, 'employee_id') for employee_id in body}
+
+
+def diff_rosters(current, desired, replace=True):
+    """Split the change from ``current`` to ``desired`` into set operations.
+
+    ``current`` holds ``(id, manager_id, employee_id)`` Team rows of (at
+    least) the managers in ``desired``.  Returns ``(added, removed,
+    unchanged)``: the pairs to insert, the ``(id, manager_id, employee_id)``
+    rows to delete (none unless ``replace``), and how many desired pairs
+    already exist.
+    """
+    existing = {}
+    for row_id, manager_id, employee_id in current:
+        existing.setdefault((manager_id, employee_id), []).append(row_id)
+    wanted = {(manager_id, employee_id) for manager_id, employee_ids in desired.items()
+              for employee_id in employee_ids}
+    added = sorted(wanted - existing.keys())
+    removed = []
+    if replace:
+        removed = sorted((row_id, *pair) for pair, row_ids in existing.items()
+                         if pair[0] in desired and pair not in wanted for row_id in row_ids)
+    return added, removed, len(wanted & existing.keys())
+
+
+def find_cycle(edges):
+    """An edge ``(manager_id, employee_id)`` that closes a reporting loop in
+    ``edges``, or None."""
+    reports = {}
+    for manager_id, employee_id in edges:
+        if manager_id == employee_id:
+            return manager_id, employee_id
+        reports.setdefault(manager_id, []).append(employee_id)
+    done, active = set(), set()
+    for root in reports:
+        if root in done:
+            continue
+        # Iterative depth-first search; an edge into the active path is a loop
+        stack = [(root, iter(reports.get(root, ())))]
+        active.add(root)
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                active.discard(node)
+                done.add(node)
+            elif child in active:
+                return node, child
+            elif child not in done:
+                active.add(child)
+                stack.append((child, iter(reports.get(child, ()))))
+    return None
@@ -0,0 +1,263 @@
+"""Full-text search over feedback, its comments and its tags.
+
+Each feedback has one row in ``feedback_search`` holding its text in three
+columns (the feedback's own text, its comments and its tags) plus the
+manager/employee ids used for scoping.  The app rewrites a feedback's row in
+the same transaction as any write that changes its text, and the index on
+that table depends on the database:
+
+* MySQL: a FULLTEXT index, queried in boolean mode and ranked by relevance.
+* SQLite: an FTS5 external-content table kept in sync by triggers, ranked
+  with bm25 (tags weigh most, comments least).
+* anything else, or ``SEARCH_BACKEND=memory``: an inverted index in process
+  memory, loaded from ``feedback_search`` on first use and updated after each
+  commit.  It is per process and meant for local runs.
+
+Queries are split into words; every word must match and the last one also
+matches as a prefix, so results narrow as the user types.
+"""
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from sqlalchemy import text
+
+TABLE = 'feedback_search'
+TEXT_COLUMNS = ('feedback_text', 'comment_text', 'tag_text')
+MAX_TERMS = 8
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(value):
+    return [word.lower() for word in _WORD.findall(value or '')]
+
+
+def query_terms(q):
+    """Words of a search query, de-duplicated, at most ``MAX_TERMS``."""
+    terms = []
+    for word in tokenize(q):
+        if word not in terms:
+            terms.append(word)
+    return terms[:MAX_TERMS]
+
+
+def document(strengths, improvements, comments, tags):
+    """The ``feedback_search`` text columns for one feedback."""
+    return {
+        'feedback_text': f"{strengths}\n{improvements}",
+        'comment_text': '\n'.join(comments),
+        'tag_text': ' '.join(tags),
+    }
+
+
+def _scope_sql(manager_id, employee_id, alias):
+    clauses, params = [], {}
+    if manager_id is not None:
+        clauses.append(f"{alias}.manager_id = :manager_id")
+        params['manager_id'] = manager_id
+    if employee_id is not None:
+        clauses.append(f"{alias}.employee_id = :employee_id")
+        params['employee_id'] = employee_id
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+class MySQLFullText:
+    name = 'mysql-fulltext'
+
+    def install(self, conn):
+        existing = {row[2] for row in conn.exec_driver_sql(f"SHOW INDEX FROM {TABLE}")}
+        if 'ft_feedback_search' not in existing:
+            conn.exec_driver_sql(f"CREATE FULLTEXT INDEX ft_feedback_search ON {TABLE} "
+                                 f"({', '.join(TEXT_COLUMNS)})")
+
+    def search(self, conn, terms, manager_id=None, employee_id=None, limit=20, offset=0):
+        # InnoDB ignores words shorter than innodb_ft_min_token_size (3)
+        words = [f"+{term}" for term in terms[:-1]] + [f"+{terms[-1]}*"]
+        scope, params = _scope_sql(manager_id, employee_id, 's')
+        match = f"MATCH({', '.join(TEXT_COLUMNS)}) AGAINST (:q IN BOOLEAN MODE)"
+        rows = conn.execute(text(
+            f"SELECT s.feedback_id, {match} AS score FROM {TABLE} s WHERE {match}{scope} "
+            f"ORDER BY score DESC, s.feedback_id DESC LIMIT :limit OFFSET :offset"
+        ), {'q': ' '.join(words), 'limit': limit, 'offset': offset, **params})
+        return [(row.feedback_id, float(row.score)) for row in rows]
+
+    def apply(self, changes):
+        pass
+
+    def info(self):
+        return {"backend": self.name}
+
+
+class SQLiteFTS5:
+    """FTS5 over a view of ``feedback_search`` that adds a ``scope_text``
+    column (``m<manager_id> e<employee_id>``), so a scoped search intersects
+    doclists inside FTS5 instead of filtering every match afterwards.
+
+    Every match is ranked with bm25 and SQLite keeps only the top
+    ``offset + limit`` while sorting, so the best hits are found however
+    old they are.
+    """
+    name = 'sqlite-fts5'
+    WEIGHTS = (1.0, 0.5, 2.0, 0.0)  # feedback_text, comment_text, tag_text, scope_text
+
+    def install(self, conn):
+        columns = ', '.join(TEXT_COLUMNS + ('scope_text',))
+        scope = "'m' || {0}.manager_id || ' e' || {0}.employee_id"
+        new_values = ', '.join([f"new.{c}" for c in TEXT_COLUMNS] + [scope.format('new')])
+        old_values = ', '.join([f"old.{c}" for c in TEXT_COLUMNS] + [scope.format('old')])
+        delete = (f"INSERT INTO {TABLE}_fts({TABLE}_fts, rowid, {columns}) "
+                  f"VALUES ('delete', old.feedback_id, {old_values});")
+        insert = f"INSERT INTO {TABLE}_fts(rowid, {columns}) VALUES (new.feedback_id, {new_values});"
+        for statement in (
+            f"CREATE VIEW IF NOT EXISTS {TABLE}_source AS SELECT feedback_id, "
+            f"{', '.join(TEXT_COLUMNS)}, {scope.format(TABLE)} AS scope_text FROM {TABLE}",
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE}_fts USING fts5({columns}, "
+            f"content='{TABLE}_source', content_rowid='feedback_id', prefix='2 3 4', "
+            f"tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON {TABLE} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON {TABLE} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABLE}_au AFTER UPDATE ON {TABLE} BEGIN {delete} {insert} END",
+            # Index whatever the table already holds
+            f"INSERT INTO {TABLE}_fts({TABLE}_fts) VALUES ('rebuild')",
+        ):
+            conn.exec_driver_sql(statement)
+
+    def search(self, conn, terms, manager_id=None, employee_id=None, limit=20, offset=0):
+        words = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        match = f"{{{' '.join(TEXT_COLUMNS)}}} : ({words})"
+        if manager_id is not None:
+            match += f' AND scope_text : "m{int(manager_id)}"'
+        if employee_id is not None:
+            match += f' AND scope_text : "e{int(employee_id)}"'
+        rank = f"bm25({TABLE}_fts, {', '.join(map(str, self.WEIGHTS))})"
+        rows = conn.execute(text(
+            f"SELECT rowid AS feedback_id, -{rank} AS score FROM {TABLE}_fts "
+            f"WHERE {TABLE}_fts MATCH :q ORDER BY {rank}, rowid DESC LIMIT :limit OFFSET :offset"
+        ), {'q': match, 'limit': limit, 'offset': offset})
+        return [(row.feedback_id, row.score) for row in rows]
+
+    def apply(self, changes):
+        pass
+
+    def info(self):
+        return {"backend": self.name}
+
+
+class InvertedIndex:
+    """Term -> {feedback_id: term frequency}, scored with BM25."""
+    name = 'memory'
+    K1, B = 1.2, 0.75
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._docs = {}  # feedback_id -> (manager_id, employee_id, length, terms)
+        self._vocabulary = []
+        self._vocabulary_stale = True
+        self._total_length = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def install(self, conn):
+        pass
+
+    def load(self, conn):
+        with self._lock:
+            if self._loaded:
+                return
+            columns = ', '.join(TEXT_COLUMNS)
+            for row in conn.execute(text(f"SELECT feedback_id, manager_id, employee_id, {columns} FROM {TABLE}")):
+                self._add(row.feedback_id, row.manager_id, row.employee_id,
+                          {c: getattr(row, c) for c in TEXT_COLUMNS})
+            self._loaded = True
+
+    def apply(self, changes):
+        """Apply committed ``(feedback_id, row or None)`` changes."""
+        with self._lock:
+            if not self._loaded:
+                return  # load() will read the committed rows
+            for feedback_id, row in changes:
+                self._remove(feedback_id)
+                if row is not None:
+                    self._add(feedback_id, row['manager_id'], row['employee_id'], row)
+
+    def _add(self, feedback_id, manager_id, employee_id, columns):
+        counts = defaultdict(int)
+        for column in TEXT_COLUMNS:
+            for term in tokenize(columns[column]):
+                counts[term] += 1
+        for term, count in counts.items():
+            if term not in self._postings:
+                self._vocabulary_stale = True
+            self._postings[term][feedback_id] = count
+        length = sum(counts.values())
+        self._docs[feedback_id] = (manager_id, employee_id, length, tuple(counts))
+        self._total_length += length
+
+    def _remove(self, feedback_id):
+        doc = self._docs.pop(feedback_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc[2]
+        for term in doc[3]:
+            postings = self._postings[term]
+            postings.pop(feedback_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_stale = True
+
+    def _prefixed(self, prefix):
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_stale = False
+        start = bisect_left(self._vocabulary, prefix)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, conn, terms, manager_id=None, employee_id=None, limit=20, offset=0):
+        self.load(conn)
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            average = self._total_length / n
+            # Each query word is a set of terms: itself, or every completion of the last word
+            groups = [[term] for term in terms[:-1]] + [list(self._prefixed(terms[-1]))]
+            scores = None
+            for group in groups:
+                group_scores = defaultdict(float)
+                for term in group:
+                    postings = self._postings.get(term, {})
+                    idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for feedback_id, tf in postings.items():
+                        length = self._docs[feedback_id][2]
+                        group_scores[feedback_id] += idf * tf * (self.K1 + 1) / (
+                            tf + self.K1 * (1 - self.B + self.B * length / average))
+                if scores is None:
+                    scores = group_scores
+                else:
+                    scores = {fid: score + group_scores[fid] for fid, score in scores.items()
+                              if fid in group_scores}
+                if not scores:
+                    return []
+            hits = [(fid, score) for fid, score in scores.items()
+                    if (manager_id is None or self._docs[fid][0] == manager_id)
+                    and (employee_id is None or self._docs[fid][1] == employee_id)]
+        hits.sort(key=lambda hit: (-hit[1], -hit[0]))
+        return hits[offset:offset + limit]
+
+    def info(self):
+        return {"backend": self.name, "documents": len(self._docs), "terms": len(self._postings)}
+
+
+def create_search_index(name, dialect):
+    """Search backend for ``SEARCH_BACKEND`` ``name`` ('auto' picks by dialect)."""
+    if name == 'auto':
+        name = {'mysql': 'mysql-fulltext', 'sqlite': 'sqlite-fts5'}.get(dialect, 'memory')
+    backends = {'mysql-fulltext': MySQLFullText, 'sqlite-fts5': SQLiteFTS5, 'memory': InvertedIndex}
+    if name not in backends:
+        raise ValueError(f"Unknown search backend {name!r}")
+    return backends[name]()
@@ -0,0 +1,55 @@
+"""Time buckets for the sentiment trend rollup.
+
+Trend rows are keyed by ``(period, scope, user_id, bucket, tag_name)``:
+
+* ``period`` is 'week' (buckets start on Monday) or 'month'.
+* ``scope``/``user_id`` is ('org', 0), ('manager', id) for feedback a
+  manager gave or ('employee', id) for feedback an employee received.  A
+  team's trend is the sum of its members' employee rows, so roster changes
+  need no re-bucketing.
+* ``tag_name`` is '' for all feedback, or one tag for the feedback carrying
+  that tag.
+
+Each row holds total/positive/neutral/negative counts, so reading a trend
+costs one row per bucket (and tag), however much feedback there is.
+"""
+from datetime import date, timedelta
+
+PERIODS = ('week', 'month')
+DEFAULT_BUCKETS = {'week': 26, 'month': 12}
+ALL_TAGS = ''
+
+
+def as_date(value):
+    """``DATE()`` comes back as a string from SQLite and a date elsewhere."""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if hasattr(value, 'date'):
+        return value.date()
+    return value
+
+
+def bucket_start(period, day):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+
+
+def shift(period, bucket, n):
+    """The bucket ``n`` periods after ``bucket`` (negative goes back)."""
+    if period == 'week':
+        return bucket + timedelta(weeks=n)
+    months = bucket.year * 12 + bucket.month - 1 + n
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def trend_keys(day, manager_id, employee_id, tags=()):
+    """Every rollup key one feedback given on ``day`` counts towards."""
+    for period in PERIODS:
+        bucket = bucket_start(period, day)
+        for scope, user_id in (('org', 0), ('manager', manager_id), ('employee', employee_id)):
+            for tag_name in (ALL_TAGS, *tags):
+                yield {"period": period, "scope": scope, "user_id": user_id,
+                       "bucket": bucket, "tag_name": tag_name}
@@ -0,0 +1,157 @@
+"""Write-behind buffer that groups small writes into one transaction.
+
+Request threads ``submit`` an item; one flusher thread collects the items
+that arrive within ``window`` seconds (or until ``max_items``) and passes
+them to ``write(items)`` in a single call, which stores them with multi-row
+INSERTs and one commit and returns one result per item.
+
+``durability`` decides when ``submit`` returns:
+
+* 'commit': once the batch holding the item has committed, with the item's
+  result, so a success response still means the row is stored.  Concurrent
+  requests share one commit instead of paying for one each.  A request
+  still waiting after ``timeout`` seconds gets ``BufferTimeout``; its item
+  stays queued and may still be written.
+* 'buffered': straight away, with None.  Items are written within
+  ``window``; whatever is still buffered when the process is killed is
+  lost.  ``close()`` (run at exit) writes what is left on a normal
+  shutdown.
+
+If a batch fails, its items are written again one at a time so a bad row
+only fails its own request.
+"""
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DURABILITY_MODES = ('commit', 'buffered')
+
+
+class BufferClosed(RuntimeError):
+    pass
+
+
+class BufferTimeout(RuntimeError):
+    pass
+
+
+class _Pending:
+    __slots__ = ('item', 'done', 'result', 'error')
+
+    def __init__(self, item):
+        self.item = item
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WriteBuffer:
+    def __init__(self, write, window=0.005, max_items=500, durability='commit', timeout=None, context=None):
+        # ``context`` is a callable returning a context manager (the app
+        # context) that ``write`` runs inside.
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_MODES)}")
+        self.write = write
+        self.window = window
+        self.max_items = max_items
+        self.durability = durability
+        self.timeout = timeout
+        self.context = context
+        self._items = []
+        self._last = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self.largest_batch = 0
+
+    def submit(self, item):
+        """Queue ``item``; returns its result ('commit') or None ('buffered')."""
+        pending = _Pending(item)
+        with self._cond:
+            if self._closed:
+                raise BufferClosed("The write buffer is closed")
+            self._items.append(pending)
+            self._last = pending
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-buffer', daemon=True)
+                self._thread.start()
+            if len(self._items) == 1 or len(self._items) >= self.max_items:
+                self._cond.notify()
+        if self.durability == 'buffered':
+            return None
+        if not pending.done.wait(self.timeout):
+            raise BufferTimeout(f"The write was not committed within {self.timeout} seconds")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far has been written."""
+        with self._cond:
+            last = self._last
+        return last is None or last.done.wait(timeout)
+
+    def close(self, timeout=30):
+        """Write what is buffered and stop the flusher thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if not self._items:
+                    return
+                # Give the writes of other requests ``window`` to arrive
+                deadline = time.monotonic() + self.window
+                while len(self._items) < self.max_items and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._items[:self.max_items]
+                del self._items[:self.max_items]
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            if self.context is None:
+                results = self.write([pending.item for pending in batch])
+            else:
+                with self.context():
+                    results = self.write([pending.item for pending in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                log.warning("Buffered batch of %d writes failed (%s); writing them one at a time", len(batch), e)
+                for pending in batch:
+                    self._write([pending])
+                return
+            log.exception("Buffered write failed: %r", batch[0].item)
+            self.failed += 1
+            batch[0].error = e
+            batch[0].done.set()
+            return
+        self.batches += 1
+        self.written += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for pending, result in zip(batch, results):
+            pending.result = result
+            pending.done.set()
+
+    def info(self):
+        with self._cond:
+            queued = len(self._items)
+        return {"durability": self.durability, "window_ms": self.window * 1000, "max_items": self.max_items,
+                "queued": queued, "batches": self.batches, "written": self.written, "failed": self.failed,
+                "largest_batch": self.largest_batch,
+                "average_batch": round(self.written / self.batches, 2) if self.batches else 0}
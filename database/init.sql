@@ -20,7 +20,8 @@ CREATE TABLE IF NOT EXISTS team (
     manager_id INT,
     employee_id INT,
     FOREIGN KEY (manager_id) REFERENCES user(id),
-    FOREIGN KEY (employee_id) REFERENCES user(id)
+    FOREIGN KEY (employee_id) REFERENCES user(id),
+    UNIQUE INDEX uq_team_manager_id_employee_id (manager_id, employee_id)
 );
 
 CREATE TABLE IF NOT EXISTS feedback (
@@ -32,7 +33,9 @@ CREATE TABLE IF NOT EXISTS feedback (
     sentiment VARCHAR(20) NOT NULL,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (employee_id) REFERENCES user(id),
-    FOREIGN KEY (manager_id) REFERENCES user(id)
+    FOREIGN KEY (manager_id) REFERENCES user(id),
+    INDEX ix_feedback_manager_id_timestamp (manager_id, timestamp),
+    INDEX ix_feedback_employee_id_timestamp (employee_id, timestamp)
 );
 
 CREATE TABLE IF NOT EXISTS comment (
@@ -42,8 +45,11 @@ CREATE TABLE IF NOT EXISTS comment (
     text TEXT NOT NULL,
     is_markdown BOOLEAN DEFAULT TRUE,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    idempotency_key VARCHAR(100),
     FOREIGN KEY (feedback_id) REFERENCES feedback(id),
-    FOREIGN KEY (user_id) REFERENCES user(id)
+    FOREIGN KEY (user_id) REFERENCES user(id),
+    INDEX ix_comment_feedback_id_timestamp (feedback_id, timestamp),
+    UNIQUE INDEX uq_comment_user_id_idempotency_key (user_id, idempotency_key)
 );
 
 CREATE TABLE IF NOT EXISTS acknowledgement (
@@ -52,7 +58,9 @@ CREATE TABLE IF NOT EXISTS acknowledgement (
     employee_id INT,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (feedback_id) REFERENCES feedback(id),
-    FOREIGN KEY (employee_id) REFERENCES user(id)
+    FOREIGN KEY (employee_id) REFERENCES user(id),
+    UNIQUE INDEX uq_acknowledgement_employee_id_feedback_id (employee_id, feedback_id),
+    INDEX ix_acknowledgement_feedback_id (feedback_id)
 );
 
 CREATE TABLE IF NOT EXISTS feedback_request (
@@ -64,14 +72,17 @@ CREATE TABLE IF NOT EXISTS feedback_request (
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     is_anonymous BOOLEAN DEFAULT FALSE,
     FOREIGN KEY (requester_id) REFERENCES user(id),
-    FOREIGN KEY (target_manager_id) REFERENCES user(id)
+    FOREIGN KEY (target_manager_id) REFERENCES user(id),
+    INDEX ix_feedback_request_target_manager_id_timestamp (target_manager_id, timestamp),
+    INDEX ix_feedback_request_requester_id_timestamp (requester_id, timestamp)
 );
 
 CREATE TABLE IF NOT EXISTS tag (
     id INT AUTO_INCREMENT PRIMARY KEY,
     feedback_id INT,
     tag_name VARCHAR(50) NOT NULL,
-    FOREIGN KEY (feedback_id) REFERENCES feedback(id)
+    FOREIGN KEY (feedback_id) REFERENCES feedback(id),
+    INDEX ix_tag_feedback_id (feedback_id)
 );
 
 
@@ -12,10 +12,7 @@ export const AuthProvider = ({ children }) => {
         const userData = localStorage.getItem('user');
 
         if (token && userData) {
-            const user = JSON.parse(userData);
-            // In a real app, you'd decode a JWT. Here, we parse it from the dummy token.
-            const role = token.includes('Manager') ? 'Manager' : 'Employee';
-            setUser({ ...user, role });
+            setUser(JSON.parse(userData));
         }
         setLoading(false);
     }, []);
@@ -35,6 +32,8 @@ export const AuthProvider = ({ children }) => {
     };
 
     const logout = () => {
+        // Revoke the token server-side; clear local state either way
+        api.logout().catch(() => {});
         localStorage.removeItem('token');
         localStorage.removeItem('user');
         setUser(null);
@@ -290,6 +290,24 @@ function EmployeeDashboard() {
         }
     }, [user]);
 
+    useEffect(() => {
+        if (!user) return undefined;
+        const reloadAll = () => {
+            loadFeedback();
+            loadStats();
+            loadEmployeeRequests();
+        };
+        const source = api.subscribeEvents({
+            feedback: () => {
+                loadFeedback();
+                loadStats();
+            },
+            feedback_request_status: () => loadEmployeeRequests(),
+            resync: reloadAll,
+        });
+        return () => source.close();
+    }, [user]);
+
     const loadFeedback = async () => {
         try {
             const response = await api.getEmployeeFeedback(user.id);
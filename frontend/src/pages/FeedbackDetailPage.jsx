@@ -52,15 +52,32 @@ function FeedbackDetailPage() {
     useEffect(() => {
         if (id) {
             loadFeedback();
-            loadComments();
-            loadAcknowledgements();
         }
     }, [id]);
 
+    useEffect(() => {
+        if (!id) return undefined;
+        const source = api.subscribeEvents({
+            comment: (event) => {
+                if (String(event.feedback_id) === String(id)) loadComments();
+            },
+            acknowledgement: (event) => {
+                if (String(event.feedback_id) === String(id)) loadAcknowledgements();
+            },
+            resync: () => loadFeedback(),
+        });
+        return () => source.close();
+    }, [id]);
+
     const loadFeedback = async () => {
         try {
-            const response = await api.getFeedback(id);
-            setFeedback(response.data);
+            // One request for the feedback, its comments and acknowledgements
+            const response = await api.getFeedbackFull(id);
+            const { comments, acknowledgements, tags, ...feedbackData } = response.data;
+            setFeedback(feedbackData);
+            setComments(comments);
+            setAcknowledgements(acknowledgements);
+            setIsAcknowledged(acknowledgements.some(ack => ack.employee_id === user.id));
         } catch (error) {
             console.error('Error loading feedback:', error);
             // Fallback to mock data if API fails
@@ -216,6 +216,23 @@ function ManagerDashboard() {
         }
     }, [user]);
 
+    useEffect(() => {
+        if (!user) return undefined;
+        const source = api.subscribeEvents({
+            feedback_request: () => loadFeedbackRequests(),
+            acknowledgement: () => {
+                loadStats();
+                loadFeedbackHistory();
+            },
+            resync: () => {
+                loadStats();
+                loadFeedbackRequests();
+                loadFeedbackHistory();
+            },
+        });
+        return () => source.close();
+    }, [user]);
+
     const loadTeam = async () => {
         try {
             const response = await api.getTeam(user.id);
@@ -22,6 +22,7 @@ axios.interceptors.response.use(
 
 // Auth
 export const login = (credentials) => axios.post(`${API_URL}/login`, credentials);
+export const logout = () => axios.post(`${API_URL}/logout`, {}, { headers: getAuthHeaders() });
 export const register = (userData) => axios.post(`${API_URL}/register`, userData);
 
 // Team
@@ -30,10 +31,17 @@ export const addTeamMember = (managerId, employeeId) => axios.post(`${API_URL}/t
 export const removeTeamMember = (managerId, employeeId) => axios.delete(`${API_URL}/team`, { data: { manager_id: managerId, employee_id: employeeId }, headers: getAuthHeaders() });
 export const getTeamMembers = (managerId) => axios.get(`${API_URL}/team/members/${managerId}`,{ headers: getAuthHeaders() });
 
+// Org hierarchy (everyone under a user, skip levels included)
+export const getOrgReports = (userId, params = {}) => axios.get(`${API_URL}/org/${userId}/reports`, { params, headers: getAuthHeaders() });
+export const getOrgFeedback = (userId, params = {}) => axios.get(`${API_URL}/org/${userId}/feedback`, { params, headers: getAuthHeaders() });
+export const getOrgStats = (userId, params = {}) => axios.get(`${API_URL}/org/${userId}/stats`, { params, headers: getAuthHeaders() });
+
 // Feedback
 export const getEmployeeFeedback = (employeeId) => axios.get(`${API_URL}/feedback/employee/${employeeId}`, { headers: getAuthHeaders() });
 export const getManagerFeedback = (managerId) => axios.get(`${API_URL}/feedback/manager/${managerId}`, { headers: getAuthHeaders() });
 export const getFeedback = (feedbackId) => axios.get(`${API_URL}/feedback/${feedbackId}`, { headers: getAuthHeaders() });
+export const getFeedbackFull = (feedbackId) => axios.get(`${API_URL}/feedback/${feedbackId}/full`, { headers: getAuthHeaders() });
+export const searchFeedback = (q, params = {}) => axios.get(`${API_URL}/feedback/search`, { params: { q, ...params }, headers: getAuthHeaders() });
 export const submitFeedback = (feedbackData) => axios.post(`${API_URL}/feedback`, feedbackData, { headers: getAuthHeaders() });
 export const editFeedback = (feedbackId, feedbackData) => axios.put(`${API_URL}/feedback/${feedbackId}`, feedbackData, { headers: getAuthHeaders() });
 export const deleteFeedback = (feedbackId) => axios.delete(`${API_URL}/feedback/${feedbackId}`, { headers: getAuthHeaders() });
@@ -41,7 +49,8 @@ export const requestFeedback = (requestData) => axios.post(`${API_URL}/feedback/
 export const acknowledgeFeedback = (ackData) => axios.post(`${API_URL}/feedback/acknowledge`, ackData, { headers: getAuthHeaders() });
 
 // Comments
-export const addComment = (commentData) => axios.post(`${API_URL}/comments`, commentData, { headers: getAuthHeaders() });
+// Pass the same idempotencyKey when retrying so the comment is only added once
+export const addComment = (commentData, idempotencyKey = crypto.randomUUID()) => axios.post(`${API_URL}/comments`, commentData, { headers: { ...getAuthHeaders(), 'Idempotency-Key': idempotencyKey } });
 export const getComments = (feedbackId) => axios.get(`${API_URL}/comments/${feedbackId}`, { headers: getAuthHeaders() });
 
 // Feedback Requests
@@ -67,3 +76,22 @@ export const getUsers = (role = '') => {
     return axios.get(`${API_URL}/users`, { ...params, headers: getAuthHeaders() });
 };
 export const getUser = (userId) => axios.get(`${API_URL}/user/${userId}`, { headers: getAuthHeaders() }); 
+
+// Background jobs (exports, rebuilds): submit, then poll getJob until the
+// status is 'succeeded' and download result.url
+export const submitJob = (kind, params = {}) => axios.post(`${API_URL}/jobs`, { kind, params }, { headers: getAuthHeaders() });
+export const getJobs = () => axios.get(`${API_URL}/jobs`, { headers: getAuthHeaders() });
+export const getJob = (jobId) => axios.get(`${API_URL}/jobs/${jobId}`, { headers: getAuthHeaders() });
+export const cancelJob = (jobId) => axios.delete(`${API_URL}/jobs/${jobId}`, { headers: getAuthHeaders() });
+export const getJobResult = (jobId) => axios.get(`${API_URL}/jobs/${jobId}/result`, { responseType: 'blob', headers: getAuthHeaders() });
+
+// Live updates (Server-Sent Events). EventSource cannot send headers, so the
+// token goes in the query string. Returns the EventSource; call close() to stop.
+export const subscribeEvents = (handlers) => {
+    const token = localStorage.getItem('token');
+    const source = new EventSource(`${API_URL}/events?access_token=${encodeURIComponent(token)}`);
+    Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+    });
+    return source;
+};